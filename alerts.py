@@ -0,0 +1,330 @@
+"""Stored price-drop alerts, evaluated against newly ingested rows only.
+
+An alert asks to be told when a listing drops to ``max_price`` or below,
+optionally on one platform. It watches either one matched product
+(``product_match_id``) or every listing whose search text contains all the
+words of its ``query``, as ``match=all`` searches do: each word also matches
+its ``alternatives`` (the accented spellings and typo correction the API
+resolves when the alert is created), and the query's synonym variants match
+as well.
+
+``AlertStore`` indexes product alerts by product id and query alerts by the
+longest word of each variant, in every spelling. ``evaluate(batch)`` splits the batch's search text into words
+once and looks up only the alerts filed under those words and product ids.
+Every candidate is then checked against its row. The cost therefore follows
+the size of the batch and the alerts it touches, never alerts x catalog.
+Each alert records at most one hit per batch: its cheapest matching row.
+
+Alerts live in memory. Set PRICE_API_ALERTS_PATH to keep them (with their
+recent hits) in a JSON file that is reloaded at startup. The file is also how
+pre-forked workers share one store: every access first reloads it if another
+process replaced it, and every change is a read-modify-write of the file under
+an exclusive lock on ``<path>.lock``. Without a path each process keeps its
+own alerts.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from search_index import synonym_variants, tokenize
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows, where serve.py runs a single waitress process
+    fcntl = None
+
+logger = logging.getLogger("price_api.alerts")
+
+STORE_FORMAT_VERSION = 1
+
+
+def _clean(value: Any) -> Any:
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+@dataclass
+class Alert:
+    alert_id: str
+    max_price: float
+    product_match_id: Optional[str] = None
+    query: Optional[str] = None
+    platform: Optional[str] = None
+    created: str = ""
+    hits: int = 0
+    last_hit: Optional[str] = None
+    alternatives: Dict[str, List[str]] = field(default_factory=dict)
+    variants: List[List[str]] = field(default_factory=list, repr=False)
+
+    def __post_init__(self) -> None:
+        words = tokenize(self.query) if self.query else []
+        self.variants = [sorted(set(variant)) for variant in [words, *synonym_variants(words)]] if words else []
+
+    @property
+    def words(self) -> List[str]:
+        return self.variants[0] if self.variants else []
+
+    def spellings(self, word: str) -> List[str]:
+        return [word, *self.alternatives.get(word, ())]
+
+    @property
+    def key_words(self) -> Set[str]:
+        """The words the alert is filed under: each variant's longest (a rough stand-in for the rarest), in every spelling."""
+        return {spelling for variant in self.variants for spelling in self.spellings(max(variant, key=len))}
+
+    def matches_words(self, row_words: Set[str]) -> bool:
+        """Whether some variant has every word, in one of its spellings, among ``row_words``."""
+        return any(
+            all(not row_words.isdisjoint(self.spellings(word)) for word in variant) for variant in self.variants
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        del data["variants"]
+        return data
+
+
+class AlertStore:
+    def __init__(self, path: Optional[str] = None, keep_hits: int = 50) -> None:
+        self.path = path
+        self.keep_hits = keep_hits
+        self._alerts: Dict[str, Alert] = {}
+        self._by_product: Dict[str, Set[str]] = {}
+        self._by_word: Dict[str, Set[str]] = {}
+        self._hits: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._loaded: Optional[Tuple[int, int, int]] = None  # (inode, size, mtime) of the file last read or written
+
+    @classmethod
+    def from_env(cls) -> "AlertStore":
+        store = cls(path=os.environ.get("PRICE_API_ALERTS_PATH") or None)
+        if store.path and os.path.exists(store.path):
+            store.load()
+        return store
+
+    def __len__(self) -> int:
+        with self._shared():
+            return len(self._alerts)
+
+    @contextmanager
+    def _shared(self, write: bool = False) -> Iterator[None]:
+        """Hold the store's lock over a state that includes every change saved to ``path``.
+
+        With ``write`` the file lock is held too, until the caller has saved
+        its change with ``_write``, so concurrent workers never overwrite each
+        other's alerts or hits.
+        """
+        with self._lock:
+            lock_fh = None
+            if write and self.path and fcntl is not None:
+                lock_fh = open(self.path + ".lock", "a")
+                fcntl.flock(lock_fh, fcntl.LOCK_EX)
+            try:
+                self._sync()
+                yield
+            finally:
+                if lock_fh is not None:
+                    lock_fh.close()  # releases the flock
+
+    def _file_state(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _sync(self) -> None:
+        """Reload from ``path`` if another process has replaced it since this one last read or wrote it."""
+        if not self.path:
+            return
+        state = self._file_state()
+        if state is not None and state != self._loaded:
+            self._read()
+
+    def create(
+        self,
+        max_price: float,
+        product_match_id: Optional[str] = None,
+        query: Optional[str] = None,
+        platform: Optional[str] = None,
+        alternatives: Optional[Dict[str, List[str]]] = None,
+    ) -> Alert:
+        """Store a new alert on one product or on the words of ``query`` (exactly one of them).
+
+        ``alternatives`` maps query words to other spellings that also match them.
+        """
+        if (product_match_id is None) == (not query or not tokenize(query)):
+            raise ValueError("An alert needs either a product_match_id or a query with at least one word")
+        if not max_price > 0:
+            raise ValueError("max_price must be a positive number")
+        alert = Alert(
+            alert_id=uuid.uuid4().hex[:12],
+            max_price=float(max_price),
+            product_match_id=product_match_id,
+            query=query.strip() if query else None,
+            platform=platform or None,
+            created=datetime.now().isoformat(timespec="seconds"),
+            alternatives=dict(alternatives or {}) if query else {},
+        )
+        with self._shared(write=True):
+            self._register(alert)
+            self._write()
+        return alert
+
+    def _register(self, alert: Alert) -> None:
+        self._alerts[alert.alert_id] = alert
+        self._hits.setdefault(alert.alert_id, deque(maxlen=self.keep_hits))
+        if alert.product_match_id is not None:
+            self._by_product.setdefault(alert.product_match_id, set()).add(alert.alert_id)
+        else:
+            for word in alert.key_words:
+                self._by_word.setdefault(word, set()).add(alert.alert_id)
+
+    def remove(self, alert_id: str) -> bool:
+        with self._shared(write=True):
+            alert = self._alerts.pop(alert_id, None)
+            if alert is None:
+                return False
+            self._hits.pop(alert_id, None)
+            index, keys = (
+                (self._by_product, [alert.product_match_id]) if alert.product_match_id is not None
+                else (self._by_word, alert.key_words)
+            )
+            for key in keys:
+                index[key].discard(alert_id)
+                if not index[key]:
+                    del index[key]
+            self._write()
+        return True
+
+    def get(self, alert_id: str) -> Optional[Alert]:
+        with self._shared():
+            return self._alerts.get(alert_id)
+
+    def alerts(self) -> List[Alert]:
+        with self._shared():
+            return sorted(self._alerts.values(), key=lambda alert: alert.created)
+
+    def recent_hits(self, alert_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """The alert's latest hits, newest first."""
+        with self._shared():
+            hits = list(self._hits.get(alert_id, ()))
+        return hits[::-1][:limit]
+
+    def evaluate(self, batch: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Check the rows of ``batch`` against the alerts they can concern; returns (and records) the hits."""
+        if not len(self) or batch.empty or "final_price" not in batch.columns:
+            return []
+        valid = batch["price_valid"] if "price_valid" in batch.columns else batch["final_price"].gt(0)
+        rows = batch[valid]
+        if rows.empty:
+            return []
+
+        with self._shared(write=True):
+            candidates: List[tuple] = []  # (alert_id, row label)
+            if self._by_product and "product_match_id" in rows.columns:
+                ids = rows["product_match_id"]
+                for label, match_id in ids[ids.isin(self._by_product.keys())].items():
+                    candidates.extend((alert_id, label) for alert_id in self._by_product[match_id])
+            row_words: Dict[Any, Set[str]] = {}
+            if self._by_word and "search_blob" in rows.columns:
+                words = rows["search_blob"].fillna("").str.lower().str.split().explode().dropna()
+                for label, word in words[words.isin(self._by_word.keys())].items():
+                    candidates.extend((alert_id, label) for alert_id in self._by_word[word])
+                if candidates:
+                    touched = {label for _, label in candidates}
+                    row_words = {label: set(group) for label, group in words[words.index.isin(touched)].groupby(level=0)}
+
+            best: Dict[str, Any] = {}
+            for alert_id, label in candidates:
+                alert = self._alerts[alert_id]
+                price = float(rows.at[label, "final_price"])
+                if price > alert.max_price:
+                    continue
+                if alert.platform and str(rows.at[label, "platform"]).lower() != alert.platform.lower():
+                    continue
+                if alert.variants and not alert.matches_words(row_words.get(label, set())):
+                    continue
+                if alert_id not in best or price < float(rows.at[best[alert_id], "final_price"]):
+                    best[alert_id] = label
+
+            hits = []
+            now = datetime.now().isoformat(timespec="seconds")
+            for alert_id, label in best.items():
+                row = rows.loc[label]
+                timestamp = row.get("timestamp")
+                hit = {
+                    "alert_id": alert_id,
+                    "row": _clean(label),
+                    "platform": _clean(row.get("platform")),
+                    "product": _clean(row.get("product title")),
+                    "product_match_id": _clean(row.get("product_match_id")),
+                    "final_price": round(float(row["final_price"]), 2),
+                    "date": timestamp.date().isoformat() if pd.notna(timestamp) else None,
+                    "notified": now,
+                }
+                alert = self._alerts[alert_id]
+                alert.hits += 1
+                alert.last_hit = now
+                self._hits[alert_id].append(hit)
+                hits.append(hit)
+            if hits:
+                self._write()
+        if hits:
+            logger.info("%d alerts triggered by a batch of %d rows", len(hits), len(batch))
+        return hits
+
+    def save(self) -> None:
+        """Write the alerts and their recent hits to ``path`` (no-op without one)."""
+        with self._shared(write=True):
+            self._write()
+
+    def load(self) -> None:
+        with self._lock:
+            count = self._read()
+        logger.info("Loaded %d alerts from %s", count, self.path)
+
+    def _write(self) -> None:
+        if not self.path:
+            return
+        payload = {
+            "version": STORE_FORMAT_VERSION,
+            "alerts": [
+                {**alert.to_dict(), "recent_hits": list(self._hits.get(alert.alert_id, ()))}
+                for alert in self._alerts.values()
+            ],
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp_path, self.path)
+        self._loaded = self._file_state()
+
+    def _read(self) -> int:
+        """Replace the in-memory alerts with the contents of ``path``; returns how many were read."""
+        state = self._file_state()
+        with open(self.path, encoding="utf-8") as fh:
+            payload = json.load(fh)
+        if payload.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Incompatible alert store format in {self.path}")
+        self._alerts, self._by_product, self._by_word, self._hits = {}, {}, {}, {}
+        for item in payload["alerts"]:
+            recent = item.pop("recent_hits", [])
+            alert = Alert(**item)
+            self._register(alert)
+            self._hits[alert.alert_id].extend(recent)
+        self._loaded = state
+        return len(payload["alerts"])
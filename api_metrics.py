@@ -0,0 +1,194 @@
+"""In-process latency histograms for the price API, rendered in Prometheus text format.
+
+Metrics live in the memory of each worker process; they are not shared
+between gunicorn workers. Every series is rendered with a ``worker`` label
+(the process id) so that series from different workers never merge, and a
+forked worker starts from empty metrics instead of a copy of the master's.
+A scrape of ``/api/metrics`` returns the numbers of whichever worker served
+it, so aggregate with ``sum without (worker) (rate(...))``, or run a single
+process with several threads when exact totals matter.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds; +Inf is implicit.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_labels(label_names: Tuple[str, ...], values: Tuple[str, ...], *extra: str) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, values)]
+    parts.extend(label for label in extra if label)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self, worker: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key, worker)} {_format_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last slot is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0]
+                self._series[key] = series
+            series[0][slot] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels: str) -> Optional[Dict[str, float]]:
+        """Return count and sum for one label set, or None if nothing was observed."""
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return None
+            return {"count": sum(series[0]), "sum": series[1]}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self, worker: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, worker, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key, worker)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List = []
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def clear(self) -> None:
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        # Resolved per render: the pid of a forked worker differs from the one at import.
+        worker = f'worker="{os.getpid()}"'
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render(worker))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=REGISTRY.clear)
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "price_api_stage_seconds",
+    "Time spent in each request stage.",
+    ("stage",),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "price_api_request_seconds",
+    "End-to-end request latency by route.",
+    ("endpoint",),
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    "price_api_requests_total",
+    "Requests served by route and HTTP status.",
+    ("endpoint", "status"),
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def stage_timer(stage: str):
+    """Context manager that records the wrapped block under ``price_api_stage_seconds``."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,281 @@
+"""Benchmark the price-comparison query path through Flask's test client.
+
+Builds synthetic Amazon/Flipkart datasets of increasing size, loads them the
+same way the API does, and times ``/api/price-comparison``, ``/api/filters``
+and ``/api/search`` for a fixed set of query shapes. Each search case also
+records how many rows it matched, so a query path that stops finding rows
+is reported rather than showing up as a speed-up: a count that differs from
+the baseline fails the run, and a case matching nothing is warned about.
+
+Usage:
+    python benchmarks/bench_price_api.py --sizes 1000,10000,100000
+    python benchmarks/bench_price_api.py --output bench.json --baseline previous.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+BRANDS = (
+    "Fire TV", "Amazon Basics", "Kindle", "Happy Belly", "Solimo", "Echo",
+    "Samsung", "boAt", "Mi", "Dove", "Nivea", "Himalaya", "Cadbury",
+    "Nestlé", "Harpic", "Surf Excel",
+)
+PRODUCTS = (
+    "Echo Dot", "Solimo Essential", "Kindle E-Reader", "Fire Stick",
+    "Happy Belly Snack", "Samsung 10000mAh Power Bank", "boAt Airdopes 131",
+    "Mi 3A Fast Charger", "Dove Intense Repair Shampoo",
+    "Nivea Soft Light Moisturizer", "Himalaya Neem Face Wash",
+    "Cadbury Dairy Milk Silk", "Nestle Maggi", "Harpic Bathroom Cleaner",
+    "Surf Excel Matic Detergent",
+)
+CATEGORIES = (
+    "Electronics", "Books", "Groceries", "Household", "Kitchen", "Beauty",
+)
+OFFERS = ("Limited time deal", "Bank offer", "No cost EMI", "")
+
+# (name, endpoint, query params)
+QUERY_CASES = (
+    ("short", "/api/price-comparison", {"q": "fire"}),
+    ("long", "/api/price-comparison", {"q": "samsung 10000mah power bank fast charging"}),
+    # Only the synonym list connects this spelling to the "boAt Airdopes 131" rows.
+    ("synonym", "/api/price-comparison", {"q": "bo-at airdopes one three one", "match": "all"}),
+    (
+        "filtered",
+        "/api/price-comparison",
+        {"q": "stick", "category": "Electronics", "start": "2024-08-01", "end": "2024-11-30"},
+    ),
+    ("no_match", "/api/price-comparison", {"q": "zzqxv"}),
+    ("filters", "/api/filters", {}),
+    ("search_short", "/api/search", {"q": "fire"}),
+    ("search_no_match", "/api/search", {"q": "zzqxv"}),
+)
+# Cases that should match nothing; any other search case matching zero rows gets a warning
+# (small datasets can legitimately leave a narrow case such as "filtered" empty).
+EXPECTED_EMPTY = frozenset({"no_match", "search_no_match"})
+
+
+def make_synthetic_dataset(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Generate a combined dataset with the same columns as datacleanning.py writes."""
+    rng = np.random.default_rng(seed)
+    product_idx = rng.integers(0, len(PRODUCTS), n_rows)
+    titles = np.array(PRODUCTS, dtype=object)[product_idx] + " " + rng.integers(1, 500, n_rows).astype(str).astype(object)
+    brands = np.array([p.split()[0] for p in PRODUCTS], dtype=object)[product_idx]
+    brands = np.where(rng.random(n_rows) < 0.5, brands, np.array(BRANDS, dtype=object)[rng.integers(0, len(BRANDS), n_rows)])
+    mrp = rng.integers(100, 5000, n_rows).astype(float)
+    price = np.round(mrp * rng.uniform(0.5, 1.0, n_rows))
+    platforms = np.where(rng.random(n_rows) < 0.5, "Amazon", "Flipkart")
+    start = np.datetime64("2023-01-01")
+    timestamps = start + rng.integers(0, 3 * 365, n_rows).astype("timedelta64[D]")
+
+    return pd.DataFrame(
+        {
+            "bb category": np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), n_rows)],
+            "product title": titles,
+            "product description": "This is a synthetic description for " + titles + ".",
+            "brand": brands,
+            "mrp": mrp,
+            "price": price,
+            "site name": np.where(platforms == "Amazon", "amazon_com", "flipkart_com"),
+            "offers": np.array(OFFERS, dtype=object)[rng.integers(0, len(OFFERS), n_rows)],
+            "combo offers": "",
+            "url": "https://example.com/product",
+            "timestamp": pd.to_datetime(timestamps),
+            "platform": platforms,
+            "final_price": price,
+        }
+    )
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence console output from the API modules while timing."""
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples) * 1000.0
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def _total_matches(response: Any) -> Optional[int]:
+    """Rows a search response matched (None for endpoints that are not searches)."""
+    body = response.get_json(silent=True) or {}
+    if "metadata" in body:
+        return body["metadata"].get("total_matches")
+    if "results" in body:
+        return len(body["results"])
+    return None
+
+
+def run_case(client: Any, endpoint: str, params: Dict[str, str], iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        client.get(endpoint, query_string=params)
+
+    latencies = []
+    status = None
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        response = client.get(endpoint, query_string=params)
+        latencies.append(time.perf_counter() - t0)
+        status = response.status_code
+    elapsed = time.perf_counter() - started
+
+    result = {"status": status, "total_matches": _total_matches(response), "iterations": iterations}
+    result.update(_percentiles(latencies))
+    result["throughput_rps"] = round(iterations / elapsed, 2) if elapsed > 0 else None
+    return result
+
+
+def run_size(n_rows: int, iterations: int, warmup: int, seed: int) -> List[Dict[str, Any]]:
+    with _quiet():
+        import price_api
+        import simple_api
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "combined.csv")
+        make_synthetic_dataset(n_rows, seed).to_csv(path, index=False)
+
+        load_started = time.perf_counter()
+        with _quiet():
+            flask_app = price_api.create_app(path)
+        load_seconds = time.perf_counter() - load_started
+        simple_api.df = pd.read_csv(path, parse_dates=["timestamp"])
+
+    clients = {
+        "/api/search": simple_api.app.test_client(),
+    }
+    default_client = flask_app.test_client()
+
+    results = []
+    for name, endpoint, params in QUERY_CASES:
+        client = clients.get(endpoint, default_client)
+        with _quiet():
+            case = run_case(client, endpoint, params, iterations, warmup)
+        case.update({"case": name, "endpoint": endpoint, "params": params, "rows": n_rows})
+        case["load_seconds"] = round(load_seconds, 3)
+        case["peak_rss_mb"] = _peak_rss_mb()
+        results.append(case)
+        print(
+            f"{n_rows:>9} rows  {name:<16} p50={case['p50_ms']:>9.2f}ms  "
+            f"p95={case['p95_ms']:>9.2f}ms  p99={case['p99_ms']:>9.2f}ms  "
+            f"{case['throughput_rps']:>8.1f} req/s  rss={case['peak_rss_mb']}MB  "
+            f"matches={case['total_matches']}"
+        )
+    return results
+
+
+def empty_cases(results: List[Dict[str, Any]]) -> List[str]:
+    """Return a message for every search case that should match rows but matched none."""
+    return [
+        f"{r['case']} @ {r['rows']} rows: matched 0 rows"
+        for r in results
+        if r["total_matches"] == 0 and r["case"] not in EXPECTED_EMPTY
+    ]
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Return a message for every case whose p95 regressed by more than ``tolerance`` or whose match count changed."""
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    previous = {(r["rows"], r["case"]): r for r in baseline.get("results", [])}
+
+    regressions = []
+    for current in results:
+        before = previous.get((current["rows"], current["case"]))
+        if not before:
+            continue
+        if before.get("total_matches") is not None and before["total_matches"] != current["total_matches"]:
+            regressions.append(
+                f"{current['case']} @ {current['rows']} rows: matches {before['total_matches']} -> "
+                f"{current['total_matches']}"
+            )
+        if not before.get("p95_ms"):
+            continue
+        change = (current["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        if change > tolerance:
+            regressions.append(
+                f"{current['case']} @ {current['rows']} rows: p95 {before['p95_ms']}ms -> "
+                f"{current['p95_ms']}ms (+{change:.0%})"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated row counts")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results: List[Dict[str, Any]] = []
+    for n_rows in sizes:
+        results.extend(run_size(n_rows, args.iterations, args.warmup, args.seed))
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    for message in empty_cases(results):
+        print(f"WARNING: {message}")
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION: {message}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
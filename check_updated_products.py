@@ -1,12 +1,15 @@
 """Check if the updated products are in the dataset"""
 import pandas as pd
 
+from term_stats import TermStats
+
 print("=" * 80)
 print("CHECKING UPDATED PRODUCTS IN DATASET")
 print("=" * 80)
 
 # Load dataset
 df = pd.read_csv('combined_amazon_flipkart_with_timestamps.csv')
+stats = TermStats.from_frame(df)
 
 # Brands to check
 brands_to_check = [
@@ -34,51 +37,45 @@ print("\n🔍 Checking Brands...")
 print("-" * 80)
 
 # Check brands
-for brand in brands_to_check:
-    amazon_matches = df[(df['platform'] == 'Amazon') & 
-                       (df['brand'].str.contains(brand, case=False, na=False))]
-    flipkart_matches = df[(df['platform'] == 'Flipkart') & 
-                         (df['brand'].str.contains(brand, case=False, na=False))]
+brand_counts = stats.contains(brands_to_check, 'brand').reindex(columns=['Amazon', 'Flipkart'], fill_value=0)
+for brand, counts in brand_counts.iterrows():
+    amazon_count, flipkart_count = counts['Amazon'], counts['Flipkart']
     
-    if len(amazon_matches) > 0 or len(flipkart_matches) > 0:
+    if amazon_count > 0 or flipkart_count > 0:
         print(f"✅ {brand}:")
-        print(f"   Amazon: {len(amazon_matches)} products")
-        print(f"   Flipkart: {len(flipkart_matches)} products")
-        if len(amazon_matches) > 0 and len(flipkart_matches) > 0:
+        print(f"   Amazon: {amazon_count} products")
+        print(f"   Flipkart: {flipkart_count} products")
+        if amazon_count > 0 and flipkart_count > 0:
             print(f"   ⭐ BOTH PLATFORMS - Perfect for comparison!")
         print()
 
 print("\n🔍 Checking Products...")
 print("-" * 80)
 
-# Check products
-for product in products_to_check:
-    # Search in product titles
-    amazon_matches = df[(df['platform'] == 'Amazon') & 
-                       (df['product title'].str.contains(product.split()[0], case=False, na=False))]
-    flipkart_matches = df[(df['platform'] == 'Flipkart') & 
-                         (df['product title'].str.contains(product.split()[0], case=False, na=False))]
-    
-    # Also check full product name
-    amazon_full = df[(df['platform'] == 'Amazon') & 
-                    (df['product title'].str.contains(product, case=False, na=False))]
-    flipkart_full = df[(df['platform'] == 'Flipkart') & 
-                      (df['product title'].str.contains(product, case=False, na=False))]
+# Check products: the full name, and failing that its first word
+full_counts = stats.contains(products_to_check, 'title').reindex(columns=['Amazon', 'Flipkart'], fill_value=0)
+first_words = [product.split()[0] for product in products_to_check]
+partial_counts = stats.contains(first_words, 'title').reindex(columns=['Amazon', 'Flipkart'], fill_value=0)
+titles = df['product title'].dropna()
+
+for product, first_word in zip(products_to_check, first_words):
+    amazon_full, flipkart_full = full_counts.loc[product, 'Amazon'], full_counts.loc[product, 'Flipkart']
+    amazon_partial, flipkart_partial = partial_counts.loc[first_word, 'Amazon'], partial_counts.loc[first_word, 'Flipkart']
     
-    if len(amazon_full) > 0 or len(flipkart_full) > 0:
+    if amazon_full > 0 or flipkart_full > 0:
         print(f"✅ {product}:")
-        print(f"   Amazon: {len(amazon_full)} exact matches")
-        print(f"   Flipkart: {len(flipkart_full)} exact matches")
-        if len(amazon_full) > 0 and len(flipkart_full) > 0:
+        print(f"   Amazon: {amazon_full} exact matches")
+        print(f"   Flipkart: {flipkart_full} exact matches")
+        if amazon_full > 0 and flipkart_full > 0:
             print(f"   ⭐ BOTH PLATFORMS - Perfect for comparison!")
-        elif len(amazon_full) > 0:
-            print(f"   Sample: {amazon_full.iloc[0]['product title'][:60]}")
-        elif len(flipkart_full) > 0:
-            print(f"   Sample: {flipkart_full.iloc[0]['product title'][:60]}")
-    elif len(amazon_matches) > 0 or len(flipkart_matches) > 0:
+        else:
+            platform = 'Amazon' if amazon_full > 0 else 'Flipkart'
+            sample = titles[(df['platform'] == platform) & titles.str.contains(product, case=False, regex=False)]
+            print(f"   Sample: {sample.iloc[0][:60]}")
+    elif amazon_partial > 0 or flipkart_partial > 0:
         print(f"⚠️  {product}:")
-        print(f"   Amazon: {len(amazon_matches)} partial matches")
-        print(f"   Flipkart: {len(flipkart_matches)} partial matches")
+        print(f"   Amazon: {amazon_partial} partial matches")
+        print(f"   Flipkart: {flipkart_partial} partial matches")
     print()
 
 # Summary
@@ -87,14 +84,11 @@ print("SUMMARY")
 print("=" * 80)
 
 # Count products by platform for common brands
-common_brands_found = []
-for brand in brands_to_check:
-    amazon_count = len(df[(df['platform'] == 'Amazon') & 
-                          (df['brand'].str.contains(brand, case=False, na=False))])
-    flipkart_count = len(df[(df['platform'] == 'Flipkart') & 
-                           (df['brand'].str.contains(brand, case=False, na=False))])
-    if amazon_count > 0 and flipkart_count > 0:
-        common_brands_found.append((brand, amazon_count, flipkart_count))
+common_brands_found = [
+    (brand, counts['Amazon'], counts['Flipkart'])
+    for brand, counts in brand_counts.iterrows()
+    if counts['Amazon'] > 0 and counts['Flipkart'] > 0
+]
 
 print(f"\n✅ Brands found in BOTH platforms: {len(common_brands_found)}")
 for brand, amazon_count, flipkart_count in common_brands_found:
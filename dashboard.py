@@ -1,76 +1,29 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import numpy as np
+import os
 from datetime import date
-from typing import Optional
+from typing import Optional, Tuple
+
+from dataset import read_raw
+from festive_windows import label_festive_events
+from partitions import MANIFEST_NAME, PartitionIndex, is_partitioned, partitions_path
+from rollups import RollupCube, build_cube
+from sources import as_platform_category
+from top_k import SORT_ORDERS, top_k_rows
 
 # ------------------------------
 # Helper utilities
 # ------------------------------
-FESTIVE_WINDOWS = [
-    {
-        "name": "Republic Day Specials",
-        "start": (1, 15),
-        "end": (1, 31),
-    },
-    {
-        "name": "Holi Dhamaka",
-        "start": (3, 1),
-        "end": (3, 15),
-    },
-    {
-        "name": "Summer Savings",
-        "start": (5, 1),
-        "end": (5, 15),
-    },
-    {
-        "name": "Independence Day Mega Deals",
-        "start": (8, 1),
-        "end": (8, 31),
-    },
-    {
-        "name": "Navratri Savings",
-        "start": (10, 1),
-        "end": (10, 20),
-    },
-    {
-        "name": "Diwali & Big Billion Days",
-        "start": (10, 21),
-        "end": (11, 15),
-    },
-    {
-        "name": "Black Friday & Cyber Week",
-        "start": (11, 16),
-        "end": (11, 30),
-    },
-    {
-        "name": "Christmas & New Year Offers",
-        "start": (12, 1),
-        "end": (12, 31),
-    },
-]
-
-
-def identify_festive_event(ts: Optional[pd.Timestamp]) -> Optional[str]:
-    if pd.isna(ts):
-        return None
-
-    current_date = ts.date()
-    for window in FESTIVE_WINDOWS:
-        start = date(current_date.year, *window["start"])
-        end = date(current_date.year, *window["end"])
-        if start <= current_date <= end:
-            return window["name"]
-    return None
-
-
 def build_platform_summary(filtered_df: pd.DataFrame) -> pd.DataFrame:
+    """Cheapest listing per platform, found with one groupby however many platforms there are."""
+    candidates = filtered_df.dropna(subset=["final_price"])
+    best_labels = candidates.groupby("platform", observed=True)["final_price"].idxmin()
     summary_rows = []
-    for platform, group in filtered_df.groupby("platform"):
-        if group.empty:
-            continue
-        best_row = group.loc[group["final_price"].idxmin()]
+    for platform, label in best_labels.items():
+        best_row = candidates.loc[label]
         summary_rows.append(
             {
                 "Platform": platform,
@@ -95,16 +48,73 @@ def build_platform_summary(filtered_df: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(summary_rows)
 
 
+PLATFORM_COLORS = px.colors.qualitative.Plotly
+
+
 # ------------------------------
 # Load dataset with timestamps
 # ------------------------------
-df = pd.read_csv("combined_amazon_flipkart_with_timestamps.csv", parse_dates=["timestamp"])
-for col in ["mrp", "price", "final_price"]:
-    df[col] = pd.to_numeric(df[col], errors="coerce")
+DATA_PATH = "combined_amazon_flipkart_with_timestamps.csv"
+# Prefer the month x platform partitioned copy written by datacleanning.py when present.
+if is_partitioned(partitions_path(DATA_PATH)):
+    DATA_PATH = partitions_path(DATA_PATH)
+
+# Bump when the derived columns below change so cached frames are rebuilt.
+DERIVED_VERSION = 3
+
+
+def file_fingerprint(path: str) -> Tuple[int, int]:
+    stat = os.stat(os.path.join(path, MANIFEST_NAME) if os.path.isdir(path) else path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@st.cache_resource(show_spinner="Loading dataset...", max_entries=2)
+def load_data(path: str, fingerprint: Tuple[int, int], version: int = DERIVED_VERSION) -> pd.DataFrame:
+    """Read the dataset and add derived columns. Cached until the file or DERIVED_VERSION changes."""
+    data = read_raw(path)
+    for col in ["mrp", "price", "final_price"]:
+        data[col] = pd.to_numeric(data[col], errors="coerce")
+
+    data["discount_pct"] = ((data["mrp"] - data["final_price"]) / data["mrp"]) * 100
+    data["discount_pct"] = data["discount_pct"].replace([np.inf, -np.inf], pd.NA)
+    data["platform"] = as_platform_category(data["platform"])
+    data["festive_event"] = label_festive_events(data["timestamp"])
+    data["month"] = data["timestamp"].dt.month_name()
+    data["year"] = data["timestamp"].dt.year
+    return data
+
 
-df["discount_pct"] = ((df["mrp"] - df["final_price"]) / df["mrp"]) * 100
-df["discount_pct"] = df["discount_pct"].replace([np.inf, -np.inf], pd.NA)
-df["festive_event"] = df["timestamp"].apply(identify_festive_event)
+@st.cache_resource(max_entries=2)
+def load_partitions(path: str, fingerprint: Tuple[int, int], version: int = DERIVED_VERSION) -> PartitionIndex:
+    """Row positions of the loaded frame per (month, platform) partition."""
+    return PartitionIndex.from_frame(load_data(path, fingerprint, version))
+
+
+@st.cache_resource(max_entries=16)
+def filter_by_date(
+    path: str, fingerprint: Tuple[int, int], start: date, end: date, version: int = DERIVED_VERSION
+) -> pd.DataFrame:
+    """Rows with start <= timestamp date <= end, cached per date range.
+
+    The returned frame is shared between reruns, so callers must not modify it.
+    """
+    data = load_data(path, fingerprint, version)
+    # Only months overlapping the range are taken; the day bounds are applied to those rows.
+    data = data.iloc[load_partitions(path, fingerprint, version).rows(start, end)]
+    lower = pd.Timestamp(start)
+    upper = pd.Timestamp(end) + pd.Timedelta(days=1)
+    return data[(data["timestamp"] >= lower) & (data["timestamp"] < upper)]
+
+
+@st.cache_resource(max_entries=2)
+def load_cube(path: str, fingerprint: Tuple[int, int], version: int = DERIVED_VERSION) -> RollupCube:
+    """Day x platform x category x festive window rollup used by the chart pages."""
+    return build_cube(load_data(path, fingerprint, version))
+
+
+fingerprint = file_fingerprint(DATA_PATH)
+df = load_data(DATA_PATH, fingerprint)
+cube = load_cube(DATA_PATH, fingerprint)
 
 st.sidebar.title("📊 Festival Season Price War Dashboard")
 page = st.sidebar.radio(
@@ -133,12 +143,9 @@ max_d = df["timestamp"].max().date()
 start_d = st.sidebar.date_input("Start Date", min_d, min_value=min_d, max_value=max_d)
 end_d = st.sidebar.date_input("End Date", max_d, min_value=min_d, max_value=max_d)
 
-# Filter dataset
-df = df[(df["timestamp"].dt.date >= start_d) & (df["timestamp"].dt.date <= end_d)]
-
-# Add month and year columns
-df["month"] = df["timestamp"].dt.month_name()
-df["year"] = df["timestamp"].dt.year
+# Filter dataset (month and year columns are added at load time)
+df = filter_by_date(DATA_PATH, fingerprint, start_d, end_d)
+cube = cube.slice(start_d, end_d)
 
 st.sidebar.info(f"📊 Showing data from **{start_d} → {end_d}**")
 
@@ -165,18 +172,29 @@ if page == "Overview":
 
 elif page == "Price Distribution":
     st.header("💰 Price Distribution: Amazon vs Flipkart")
-    fig = px.histogram(
-        df, x="final_price", color="platform", nbins=40,
-        barmode="overlay", opacity=0.7, title="Price Distribution by Platform"
+    # Bins are computed server-side from the cube so the figure stays small
+    hist = cube.histogram("platform", nbins=40)
+    fig = go.Figure()
+    for i, (platform, bins) in enumerate(hist.groupby("platform", observed=True)):
+        fig.add_bar(
+            x=(bins["bin_start"] + bins["bin_end"]) / 2,
+            y=bins["count"].round(),
+            width=bins["bin_end"] - bins["bin_start"],
+            name=str(platform),
+            marker_color=PLATFORM_COLORS[i % len(PLATFORM_COLORS)],
+            opacity=0.7,
+        )
+    fig.update_layout(
+        barmode="overlay", bargap=0, title="Price Distribution by Platform",
+        xaxis_title="final_price", yaxis_title="count", legend_title="platform",
     )
     st.plotly_chart(fig, use_container_width=True)
 
 elif page == "Monthly Trends":
     st.header("📆 Monthly Average Price Trend")
     monthly_avg = (
-        df.groupby(["year", "month", "platform"])["final_price"]
-        .mean()
-        .reset_index()
+        cube.aggregate(["year", "month_name", "platform"])
+        .rename(columns={"month_name": "month", "mean": "final_price"})
     )
     month_order = [
         "January","February","March","April","May","June",
@@ -200,7 +218,9 @@ elif page == "Monthly Trends":
 elif page == "Top Categories":
     st.header("🏷️ Top 10 Expensive Categories")
     if 'bb category' in df.columns:
-        cat_avg = df.groupby(['platform','bb category'])['final_price'].mean().reset_index()
+        cat_avg = cube.aggregate(['platform', 'category']).rename(
+            columns={'category': 'bb category', 'mean': 'final_price'}
+        )
         top_cats = cat_avg.sort_values('final_price', ascending=False).head(10)
         fig = px.bar(top_cats, x='bb category', y='final_price', color='platform',
                      title='Top 10 Expensive Categories')
@@ -210,14 +230,32 @@ elif page == "Top Categories":
 
 elif page == "Boxplots & Comparisons":
     st.header("📦 Price Comparison by Platform")
-    fig = px.box(df, x='platform', y='final_price', color='platform',
-                 title="Price Variation by Platform")
+    # Five-number summaries and a bounded outlier sample instead of every row
+    fig = go.Figure()
+    for i, stats in enumerate(cube.box_stats("platform", max_outliers=50)):
+        name = str(stats["platform"])
+        color = PLATFORM_COLORS[i % len(PLATFORM_COLORS)]
+        fig.add_trace(go.Box(
+            name=name, x=[name], q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+            lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]], mean=[stats["mean"]],
+            marker_color=color, boxpoints=False,
+        ))
+        if stats["outliers"]:
+            fig.add_scatter(
+                x=[name] * len(stats["outliers"]), y=stats["outliers"], mode="markers",
+                marker_color=color, showlegend=False, name=f"{name} outliers",
+            )
+    fig.update_layout(title="Price Variation by Platform", xaxis_title="platform", yaxis_title="final_price")
     st.plotly_chart(fig, use_container_width=True)
 
 elif page == "Heatmap Analysis":
     st.header("🔥 Category-wise Average Price (Heatmap)")
     if 'bb category' in df.columns:
-        pivot = df.groupby(['bb category','platform'])['final_price'].mean().unstack()
+        pivot = (
+            cube.aggregate(['category', 'platform'])
+            .pivot(index='category', columns='platform', values='mean')
+            .rename_axis(index='bb category')
+        )
         st.dataframe(pivot)
         fig = px.imshow(pivot, text_auto=True, color_continuous_scale='Blues',
                         title="Heatmap of Average Prices per Category")
@@ -266,19 +304,14 @@ elif page == "Product Comparison":
                         f"({best_row['Product Match']})."
                     )
 
-                if {"Amazon", "Flipkart"}.issubset(set(summary_df["Platform"].values)):
-                    amazon_price = pd.to_numeric(
-                        summary_df.loc[summary_df["Platform"] == "Amazon", "Best Final Price (₹)"], errors="coerce"
-                    ).iloc[0]
-                    flipkart_price = pd.to_numeric(
-                        summary_df.loc[summary_df["Platform"] == "Flipkart", "Best Final Price (₹)"], errors="coerce"
-                    ).iloc[0]
-                    if pd.notna(amazon_price) and pd.notna(flipkart_price):
-                        price_gap = abs(amazon_price - flipkart_price)
-                        cheaper_platform = "Amazon" if amazon_price < flipkart_price else "Flipkart"
-                        st.info(
-                            f"{cheaper_platform} is cheaper by ₹{price_gap:.2f} compared to the other platform for this search."
-                        )
+                ranked = summary_df.assign(price=price_series).dropna(subset=["price"]).sort_values("price", kind="stable")
+                if len(ranked) >= 2:
+                    cheapest, runner_up = ranked.iloc[0], ranked.iloc[1]
+                    price_gap = runner_up["price"] - cheapest["price"]
+                    st.info(
+                        f"{cheapest['Platform']} is cheaper by ₹{price_gap:.2f} than the next best platform "
+                        f"({runner_up['Platform']}) for this search."
+                    )
 
                 st.subheader("Detailed Matches")
                 detail_cols = [
@@ -294,7 +327,7 @@ elif page == "Product Comparison":
                     "festive_event",
                 ]
                 available_cols = [c for c in detail_cols if c in results.columns]
-                detailed_view = results.sort_values("final_price").head(20)[available_cols].rename(
+                detailed_view = top_k_rows(results, SORT_ORDERS["price"], 20)[available_cols].rename(
                     columns={
                         "timestamp": "Date",
                         "platform": "Platform",
@@ -1,9 +1,11 @@
 # -----------------------------------------------
 # Applied Data Science Project
-# Festival Season Price War: Amazon vs Flipkart
+# Festival Season Price War: Amazon vs Flipkart (and other marketplaces)
 # Dataset Cleaning, Preprocessing & EDA
 # -----------------------------------------------
 
+import os
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -12,86 +14,20 @@ from scipy import stats
 import random
 from datetime import datetime
 
+from parallel_ingest import ingest_sources
+from partitions import partitions_path
+from product_matching import ProductMatcher, load_matches, matches_path, save_matches
+from quantile_sketch import sidecar_path
+from sources import SOURCE_CONFIG, as_platform_category, load_source_config
+
 sns.set(style="whitegrid")
 plt.rcParams['figure.figsize'] = (12,6)
 
-# -----------------------------------------------
-# Step 1: Load Datasets
-# -----------------------------------------------
-amazon_df = pd.read_csv("synthetic_amazon_dataset_500_rows.csv")
-flipkart_df = pd.read_csv(
-    "marketing_sample_for_flipkart_com-ecommerce__20191101_20191130__15k_data.csv",
-    encoding='latin1',
-    on_bad_lines='skip'
-)
-
-# -----------------------------------------------
-# Step 2: Standardize Column Names
-# -----------------------------------------------
-amazon_df.columns = amazon_df.columns.str.lower()
-flipkart_df.columns = flipkart_df.columns.str.lower()
-
-# -----------------------------------------------
-# Step 3: Basic Overview
-# -----------------------------------------------
-print("----- Amazon Dataset Overview -----")
-print(amazon_df.info())
-print("\nAmazon Dataset Sample:\n", amazon_df.head())
-
-print("\n----- Flipkart Dataset Overview -----")
-print(flipkart_df.info())
-print("\nFlipkart Dataset Sample:\n", flipkart_df.head())
-
-# -----------------------------------------------
-# Step 4: Handle Missing Values
-# -----------------------------------------------
-numeric_cols_amazon = amazon_df.select_dtypes(include=np.number).columns.tolist()
-amazon_df[numeric_cols_amazon] = amazon_df[numeric_cols_amazon].fillna(amazon_df[numeric_cols_amazon].mean())
-
-numeric_cols_flipkart = flipkart_df.select_dtypes(include=np.number).columns.tolist()
-flipkart_df[numeric_cols_flipkart] = flipkart_df[numeric_cols_flipkart].fillna(flipkart_df[numeric_cols_flipkart].mean())
+COMBINED_PATH = "combined_amazon_flipkart_with_timestamps.csv"
 
-product_col_amazon = 'product title' if 'product title' in amazon_df.columns else ('product_name' if 'product_name' in amazon_df.columns else None)
-product_col_flipkart = 'product title' if 'product title' in flipkart_df.columns else ('product_name' if 'product_name' in flipkart_df.columns else None)
 
-if product_col_amazon:
-    amazon_df.dropna(subset=[product_col_amazon], inplace=True)
-if product_col_flipkart:
-    flipkart_df.dropna(subset=[product_col_flipkart], inplace=True)
-
-# -----------------------------------------------
-# Step 5: Remove Duplicates
 # -----------------------------------------------
-amazon_df.drop_duplicates(inplace=True)
-flipkart_df.drop_duplicates(inplace=True)
-print("\n✅ Duplicates removed successfully.")
-
-# -----------------------------------------------
-# Step 6: Handle Irrelevant Columns
-# -----------------------------------------------
-for col in ['uniq id', 'crawl timestamp']:
-    if col in flipkart_df.columns:
-        flipkart_df.drop(columns=[col], inplace=True)
-    if col in amazon_df.columns:
-        amazon_df.drop(columns=[col], inplace=True)
-
-# -----------------------------------------------
-# Step 7: Fix Price Columns
-# -----------------------------------------------
-if 'price' in flipkart_df.columns:
-    flipkart_price_col = 'price'
-elif 'mrp' in flipkart_df.columns:
-    flipkart_price_col = 'mrp'
-else:
-    raise ValueError("No price column found in Flipkart dataset!")
-
-if 'price' in amazon_df.columns:
-    amazon_df['price'] = amazon_df['price'].astype(str).str.replace(',', '').astype(float)
-
-flipkart_df[flipkart_price_col] = flipkart_df[flipkart_price_col].astype(str).str.replace(',', '').astype(float)
-
-# -----------------------------------------------
-# Step 7.5: Add Realistic Festival Timestamps
+# Realistic Festival Timestamps
 # -----------------------------------------------
 def generate_festival_weighted_dates(start, end, n):
     """Generate random dates emphasizing Indian festival months (Aug–Nov)."""
@@ -108,51 +44,109 @@ def generate_festival_weighted_dates(start, end, n):
         dates.append(datetime(year, month, day))
     return dates
 
-start_date = datetime(2023,1,1)
-end_date = datetime(2025,12,31)
-
-amazon_df['timestamp'] = generate_festival_weighted_dates(start_date, end_date, len(amazon_df))
-flipkart_df['timestamp'] = generate_festival_weighted_dates(start_date, end_date, len(flipkart_df))
 
-# -----------------------------------------------
-# Step 8: Save Cleaned Data
-# -----------------------------------------------
-amazon_df.to_csv("cleaned_amazon_data.csv", index=False)
-flipkart_df.to_csv("cleaned_flipkart_data.csv", index=False)
-print("\n🎯 Data cleaning completed successfully!")
-
-# -----------------------------------------------
-# Step 9: Combine Datasets
-# -----------------------------------------------
-amazon_df['platform'] = 'Amazon'
-flipkart_df['platform'] = 'Flipkart'
-
-combined_df = pd.concat([amazon_df, flipkart_df], ignore_index=True)
-
-combined_df['final_price'] = combined_df.apply(
-    lambda row: row['price'] if row['platform']=='Amazon' else row[flipkart_price_col], axis=1
-)
-
-combined_df.to_csv("combined_amazon_flipkart_with_timestamps.csv", index=False)
-print("\n✅ Combined dataset (with festival timestamps) saved as 'combined_amazon_flipkart_with_timestamps.csv'")
-print("Total records:", combined_df.shape[0])
-
-# -----------------------------------------------
-# Step 10: Statistical Comparison
-# -----------------------------------------------
-print("\n----- Descriptive Statistics for Final Price -----")
-desc_stats = combined_df.groupby('platform')['final_price'].agg(['mean','median','std']).reset_index()
-print(desc_stats)
-
-amazon_prices = combined_df[combined_df['platform']=='Amazon']['final_price']
-flipkart_prices = combined_df[combined_df['platform']=='Flipkart']['final_price']
-
-t_stat, p_value = stats.ttest_ind(amazon_prices, flipkart_prices, equal_var=False)
-print("\n----- T-Test Results -----")
-print(f"T-Statistic: {t_stat:.4f}")
-print(f"P-Value: {p_value:.4f}")
-alpha = 0.05
-if p_value < alpha:
-    print("✅ Significant price difference exists between Amazon & Flipkart.")
-else:
-    print("❌ No significant price difference found.")
+def add_festival_timestamps(df):
+    """Give every cleaned row a festival-weighted timestamp (runs in the ingest worker processes)."""
+    df['timestamp'] = generate_festival_weighted_dates(datetime(2023,1,1), datetime(2025,12,31), len(df))
+    return df
+
+
+def main():
+    # -----------------------------------------------
+    # Step 1: Load, Clean & Partition Datasets
+    # -----------------------------------------------
+    # Every marketplace is a Source in sources.py (files, read options, column
+    # mapping); more can be listed in sources.json. Each source file is cleaned
+    # in its own worker process (lower-cased column names, mean-filled numeric
+    # gaps, rows without a title dropped, duplicates and irrelevant columns
+    # removed, prices made numeric, festival timestamps added), saved as
+    # cleaned_<source>_data.csv and written straight into the month x platform
+    # partitions with its price quantile sketches. Combining is one manifest
+    # update plus a merge of the sketches.
+    if os.path.exists(SOURCE_CONFIG):
+        load_source_config(SOURCE_CONFIG)
+    partitioned, sketches = ingest_sources(
+        partitions_path(COMBINED_PATH),
+        transform=add_festival_timestamps,
+        cleaned_template="cleaned_{source}_data{part}.csv",
+    )
+    print(f"\n🎯 Data cleaning completed successfully! {partitioned.row_count} rows in "
+          f"{len(partitioned.fragments)} partitions under '{partitioned.root}'")
+
+    # -----------------------------------------------
+    # Step 2: Combine Datasets
+    # -----------------------------------------------
+    # Reading the partitions back is a concat of the fragment files; the
+    # platform column is categorical from here on.
+    combined_df = partitioned.read()
+    combined_df['platform'] = as_platform_category(combined_df['platform'])
+    platforms = list(combined_df['platform'].cat.categories)
+
+    # -----------------------------------------------
+    # Step 3: Basic Overview
+    # -----------------------------------------------
+    for name, source_df in combined_df.groupby('platform', observed=True):
+        print(f"\n----- {name} Dataset Overview -----")
+        print(source_df.info())
+        print(f"\n{name} Dataset Sample:\n", source_df.head())
+
+    combined_df.to_csv(COMBINED_PATH, index=False)
+    print(f"\n✅ Combined dataset (with festival timestamps) saved as '{COMBINED_PATH}'")
+    print("Total records:", combined_df.shape[0])
+
+    # -----------------------------------------------
+    # Step 4: Save Price Quantile Sketches
+    # -----------------------------------------------
+    # One mergeable sketch per (month, platform, category, festive window),
+    # built by the workers and saved next to the CSV so the API and later runs
+    # can answer percentile queries without rescanning rows.
+    sketches.save(sidecar_path(COMBINED_PATH))
+    sketches.save(sidecar_path(partitioned.root))
+    print(f"✅ Saved {len(sketches)} price quantile sketches")
+
+    # -----------------------------------------------
+    # Step 5: Match Products Across Platforms
+    # -----------------------------------------------
+    # Every listing gets a product_match_id shared with the same product on the
+    # other platform. Ids from the previous run are kept for unchanged groups.
+    try:
+        previous_matches = load_matches(matches_path(COMBINED_PATH))
+    except FileNotFoundError:
+        previous_matches = None
+    matches = ProductMatcher().match(combined_df, previous=previous_matches)
+    save_matches(matches, matches_path(COMBINED_PATH))
+    save_matches(matches, matches_path(partitioned.root))
+    matched_groups = matches.groupby("product_match_id")["platform"].nunique()
+    print(f"✅ Matched {int((matched_groups > 1).sum())} products across platforms ({len(matches)} listings)")
+
+    # -----------------------------------------------
+    # Step 6: Statistical Comparison
+    # -----------------------------------------------
+    print("\n----- Descriptive Statistics for Final Price -----")
+    desc_stats = combined_df.groupby('platform', observed=True)['final_price'].agg(['mean','median','std']).reset_index()
+    print(desc_stats)
+
+    print("\n----- Price Percentiles by Platform (from sketches) -----")
+    for row in sketches.summary(by="platform"):
+        print(f"{row['platform']}: p5={row['p5']:.2f} p25={row['p25']:.2f} p50={row['p50']:.2f} "
+              f"p75={row['p75']:.2f} p95={row['p95']:.2f}")
+
+    platform_prices = [prices for _, prices in combined_df.groupby('platform', observed=True)['final_price']]
+    if len(platform_prices) == 2:
+        test_name = "T-Test"
+        statistic, p_value = stats.ttest_ind(*platform_prices, equal_var=False)
+    else:
+        test_name = "One-Way ANOVA"
+        statistic, p_value = stats.f_oneway(*platform_prices)
+    print(f"\n----- {test_name} Results -----")
+    print(f"Statistic: {statistic:.4f}")
+    print(f"P-Value: {p_value:.4f}")
+    alpha = 0.05
+    if p_value < alpha:
+        print(f"✅ Significant price difference exists between {', '.join(platforms)}.")
+    else:
+        print("❌ No significant price difference found.")
+
+
+if __name__ == "__main__":
+    main()
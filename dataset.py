@@ -0,0 +1,173 @@
+"""Loading the combined multi-platform dataset and deriving the columns the API searches.
+
+The dataset is either the combined CSV or a partitioned directory written by
+``partitions.PartitionedDataset``.
+
+``derive_columns`` works on any frame with the raw CSV columns, so the full
+dataset and newly ingested batches go through exactly the same steps.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from festive_windows import label_festive_events
+from partitions import MANIFEST_NAME, PartitionedDataset
+from sources import as_platform_category
+
+logger = logging.getLogger("price_api.dataset")
+
+
+DATASET_PATH = "combined_amazon_flipkart_with_timestamps.csv"
+
+
+def read_raw(path: str) -> pd.DataFrame:
+    """The raw rows of a CSV file or of a partitioned dataset directory."""
+    if os.path.isdir(path):
+        return PartitionedDataset(path).read()
+    return pd.read_csv(path, parse_dates=["timestamp"])
+
+
+def dataset_mtime(path: str) -> float:
+    """Last modification of a dataset; for a partitioned one, of its manifest."""
+    if os.path.isdir(path):
+        return os.path.getmtime(os.path.join(path, MANIFEST_NAME))
+    return os.path.getmtime(path)
+
+
+def load_dataset(path: str = DATASET_PATH) -> pd.DataFrame:
+    try:
+        logger.info("Loading dataset from %s", path)
+        df = read_raw(path)
+        logger.info("Dataset loaded: %d rows, %d columns", len(df), len(df.columns))
+        logger.debug("Columns: %s", list(df.columns))
+
+        df = derive_columns(df)
+        logger.info("Dataset processing completed successfully")
+        return df
+    except FileNotFoundError:
+        logger.error(
+            "CSV file '%s' not found. Please make sure the file exists in the same directory as price_api.py",
+            path,
+        )
+        raise
+    except Exception:
+        logger.exception("Error loading dataset")
+        raise
+
+
+def derive_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize price columns and add discount_pct/discount_abs, validity flags, festive_event and search_blob."""
+    # Normalize column names (handle case variations)
+    df.columns = df.columns.str.strip()
+
+    if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    
+    # Try different possible column name variations
+    price_cols = []
+    for col in df.columns:
+        col_lower = col.lower()
+        if 'price' in col_lower and 'final' not in col_lower and 'mrp' not in col_lower:
+            price_cols.append(col)
+        elif 'final_price' in col_lower or 'final price' in col_lower:
+            if 'final_price' not in df.columns:
+                df['final_price'] = df[col]
+        elif 'mrp' in col_lower:
+            if 'mrp' not in df.columns:
+                df['mrp'] = df[col]
+
+    # Ensure required columns exist
+    if 'final_price' not in df.columns:
+        # Try to find price column
+        for col in df.columns:
+            if 'price' in col.lower() and 'final' not in col.lower():
+                df['final_price'] = df[col]
+                break
+    
+    if 'mrp' not in df.columns:
+        df['mrp'] = df.get('final_price', pd.Series([0] * len(df)))
+    
+    if 'price' not in df.columns:
+        df['price'] = df.get('final_price', pd.Series([0] * len(df)))
+
+    # Convert to numeric
+    for col in ("price", "final_price", "mrp"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    # Calculate discount once, already rounded the way responses show it
+    if 'mrp' in df.columns and 'final_price' in df.columns:
+        discount_abs = df["mrp"] - df["final_price"]
+        discount_pct = (discount_abs / df["mrp"]) * 100
+        df["discount_pct"] = discount_pct.replace([np.inf, -np.inf], np.nan).round(2)
+        df["discount_abs"] = discount_abs.round(2)
+        # Validity flags: a usable price, and a discount that can be trusted (positive MRP not below the price)
+        df["price_valid"] = df["final_price"].gt(0)
+        df["discount_valid"] = df["price_valid"] & df["mrp"].gt(0) & df["mrp"].ge(df["final_price"])
+    else:
+        df["discount_pct"] = np.nan
+        df["discount_abs"] = np.nan
+        df["price_valid"] = False
+        df["discount_valid"] = False
+
+    # Add festive event
+    if "festive_event" not in df.columns or df["festive_event"].isna().all():
+        if 'timestamp' in df.columns:
+            df["festive_event"] = label_festive_events(df["timestamp"])
+        else:
+            df["festive_event"] = None
+
+    # One categorical platform column: per-platform groupbys and keys cost the same for any number of sources
+    if "platform" in df.columns:
+        df["platform"] = as_platform_category(df["platform"])
+
+    # Create search blob
+    product_title_col = None
+    for col in df.columns:
+        if 'product' in col.lower() and 'title' in col.lower():
+            product_title_col = col
+            break
+    
+    product_desc_col = None
+    for col in df.columns:
+        if 'product' in col.lower() and 'description' in col.lower():
+            product_desc_col = col
+            break
+    
+    brand_col = None
+    for col in df.columns:
+        if col.lower() == 'brand':
+            brand_col = col
+            break
+
+    df["search_blob"] = (
+        df.get(product_title_col or "product title", pd.Series([""] * len(df)))
+        .fillna("")
+        .astype(str)
+        .str.cat(df.get(product_desc_col or "product description", pd.Series([""] * len(df))).fillna("").astype(str), sep=" ")
+        .str.cat(df.get(brand_col or "brand", pd.Series([""] * len(df))).fillna("").astype(str), sep=" ")
+    )
+    return df
+
+
+def find_category_column(columns) -> Optional[str]:
+    """'bb category' if present (common in this dataset), else any other 'category' column."""
+    for col in columns:
+        if 'bb category' in col.lower():
+            return col
+    for col in columns:
+        if 'category' in col.lower() and 'bb' not in col.lower():
+            return col
+    return None
+
+
+def find_brand_column(columns) -> Optional[str]:
+    for col in columns:
+        if col.lower() == 'brand':
+            return col
+    return None
@@ -0,0 +1,97 @@
+"""Festive "discounts" that follow an MRP increase.
+
+A festive discount is suspect when the MRP it is computed from was raised
+in the run-up to the sale. ``flag_fake_discounts`` compares every discounted
+listing inside a festive window with the last MRP of the same product on the
+same platform before the run-up began, ``pre_days`` before the window
+opened. The row is flagged when its MRP is more than ``tolerance`` above
+that baseline.
+
+All rows are resolved by a single ``merge_asof`` keyed by (product_match_id,
+platform) rather than by looping over products. The full history is flagged
+at load, and each ingested batch is flagged against the earlier rows of its
+own products.
+
+The flags are derived columns, like ``discount_pct``: they are not written
+to the dataset CSV or partitions. They depend on ``product_match_id``, which
+a full re-match can reassign, so stored flags could go stale. Recomputing
+them at load is one pass over the data.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from festive_windows import FESTIVE_WINDOWS
+from price_history import PRE_SALE_DAYS
+from sources import platform_labels
+
+FLAG_COLUMNS = ["baseline_mrp", "fake_discount"]
+# Columns ``flag_fake_discounts`` reads from the rows and the history.
+HISTORY_COLUMNS = ["product_match_id", "platform", "timestamp", "mrp"]
+MRP_TOLERANCE = 0.05
+SERIES_KEYS = ["product_match_id", "platform"]
+
+_START_MONTHS = {window["name"]: window["start"][0] for window in FESTIVE_WINDOWS}
+_START_DAYS = {window["name"]: window["start"][1] for window in FESTIVE_WINDOWS}
+
+
+def _series_keys(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "product_match_id": df["product_match_id"].astype(str),
+        "platform": platform_labels(df),
+    }, index=df.index)
+
+
+def flag_fake_discounts(
+    rows: pd.DataFrame,
+    history: Optional[pd.DataFrame] = None,
+    pre_days: int = PRE_SALE_DAYS,
+    tolerance: float = MRP_TOLERANCE,
+) -> pd.DataFrame:
+    """baseline_mrp and fake_discount for every row of ``rows`` (same index).
+
+    ``history`` (default: ``rows`` itself) supplies the earlier listings the
+    baselines come from. Rows outside festive windows, without a valid
+    discount or without an earlier listing of the product keep a missing
+    baseline and are not flagged.
+    """
+    flags = pd.DataFrame({"baseline_mrp": np.nan, "fake_discount": False}, index=rows.index)
+    history = rows if history is None else history
+    required = HISTORY_COLUMNS + ["festive_event", "discount_pct", "discount_valid"]
+    if rows.empty or history.empty or any(col not in rows.columns for col in required):
+        return flags
+
+    festive = rows["festive_event"]
+    candidates = rows[
+        festive.isin(_START_MONTHS) & rows["discount_valid"] & rows["discount_pct"].gt(0)
+        & rows["product_match_id"].notna() & rows["timestamp"].notna()
+    ]
+    earlier = history[history["mrp"].gt(0) & history["product_match_id"].notna() & history["timestamp"].notna()]
+    if candidates.empty or earlier.empty:
+        return flags
+
+    window_start = pd.to_datetime(pd.DataFrame({
+        "year": candidates["timestamp"].dt.year,
+        "month": candidates["festive_event"].map(_START_MONTHS),
+        "day": candidates["festive_event"].map(_START_DAYS),
+    }))
+    left = _series_keys(candidates).assign(
+        cutoff=(window_start - pd.Timedelta(days=pre_days)).astype("datetime64[ns]"),
+        mrp=candidates["mrp"].astype(float),
+        row=candidates.index,
+    ).sort_values("cutoff", kind="stable")
+    right = _series_keys(earlier).assign(
+        seen=earlier["timestamp"].astype("datetime64[ns]"),
+        baseline_mrp=earlier["mrp"].astype(float),
+    ).sort_values("seen", kind="stable")
+    # Last listing of the same product and platform strictly before the run-up.
+    merged = pd.merge_asof(
+        left, right, left_on="cutoff", right_on="seen", by=SERIES_KEYS, allow_exact_matches=False
+    ).set_index("row")
+
+    flags.loc[merged.index, "baseline_mrp"] = merged["baseline_mrp"]
+    flags.loc[merged.index, "fake_discount"] = (merged["mrp"] > merged["baseline_mrp"] * (1 + tolerance)).to_numpy()
+    return flags
@@ -0,0 +1,89 @@
+"""Best price of every matched product in every festive window, per platform.
+
+``FestiveDeals`` keeps one row per (product_match_id, festive_event,
+platform): the lowest valid final price, the row label of that listing and
+the number of listings. It is built with one groupby at load time, a new
+batch only re-resolves the keys it touches, and the table is sorted by key,
+so "when and where was this product cheapest during the sales" is an index
+lookup instead of a scan of the product's rows.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from sources import platform_labels
+
+DEAL_KEYS = ["product_match_id", "festive_event", "platform"]
+COLUMNS = ["best_price", "best_row", "listings"]
+
+
+def _empty() -> pd.DataFrame:
+    index = pd.MultiIndex.from_arrays([[], [], []], names=DEAL_KEYS)
+    return pd.DataFrame({"best_price": [], "best_row": [], "listings": []}, index=index).astype(
+        {"best_price": float, "best_row": np.int64, "listings": np.int64}
+    )
+
+
+def best_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """The deal table of ``df``: valid-priced rows inside a festive window, grouped by DEAL_KEYS."""
+    if df.empty or any(col not in df.columns for col in DEAL_KEYS + ["final_price"]):
+        return _empty()
+    valid = df["price_valid"] if "price_valid" in df.columns else df["final_price"].gt(0)
+    rows = df.loc[valid & df["festive_event"].notna() & df["product_match_id"].notna(), DEAL_KEYS + ["final_price"]]
+    if rows.empty:
+        return _empty()
+    rows = rows.assign(platform=platform_labels(rows))
+    # Cheapest first, so the first row of each group is its best listing.
+    rows = rows.sort_values("final_price", kind="stable")
+    best = rows[~rows.duplicated(DEAL_KEYS)]
+    table = pd.DataFrame({
+        "best_price": best["final_price"].to_numpy(dtype=float),
+        "best_row": best.index.to_numpy(dtype=np.int64),
+    }, index=pd.MultiIndex.from_frame(best[DEAL_KEYS]))
+    table["listings"] = rows.groupby(DEAL_KEYS).size().reindex(table.index).to_numpy(dtype=np.int64)
+    return table.sort_index()
+
+
+def merge_best_prices(table: pd.DataFrame, update: pd.DataFrame) -> pd.DataFrame:
+    """``table`` with the groups of ``update`` folded in (lower price wins, listings add up)."""
+    if update.empty:
+        return table
+    if table.empty:
+        return update
+    overlap = update.index.intersection(table.index)
+    if len(overlap):
+        old, new = table.loc[overlap], update.loc[overlap]
+        cheaper = new["best_price"] < old["best_price"]
+        merged = old.copy()
+        merged.loc[cheaper, ["best_price", "best_row"]] = new.loc[cheaper, ["best_price", "best_row"]]
+        merged["listings"] = old["listings"] + new["listings"]
+        update = pd.concat([update.drop(overlap), merged])
+        table = table.drop(overlap)
+    return pd.concat([table, update]).sort_index()
+
+
+class FestiveDeals:
+    def __init__(self, table: Optional[pd.DataFrame] = None) -> None:
+        self.table = table if table is not None else _empty()
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FestiveDeals":
+        return cls(best_prices(df))
+
+    def add(self, df: pd.DataFrame) -> None:
+        """Fold in the rows of ``df``; the table is replaced, never modified in place."""
+        self.table = merge_best_prices(self.table, best_prices(df))
+
+    def for_product(self, match_id: str) -> pd.DataFrame:
+        """festive_event, platform, best_price, best_row and listings of one product, cheapest first."""
+        try:
+            deals = self.table.xs(match_id, level="product_match_id").reset_index()
+        except KeyError:
+            return _empty().reset_index(level=0, drop=True).reset_index()
+        return deals.sort_values(["best_price", "festive_event"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,167 @@
+"""Festive-window price and discount statistics from load-time aggregates.
+
+``FestiveSummary`` keeps one cell per (festive_event, year, platform,
+category) holding:
+
+* the listing count;
+* the price and discount sums;
+* the highest price;
+* the cheapest listing;
+* a price histogram in the log buckets of ``quantile_sketch``.
+
+Only rows inside a festive window are counted. A query filters the cells
+and re-aggregates them by any of the keys. A question like "average discount
+per platform during Navratri vs Diwali, by year" then costs a groupby over a
+few hundred cells, however many rows were loaded. Medians come from the
+merged histograms and are within ``RELATIVE_ERROR`` of the true value. A new
+batch adds its own cells, so the summary never rescans the rows.
+"""
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataset import find_category_column
+from quantile_sketch import bucket_to_price, price_to_bucket
+from sources import platform_labels
+
+SUMMARY_KEYS = ["festive_event", "year", "platform", "category"]
+CELL_COLUMNS = ["count", "price_sum", "max_price", "discount_sum", "discount_count", "best_price", "best_row"]
+_AGGREGATIONS = {
+    "count": "sum",
+    "price_sum": "sum",
+    "max_price": "max",
+    "discount_sum": "sum",
+    "discount_count": "sum",
+    "best_price": "first",
+    "best_row": "first",
+}
+
+
+def _empty() -> Tuple[pd.DataFrame, pd.Series]:
+    index = pd.MultiIndex.from_arrays([[] for _ in SUMMARY_KEYS], names=SUMMARY_KEYS)
+    cells = pd.DataFrame({col: pd.Series(dtype=float) for col in CELL_COLUMNS}, index=index)
+    bucket_index = pd.MultiIndex.from_arrays([[] for _ in SUMMARY_KEYS + ["bucket"]], names=SUMMARY_KEYS + ["bucket"])
+    return cells, pd.Series(dtype=np.int64, index=bucket_index, name="count")
+
+
+def _combine(cells: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    """Cells re-aggregated by the ``by`` keys; the cheapest listing of each group wins (earlier rows on ties)."""
+    ordered = cells.sort_values("best_price", kind="stable")
+    return ordered.groupby(level=list(by), sort=True).agg(_AGGREGATIONS)
+
+
+def build_cells(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """Cell table and per-cell price bucket counts of the festive rows of ``df``."""
+    if df.empty or any(col not in df.columns for col in ("festive_event", "timestamp", "final_price")):
+        return _empty()
+    valid = df["price_valid"] if "price_valid" in df.columns else df["final_price"].gt(0)
+    rows = df[valid & df["festive_event"].notna() & df["timestamp"].notna()]
+    if rows.empty:
+        return _empty()
+
+    category_col = find_category_column(rows.columns)
+    discount = rows["discount_pct"].where(rows["discount_valid"]) if "discount_valid" in rows.columns else np.nan
+    frame = pd.DataFrame({
+        "festive_event": rows["festive_event"].astype(str),
+        "year": rows["timestamp"].dt.year.astype(np.int64),
+        "platform": platform_labels(rows),
+        "category": rows[category_col].fillna("").astype(str) if category_col else "",
+        "price": rows["final_price"].astype(float),
+        "discount": discount,
+        "row": rows.index.to_numpy(dtype=np.int64),
+    })
+    # Cheapest first, so the first row of each cell is its best listing.
+    frame = frame.sort_values("price", kind="stable")
+    cells = frame.groupby(SUMMARY_KEYS, sort=True).agg(
+        count=("price", "size"),
+        price_sum=("price", "sum"),
+        max_price=("price", "max"),
+        discount_sum=("discount", "sum"),
+        discount_count=("discount", "count"),
+        best_price=("price", "first"),
+        best_row=("row", "first"),
+    )
+    frame["bucket"] = price_to_bucket(frame["price"].to_numpy())
+    buckets = frame.groupby(SUMMARY_KEYS + ["bucket"], sort=True).size().rename("count")
+    return cells, buckets
+
+
+def _median_prices(buckets: pd.Series, by: Sequence[str]) -> pd.Series:
+    """Median price per ``by`` group from the merged bucket counts (not yet clamped to min/max)."""
+    counts = buckets.groupby(level=list(by) + ["bucket"], sort=True).sum().reset_index()
+    grouped = counts.groupby(list(by), sort=False)["count"]
+    cumulative = grouped.cumsum()
+    rank = (grouped.transform("sum") - 1) * 0.5
+    median_buckets = counts[cumulative > rank].groupby(list(by), sort=True)["bucket"].first()
+    return pd.Series(bucket_to_price(median_buckets.to_numpy()), index=median_buckets.index)
+
+
+class FestiveSummary:
+    def __init__(self, cells: Optional[pd.DataFrame] = None, buckets: Optional[pd.Series] = None) -> None:
+        if cells is None or buckets is None:
+            cells, buckets = _empty()
+        self.cells = cells
+        self.buckets = buckets
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FestiveSummary":
+        return cls(*build_cells(df))
+
+    def add(self, df: pd.DataFrame) -> None:
+        """Fold in the rows of ``df``; the tables are replaced, never modified in place."""
+        cells, buckets = build_cells(df)
+        if cells.empty:
+            return
+        if self.cells.empty:
+            self.cells, self.buckets = cells, buckets
+            return
+        merged_buckets = pd.concat([self.buckets, buckets]).groupby(level=SUMMARY_KEYS + ["bucket"]).sum()
+        self.cells, self.buckets = _combine(pd.concat([self.cells, cells]), SUMMARY_KEYS), merged_buckets
+
+    def query(
+        self,
+        by: Sequence[str] = SUMMARY_KEYS,
+        festive_events: Sequence[str] = (),
+        platforms: Sequence[str] = (),
+        categories: Sequence[str] = (),
+        years: Sequence[int] = (),
+    ) -> pd.DataFrame:
+        """Statistics per ``by`` group over the cells matching every filter (case-insensitive).
+
+        Columns: ``by`` keys, listings, mean_price, median_price,
+        mean_discount_pct (over listings with a valid discount), best_price,
+        best_row (row label of the cheapest listing).
+        """
+        cells, buckets = self.cells, self.buckets
+        columns = list(by) + [
+            "listings", "mean_price", "median_price", "mean_discount_pct", "best_price", "best_row"
+        ]
+        mask = np.ones(len(cells), dtype=bool)
+        for key, values in (("festive_event", festive_events), ("platform", platforms), ("category", categories)):
+            if values:
+                wanted = {str(value).strip().lower() for value in values}
+                mask &= cells.index.get_level_values(key).str.lower().isin(wanted)
+        if years:
+            mask &= cells.index.get_level_values("year").isin([int(year) for year in years])
+        cells = cells[mask]
+        if cells.empty:
+            return pd.DataFrame(columns=columns)
+
+        groups = _combine(cells, by)
+        selected = buckets[buckets.index.droplevel("bucket").isin(cells.index)]
+        median = _median_prices(selected, by).reindex(groups.index)
+        result = pd.DataFrame({
+            "listings": groups["count"].astype(np.int64),
+            "mean_price": groups["price_sum"] / groups["count"],
+            "median_price": median.clip(lower=groups["best_price"], upper=groups["max_price"]),
+            "mean_discount_pct": (groups["discount_sum"] / groups["discount_count"]).where(groups["discount_count"] > 0),
+            "best_price": groups["best_price"],
+            "best_row": groups["best_row"].astype(np.int64),
+        }, index=groups.index)
+        return result.reset_index()[columns]
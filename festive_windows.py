@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+FESTIVE_WINDOWS: Tuple[Dict[str, Any], ...] = (
+    {
+        "name": "Republic Day Specials",
+        "start": (1, 15),
+        "end": (1, 31),
+    },
+    {
+        "name": "Holi Dhamaka",
+        "start": (3, 1),
+        "end": (3, 15),
+    },
+    {
+        "name": "Summer Savings",
+        "start": (5, 1),
+        "end": (5, 15),
+    },
+    {
+        "name": "Independence Day Mega Deals",
+        "start": (8, 1),
+        "end": (8, 31),
+    },
+    {
+        "name": "Navratri Savings",
+        "start": (10, 1),
+        "end": (10, 20),
+    },
+    {
+        "name": "Diwali & Big Billion Days",
+        "start": (10, 21),
+        "end": (11, 15),
+    },
+    {
+        "name": "Black Friday & Cyber Week",
+        "start": (11, 16),
+        "end": (11, 30),
+    },
+    {
+        "name": "Christmas & New Year Offers",
+        "start": (12, 1),
+        "end": (12, 31),
+    },
+)
+
+
+def identify_festive_event(ts: Optional[pd.Timestamp]) -> Optional[str]:
+    if pd.isna(ts):
+        return None
+
+    current_date = ts.date()
+    for window in FESTIVE_WINDOWS:
+        start = date(current_date.year, *window["start"])
+        end = date(current_date.year, *window["end"])
+        if start <= current_date <= end:
+            return window["name"]
+    return None
+
+
+def label_festive_events(timestamps: pd.Series) -> pd.Series:
+    """Vectorized identify_festive_event() for a whole timestamp column."""
+    month_day = (timestamps.dt.month * 100 + timestamps.dt.day).to_numpy(dtype=float, na_value=np.nan)
+    conditions = [
+        (month_day >= w["start"][0] * 100 + w["start"][1]) & (month_day <= w["end"][0] * 100 + w["end"][1])
+        for w in FESTIVE_WINDOWS
+    ]
+    names = np.select(conditions, [w["name"] for w in FESTIVE_WINDOWS], default="")
+    return pd.Series(np.where(names == "", None, names), index=timestamps.index, dtype=object)
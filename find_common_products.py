@@ -1,5 +1,7 @@
 import pandas as pd
 
+from product_matching import ProductMatcher
+
 # Load dataset
 df = pd.read_csv('combined_amazon_flipkart_with_timestamps.csv')
 
@@ -60,40 +62,30 @@ flipkart_brands = set(flipkart['brand'].dropna().str.lower().unique())
 print("\nAmazon Brands:", sorted(list(amazon_brands)))
 print("\nTop Flipkart Brands:", sorted(list(flipkart_brands))[:20])
 
-# Find products that might match by searching for common words
+# Pair listings of the same product across platforms (brand blocking + MinHash/LSH)
+matches = ProductMatcher().match(df)
+platform_counts = matches.groupby('product_match_id')['platform'].nunique()
+common_ids = platform_counts[platform_counts > 1].index
+common = matches[matches['product_match_id'].isin(common_ids)]
+
+print("\n" + "=" * 80)
+print(f"MATCHED PRODUCTS: {len(common_ids)} products listed on more than one platform")
+print("=" * 80)
+
+# Most-listed matched products first
+popular = (
+    common.groupby('product_match_id')
+    .agg(rows=('rows', 'sum'), title=('title_key', 'first'))
+    .sort_values(['rows', 'title'], ascending=[False, True])
+)
+for match_id, row in popular.head(10).iterrows():
+    print(f"  {match_id}: {row['title']} ({row['rows']} listings)")
+
 print("\n" + "=" * 80)
 print("10 RECOMMENDED SEARCH TERMS:")
 print("=" * 80)
 
-recommendations = []
-
-# Check Amazon products
-for idx, row in amazon.iterrows():
-    if pd.notna(row['product title']):
-        title = str(row['product title']).lower()
-        # Check if any part of this title appears in Flipkart
-        words = title.split()
-        for word in words:
-            if len(word) > 3:  # Skip short words
-                flipkart_matches = flipkart[flipkart['product title'].str.contains(word, case=False, na=False)]
-                if len(flipkart_matches) > 0 and word not in [r.lower() for r in recommendations]:
-                    recommendations.append(word.title())
-                    if len(recommendations) >= 10:
-                        break
-        if len(recommendations) >= 10:
-            break
-
-if len(recommendations) < 10:
-    # Add some common Amazon product names
-    amazon_products = amazon['product title'].dropna().head(10)
-    for product in amazon_products:
-        # Extract main product name (first few words)
-        words = str(product).split()[:3]
-        search_term = ' '.join(words)
-        if search_term not in recommendations:
-            recommendations.append(search_term)
-        if len(recommendations) >= 10:
-            break
+recommendations = [title.title() for title in popular['title'].head(10)]
 
 print("\n1-10. Try searching for these terms:")
 for i, term in enumerate(recommendations[:10], 1):
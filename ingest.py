@@ -0,0 +1,121 @@
+"""Append a batch of new rows to the combined dataset.
+
+    python ingest.py new_rows.csv
+    python ingest.py new_rows.csv --api http://localhost:5000 --token $PRICE_API_INGEST_TOKEN
+    python ingest.py meesho_export.csv --source Meesho
+
+The batch is appended to the dataset CSV (columns aligned with its header), or
+written as new fragments of a partitioned dataset directory, and folded into
+the saved price sketches and product match table, so none of them is rebuilt.
+With ``--api`` the same batch is also POSTed to /api/ingest so a running
+server picks it up without a restart. ``--source`` takes a raw export of one
+registered marketplace (see sources.py) and maps its columns first.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import urllib.request
+from typing import Optional
+
+import pandas as pd
+
+from dataset import DATASET_PATH, dataset_mtime, derive_columns
+from partitions import PartitionedDataset
+from product_matching import ProductMatcher, load_matches, matches_path, save_matches
+from quantile_sketch import SketchStore, sidecar_path
+from sources import SOURCE_CONFIG, SOURCES, load_source_config
+
+
+def read_batch(path: str, source: Optional[str] = None) -> pd.DataFrame:
+    """Rows of a batch CSV; with ``source``, a raw export of that platform mapped onto the dataset columns."""
+    if source is None:
+        return pd.read_csv(path, parse_dates=["timestamp"])
+    registered = SOURCES[source]
+    batch = registered.prepare(registered.read(path))
+    if "timestamp" in batch.columns:
+        batch["timestamp"] = pd.to_datetime(batch["timestamp"], errors="coerce")
+    return batch
+
+
+def append_to_dataset(batch: pd.DataFrame, dataset_path: str = DATASET_PATH) -> int:
+    """Append ``batch`` to the dataset and its sketch store; returns the rows written."""
+    partitioned = PartitionedDataset(dataset_path) if os.path.isdir(dataset_path) else None
+    header = partitioned.manifest["columns"] if partitioned else pd.read_csv(dataset_path, nrows=0).columns
+    extra = [col for col in batch.columns if col not in header]
+    if extra:
+        print(f"⚠️  Dropping columns not in {dataset_path}: {extra}")
+
+    def is_current(path: str) -> bool:
+        return os.path.exists(path) and os.path.getmtime(path) >= dataset_mtime(dataset_path)
+
+    store_path = sidecar_path(dataset_path)
+    store = SketchStore.load(store_path) if is_current(store_path) else None
+    table_path = matches_path(dataset_path)
+    matches = load_matches(table_path) if is_current(table_path) else None
+
+    if partitioned:
+        added = partitioned.append(batch)
+        print(f"🗂  Wrote {len(added)} new partition fragments")
+    else:
+        batch.reindex(columns=header).to_csv(dataset_path, mode="a", header=False, index=False)
+
+    if store is not None:
+        store.add_frame(derive_columns(batch.copy()))
+        store.save(store_path)
+    else:
+        print(f"⚠️  {store_path} is missing or stale; the API will rebuild it on the next start")
+
+    if matches is not None:
+        matches, _ = ProductMatcher().extend(matches, batch)
+        save_matches(matches, table_path)
+    else:
+        print(f"⚠️  {table_path} is missing or stale; the API will re-match products on the next start")
+    return len(batch)
+
+
+def push_to_api(body: bytes, api_url: str, token: str) -> str:
+    req = urllib.request.Request(
+        api_url.rstrip("/") + "/api/ingest",
+        data=body,
+        method="POST",
+        headers={"Content-Type": "text/csv", "X-Ingest-Token": token},
+    )
+    with urllib.request.urlopen(req, timeout=60) as response:
+        return response.read().decode("utf-8")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("batch", help="CSV file with the new rows (same columns as the dataset)")
+    parser.add_argument("--dataset", default=DATASET_PATH, help="combined dataset CSV or partition directory")
+    parser.add_argument("--source", help="registered marketplace the batch is a raw export of, e.g. Meesho")
+    parser.add_argument("--api", help="base URL of a running price API to notify, e.g. http://localhost:5000")
+    parser.add_argument("--token", default=os.environ.get("PRICE_API_INGEST_TOKEN", ""), help="ingest token for --api")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(SOURCE_CONFIG):
+        load_source_config(SOURCE_CONFIG)
+    if args.source is not None and args.source not in SOURCES:
+        parser.error(f"unknown source '{args.source}'; registered: {', '.join(SOURCES)}")
+    batch = read_batch(args.batch, args.source)
+    if batch.empty:
+        print("No rows in batch, nothing to do")
+        return 0
+
+    written = append_to_dataset(batch, args.dataset)
+    print(f"✅ Appended {written} rows to {args.dataset}")
+
+    if args.api:
+        if args.source is None:
+            with open(args.batch, "rb") as fh:
+                body = fh.read()
+        else:
+            body = batch.to_csv(index=False).encode("utf-8")
+        print(f"📡 {push_to_api(body, args.api, args.token)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
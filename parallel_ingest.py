@@ -0,0 +1,121 @@
+"""Clean every source file in a process pool and write the partitioned dataset directly.
+
+Each worker process takes one export file of one registered source (see
+``sources.py``). It cleans and maps the file with ``Source.prepare``, applies
+an optional ``transform``, and writes the rows as partition fragments under
+the dataset root with ``partitions.write_fragments``. It also builds a price
+sketch store of the same rows. Only the fragment entries and the sketches go
+back to the parent. The parent publishes all fragments in one manifest
+update and merges the sketches, so wall-clock time follows the number of
+cores rather than the number of files.
+
+Rows are cleaned per file: mean-filling and duplicate removal apply within
+each file. ``transform`` is sent to the workers, so it must be a module-level
+function.
+"""
+from __future__ import annotations
+
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from partitions import DEFAULT_FORMAT, PartitionedDataset, write_fragments
+from quantile_sketch import SketchStore
+from sources import SOURCES, Source
+
+Transform = Callable[[pd.DataFrame], pd.DataFrame]
+
+
+@dataclass
+class FileTask:
+    source: Source
+    path: str
+    # Fragment file name prefix, unique per task so workers never write the same file.
+    prefix: str
+    cleaned_path: Optional[str] = None
+
+
+def file_tasks(sources: Iterable[Source], cleaned_template: Optional[str] = None) -> List[FileTask]:
+    """One task per export file of each source.
+
+    ``cleaned_template`` (e.g. ``"cleaned_{source}_data{part}.csv"``) also
+    keeps each cleaned file; ``part`` is empty for single-file sources.
+    """
+    tasks = []
+    for source_number, source in enumerate(sources):
+        paths = source.files()
+        for file_number, path in enumerate(paths):
+            cleaned_path = None
+            if cleaned_template:
+                part = f"-{file_number:03d}" if len(paths) > 1 else ""
+                cleaned_path = cleaned_template.format(source=source.name.lower(), part=part)
+            tasks.append(FileTask(source, path, f"part-{source_number:03d}-{file_number:05d}", cleaned_path))
+    return tasks
+
+
+def _clean_file(source: Source, frame: pd.DataFrame, transform: Optional[Transform]) -> pd.DataFrame:
+    frame = source.prepare(frame)
+    return transform(frame) if transform is not None else frame
+
+
+def dataset_columns(tasks: Iterable[FileTask], transform: Optional[Transform] = None) -> List[str]:
+    """Columns of the combined dataset, in order of appearance, from the header of every file."""
+    columns: List[str] = []
+    for task in tasks:
+        header = pd.read_csv(task.path, nrows=0, **task.source.read_options)
+        for col in _clean_file(task.source, header, transform).columns:
+            if str(col) not in columns:
+                columns.append(str(col))
+    return columns
+
+
+def ingest_file(
+    task: FileTask, root: str, columns: List[str], file_format: str, transform: Optional[Transform]
+) -> Tuple[List[dict], SketchStore]:
+    """Clean one file and write its fragments under ``root`` (unpublished); returns them and its sketches."""
+    frame = _clean_file(task.source, task.source.read(task.path), transform)
+    if "timestamp" in frame.columns:
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], errors="coerce")
+    if task.cleaned_path:
+        frame.to_csv(task.cleaned_path, index=False)
+    frame = frame.reindex(columns=columns)
+    return write_fragments(root, frame, task.prefix, file_format), SketchStore.from_frame(frame)
+
+
+def ingest_sources(
+    root: str,
+    names: Optional[Iterable[str]] = None,
+    processes: Optional[int] = None,
+    transform: Optional[Transform] = None,
+    cleaned_template: Optional[str] = None,
+    file_format: str = DEFAULT_FORMAT,
+) -> Tuple[PartitionedDataset, SketchStore]:
+    """Build the partitioned dataset under ``root`` from the named (default: all) sources, one process per file.
+
+    Any existing dataset under ``root`` is replaced. Returns the dataset and
+    the merged price sketches of all its rows.
+    """
+    sources = [SOURCES[name] for name in names] if names is not None else list(SOURCES.values())
+    tasks = file_tasks(sources, cleaned_template)
+    if not tasks:
+        raise FileNotFoundError("No source files to ingest")
+    columns = dataset_columns(tasks, transform)
+    dataset = PartitionedDataset.create(root, columns, file_format)
+
+    worker = partial(ingest_file, root=root, columns=columns, file_format=file_format, transform=transform)
+    fragments: List[dict] = []
+    sketches = SketchStore()
+    workers = min(processes or os.cpu_count() or 1, len(tasks))
+    # Reseed in every worker; forked workers would otherwise repeat the parent's random sequence.
+    with ProcessPoolExecutor(max_workers=workers, initializer=random.seed) as pool:
+        for file_fragments, file_sketches in pool.map(worker, tasks):
+            fragments.extend(file_fragments)
+            sketches.merge(file_sketches)
+    # The combine step: one manifest update makes every fragment visible at once.
+    dataset.publish(fragments)
+    return dataset, sketches
@@ -0,0 +1,329 @@
+"""Month x platform partitioning of the combined dataset.
+
+On disk, ``PartitionedDataset`` keeps the rows in one directory per partition:
+
+    <root>/month=2024-10/platform=Amazon/part-00000.parquet
+    <root>/manifest.json
+
+The manifest lists every fragment file with its row count and min/max
+timestamp and final price, so a date-filtered read opens only the fragments
+that overlap the window, and an append writes new fragment files plus a new
+manifest without touching existing ones. Fragments are Parquet when pyarrow is
+installed and CSV otherwise. ``write_fragments`` lets several processes write
+fragments side by side; publishing them is then a single manifest update.
+
+In memory, ``PartitionIndex`` maps the same (month, platform) keys to row
+labels of a loaded frame, so the API and dashboard can take the rows of the
+overlapping months instead of comparing every timestamp.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from sources import platform_labels
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # pragma: no cover - depends on the environment
+    DEFAULT_FORMAT = "csv"
+else:
+    DEFAULT_FORMAT = "parquet"
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+UNKNOWN = "unknown"
+
+DateLike = Union[str, date, pd.Timestamp, None]
+PartitionKey = Tuple[str, str]
+
+
+def partitions_path(dataset_path: str) -> str:
+    """Directory holding the partitioned copy of a CSV dataset."""
+    root, _ = os.path.splitext(dataset_path)
+    return root + ".partitions"
+
+
+def is_partitioned(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def partition_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """month ("YYYY-MM") and platform of each row; missing values become "unknown"."""
+    timestamps = pd.to_datetime(df["timestamp"], errors="coerce") if "timestamp" in df.columns else None
+    if timestamps is None:
+        month = pd.Series(UNKNOWN, index=df.index)
+    else:
+        month = timestamps.dt.strftime("%Y-%m").fillna(UNKNOWN)
+    platform = platform_labels(df, UNKNOWN)
+    return pd.DataFrame({"month": month, "platform": platform}, index=df.index)
+
+
+def _month_bounds(start: DateLike, end: DateLike) -> Tuple[Optional[str], Optional[str]]:
+    start_month = pd.Timestamp(start).strftime("%Y-%m") if start is not None else None
+    end_month = pd.Timestamp(end).strftime("%Y-%m") if end is not None else None
+    return start_month, end_month
+
+
+def _month_selected(month: str, start_month: Optional[str], end_month: Optional[str]) -> bool:
+    if start_month is None and end_month is None:
+        return True
+    if month == UNKNOWN:
+        # Rows without a timestamp never pass a date filter.
+        return False
+    if start_month is not None and month < start_month:
+        return False
+    if end_month is not None and month > end_month:
+        return False
+    return True
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", value) or UNKNOWN
+
+
+class PartitionedDataset:
+    """Fragment files plus manifest under ``root``. Single writer at a time."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.manifest: Dict[str, Any] = {
+            "version": MANIFEST_VERSION,
+            "format": DEFAULT_FORMAT,
+            "columns": [],
+            "fragments": [],
+        }
+        manifest_path = os.path.join(root, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as fh:
+                manifest = json.load(fh)
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise ValueError(f"Unsupported partition manifest version in {manifest_path}")
+            self.manifest = manifest
+
+    @property
+    def fragments(self) -> List[Dict[str, Any]]:
+        return self.manifest["fragments"]
+
+    @property
+    def row_count(self) -> int:
+        return sum(fragment["rows"] for fragment in self.fragments)
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    @classmethod
+    def create(cls, root: str, columns: Sequence[str], file_format: str = DEFAULT_FORMAT) -> "PartitionedDataset":
+        """An empty partitioned dataset with ``columns``, replacing any existing one under ``root``."""
+        if os.path.isdir(root):
+            for name in os.listdir(root):
+                if name.startswith("month="):
+                    shutil.rmtree(os.path.join(root, name))
+            if os.path.exists(os.path.join(root, MANIFEST_NAME)):
+                os.remove(os.path.join(root, MANIFEST_NAME))
+        os.makedirs(root, exist_ok=True)
+        dataset = cls(root)
+        dataset.manifest["format"] = file_format
+        dataset.manifest["columns"] = [str(col) for col in columns]
+        return dataset
+
+    @classmethod
+    def write(cls, df: pd.DataFrame, root: str, file_format: str = DEFAULT_FORMAT) -> "PartitionedDataset":
+        """Write ``df`` as a fresh partitioned dataset, replacing any existing one under ``root``."""
+        dataset = cls.create(root, df.columns, file_format)
+        dataset.append(df)
+        return dataset
+
+    def append(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Write ``df`` as new fragment files and publish them in the manifest.
+
+        Existing fragments are never rewritten; the new manifest replaces the
+        old one atomically, so readers see either none or all of the batch.
+        """
+        if df.empty:
+            return []
+        if not self.manifest["columns"]:
+            self.manifest["columns"] = [str(col) for col in df.columns]
+        rows = df.reindex(columns=self.manifest["columns"])
+        keys = partition_keys(rows)
+        # Fragments are numbered per directory, so appends never overwrite a file.
+        existing: Dict[PartitionKey, int] = {}
+        for fragment in self.fragments:
+            key = (fragment["month"], _safe_name(fragment["platform"]))
+            existing[key] = existing.get(key, 0) + 1
+
+        added = []
+        file_format = self.manifest["format"]
+        for (month, platform), part in rows.groupby([keys["month"], keys["platform"]], sort=True):
+            key = (month, _safe_name(platform))
+            number = existing.get(key, 0)
+            existing[key] = number + 1
+            added.append(_write_fragment(self.root, part, month, platform, f"part-{number:05d}.{file_format}"))
+        return self.publish(added)
+
+    def publish(self, fragments: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add fragment files already written under ``root`` (see ``write_fragments``) to the manifest."""
+        fragments = list(fragments)
+        self.manifest["fragments"] = self.fragments + fragments
+        self._save_manifest()
+        return fragments
+
+    def _save_manifest(self) -> None:
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.manifest, fh, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def prune(
+        self,
+        start: DateLike = None,
+        end: DateLike = None,
+        platforms: Optional[Iterable[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Fragments that may hold rows within the given timestamp/price bounds and platforms."""
+        lower = pd.Timestamp(start) if start is not None else None
+        # ``end`` is an inclusive date: anything before the next midnight overlaps.
+        upper = pd.Timestamp(end) + pd.Timedelta(days=1) if end is not None else None
+        wanted = {p.lower() for p in platforms} if platforms else None
+
+        selected = []
+        for fragment in self.fragments:
+            if wanted is not None and fragment["platform"].lower() not in wanted:
+                continue
+            if lower is not None or upper is not None:
+                if fragment["min_timestamp"] is None:
+                    continue
+                if lower is not None and pd.Timestamp(fragment["max_timestamp"]) < lower:
+                    continue
+                if upper is not None and pd.Timestamp(fragment["min_timestamp"]) >= upper:
+                    continue
+            if min_price is not None and (fragment["max_price"] is None or fragment["max_price"] < min_price):
+                continue
+            if max_price is not None and (fragment["min_price"] is None or fragment["min_price"] > max_price):
+                continue
+            selected.append(fragment)
+        return selected
+
+    def read(
+        self,
+        start: DateLike = None,
+        end: DateLike = None,
+        platforms: Optional[Iterable[str]] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """Rows of the fragments overlapping the filters (whole fragments; callers filter rows exactly)."""
+        frames = [self._read_fragment(fragment, columns) for fragment in self.prune(start, end, platforms)]
+        if not frames:
+            return pd.DataFrame(columns=list(columns or self.manifest["columns"]))
+        return pd.concat(frames, ignore_index=True)
+
+    def _read_fragment(self, fragment: Dict[str, Any], columns: Optional[Sequence[str]]) -> pd.DataFrame:
+        path = os.path.join(self.root, fragment["path"])
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path, columns=list(columns) if columns else None)
+        parse_dates = ["timestamp"] if columns is None or "timestamp" in columns else None
+        return pd.read_csv(path, usecols=list(columns) if columns else None, parse_dates=parse_dates)
+
+
+def _write_fragment(root: str, part: pd.DataFrame, month: str, platform: str, name: str) -> Dict[str, Any]:
+    """Write one fragment file and return its manifest entry."""
+    relative = os.path.join(f"month={month}", f"platform={_safe_name(platform)}", name)
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if name.endswith(".parquet"):
+        part.to_parquet(path, index=False)
+    else:
+        part.to_csv(path, index=False)
+
+    timestamps = pd.to_datetime(part["timestamp"], errors="coerce") if "timestamp" in part.columns else None
+    prices = pd.to_numeric(part["final_price"], errors="coerce") if "final_price" in part.columns else None
+
+    def stat(values: Optional[pd.Series], how: str) -> Any:
+        if values is None or values.isna().all():
+            return None
+        value = getattr(values, how)()
+        return value.isoformat() if isinstance(value, pd.Timestamp) else float(value)
+
+    return {
+        "month": month,
+        "platform": platform,
+        "path": relative.replace(os.sep, "/"),
+        "rows": int(len(part)),
+        "min_timestamp": stat(timestamps, "min"),
+        "max_timestamp": stat(timestamps, "max"),
+        "min_price": stat(prices, "min"),
+        "max_price": stat(prices, "max"),
+    }
+
+
+def write_fragments(
+    root: str, df: pd.DataFrame, prefix: str, file_format: str = DEFAULT_FORMAT
+) -> List[Dict[str, Any]]:
+    """Write ``df`` as one fragment per (month, platform) under ``root`` without touching the manifest.
+
+    Fragment files are named ``<prefix>.<format>``, so processes writing the
+    same dataset at once only need distinct prefixes. The returned entries
+    become visible when passed to ``PartitionedDataset.publish``.
+    """
+    if df.empty:
+        return []
+    keys = partition_keys(df)
+    return [
+        _write_fragment(root, part, month, platform, f"{prefix}.{file_format}")
+        for (month, platform), part in df.groupby([keys["month"], keys["platform"]], sort=True)
+    ]
+
+
+class PartitionIndex:
+    """Row labels of a loaded frame grouped by (month, platform)."""
+
+    def __init__(self) -> None:
+        self._rows: Dict[PartitionKey, List[np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PartitionIndex":
+        index = cls()
+        index.add(df)
+        return index
+
+    def add(self, df: pd.DataFrame) -> None:
+        """Register the rows of ``df`` under their index labels."""
+        if df.empty:
+            return
+        keys = partition_keys(df)
+        labels = pd.Series(df.index.to_numpy(dtype=np.int64), index=df.index)
+        for key, group in labels.groupby([keys["month"], keys["platform"]], sort=False):
+            self._rows.setdefault(key, []).append(group.to_numpy())
+
+    def partitions(self) -> List[PartitionKey]:
+        return sorted(self._rows)
+
+    def rows(
+        self, start: DateLike = None, end: DateLike = None, platforms: Optional[Iterable[str]] = None
+    ) -> np.ndarray:
+        """Sorted labels of the rows in months overlapping [start, end] (and ``platforms``, if given)."""
+        start_month, end_month = _month_bounds(start, end)
+        wanted = {p.lower() for p in platforms} if platforms else None
+        arrays = [
+            array
+            for (month, platform), chunks in list(self._rows.items())
+            if _month_selected(month, start_month, end_month)
+            and (wanted is None or platform.lower() in wanted)
+            for array in chunks
+        ]
+        if not arrays:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(arrays))
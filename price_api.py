@@ -1,184 +1,273 @@
 from __future__ import annotations
 
+import hmac
+import io
+import json
+import logging
 import math
+import os
+import re
+import threading
+import time
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, g, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
-
-FESTIVE_WINDOWS: Tuple[Dict[str, Any], ...] = (
-    {
-        "name": "Republic Day Specials",
-        "start": (1, 15),
-        "end": (1, 31),
-    },
-    {
-        "name": "Holi Dhamaka",
-        "start": (3, 1),
-        "end": (3, 15),
-    },
-    {
-        "name": "Summer Savings",
-        "start": (5, 1),
-        "end": (5, 15),
-    },
-    {
-        "name": "Independence Day Mega Deals",
-        "start": (8, 1),
-        "end": (8, 31),
-    },
-    {
-        "name": "Navratri Savings",
-        "start": (10, 1),
-        "end": (10, 20),
-    },
-    {
-        "name": "Diwali & Big Billion Days",
-        "start": (10, 21),
-        "end": (11, 15),
-    },
-    {
-        "name": "Black Friday & Cyber Week",
-        "start": (11, 16),
-        "end": (11, 30),
-    },
-    {
-        "name": "Christmas & New Year Offers",
-        "start": (12, 1),
-        "end": (12, 31),
-    },
+from alerts import AlertStore
+from api_metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    REQUEST_SECONDS,
+    REQUESTS_TOTAL,
+    render_prometheus,
+    stage_timer,
 )
-
-
-def identify_festive_event(ts: Optional[pd.Timestamp]) -> Optional[str]:
-    if pd.isna(ts):
-        return None
-
-    current_date = ts.date()
-    for window in FESTIVE_WINDOWS:
-        start = date(current_date.year, *window["start"])
-        end = date(current_date.year, *window["end"])
-        if start <= current_date <= end:
-            return window["name"]
-    return None
-
-
-def load_dataset() -> pd.DataFrame:
+from dataset import (
+    DATASET_PATH,
+    dataset_mtime,
+    derive_columns,
+    find_brand_column,
+    find_category_column,
+    load_dataset,
+)
+from fake_discounts import FLAG_COLUMNS, HISTORY_COLUMNS, flag_fake_discounts
+from festive_deals import FestiveDeals
+from festive_summary import SUMMARY_KEYS, FestiveSummary
+from festive_windows import FESTIVE_WINDOWS, identify_festive_event
+from partitions import PartitionIndex
+from price_history import COMPARE_MODES, PRE_SALE_DAYS, PriceHistory, find_window, summarize_changes
+from product_matching import ListingTable, MatchIndex, ProductMatcher, attach_match_ids, load_matches, matches_path
+from quantile_sketch import DEFAULT_QUANTILES, RELATIVE_ERROR, SketchStore, sidecar_path
+from search_index import TokenIndex, synonym_variants, tokenize, typo_budget
+from search_recommendations import SORT_KEYS, TermRecommendations, build_recommendations
+from slow_profiler import SlowRequestProfiler
+from sources import concat_rows
+from term_stats import REPORT_FIELDS, TermStats
+from top_k import SORT_ORDERS, SortKey, top_k_rows
+
+logging.basicConfig(
+    level=os.environ.get("PRICE_API_LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger("price_api")
+
+
+DATAFRAME = pd.DataFrame()
+# Batches appended since DATAFRAME was last consolidated; current_frame() folds them in.
+_PENDING_BATCHES: List[pd.DataFrame] = []
+SKETCHES = SketchStore()
+SEARCH_INDEX = TokenIndex()
+PARTITIONS = PartitionIndex()
+MATCHER = ProductMatcher()
+PRODUCT_ROWS = MatchIndex()
+TERM_STATS = TermStats()
+FESTIVE_DEALS = FestiveDeals()
+FESTIVE_SUMMARY = FestiveSummary()
+PRICE_HISTORY = PriceHistory()
+# One entry per listing (platform, block, title_key) with its product_match_id.
+MATCHES = ListingTable(pd.DataFrame(columns=["platform", "block", "title_key", "rows", "product_match_id"]))
+FILTER_VALUES: Dict[str, Any] = {"platforms": [], "categories": [], "brands": [], "start": None, "end": None}
+# Bumped whenever DATAFRAME changes; response caches key on it.
+DATASET_VERSION = 0
+_STATE_LOCK = threading.Lock()
+
+INGEST_TOKEN = os.environ.get("PRICE_API_INGEST_TOKEN", "")
+ALERTS = AlertStore.from_env()
+
+# (dataset version, ranked search terms, the frame they were built from). Built on first use,
+# then rebuilt in the background after the dataset changes while the previous one is served.
+_RECOMMENDATIONS: Tuple[int, Optional[TermRecommendations], pd.DataFrame] = (0, None, pd.DataFrame())
+_RECOMMENDATIONS_LOCK = threading.Lock()  # held while ranking, so one build runs at a time
+_RECOMMENDATIONS_REFRESH: Optional[threading.Thread] = None
+
+# "contains" (default): the query, its known variations or any of its 3+ letter words as a
+# substring; the other modes work on whole tokens of the search blob via the token index.
+MATCH_MODES = ("contains", "phrase", "all", "any", "prefix")
+
+# "best": cheapest hit per platform (any product); "matched": within matched product groups
+GAP_MODES = ("best", "matched")
+
+
+def load_sketches(path: str, df: pd.DataFrame) -> SketchStore:
+    """Use the sketch store saved next to the CSV if it is current, else build it."""
+    store_path = sidecar_path(path)
     try:
-        print("Loading dataset...")
-        df = pd.read_csv(
-            "combined_amazon_flipkart_with_timestamps.csv", parse_dates=["timestamp"]
-        )
-        print(f"Dataset loaded: {len(df)} rows, {len(df.columns)} columns")
-        print(f"Columns: {list(df.columns)}")
+        if os.path.getmtime(store_path) >= dataset_mtime(path):
+            return SketchStore.load(store_path)
+    except (OSError, ValueError):
+        pass
+    return SketchStore.from_frame(df)
 
-        # Normalize column names (handle case variations)
-        df.columns = df.columns.str.strip()
-        
-        # Try different possible column name variations
-        price_cols = []
-        for col in df.columns:
-            col_lower = col.lower()
-            if 'price' in col_lower and 'final' not in col_lower and 'mrp' not in col_lower:
-                price_cols.append(col)
-            elif 'final_price' in col_lower or 'final price' in col_lower:
-                if 'final_price' not in df.columns:
-                    df['final_price'] = df[col]
-            elif 'mrp' in col_lower:
-                if 'mrp' not in df.columns:
-                    df['mrp'] = df[col]
-
-        # Ensure required columns exist
-        if 'final_price' not in df.columns:
-            # Try to find price column
-            for col in df.columns:
-                if 'price' in col.lower() and 'final' not in col.lower():
-                    df['final_price'] = df[col]
-                    break
-        
-        if 'mrp' not in df.columns:
-            df['mrp'] = df.get('final_price', pd.Series([0] * len(df)))
-        
-        if 'price' not in df.columns:
-            df['price'] = df.get('final_price', pd.Series([0] * len(df)))
-
-        # Convert to numeric
-        for col in ("price", "final_price", "mrp"):
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        # Calculate discount
-        if 'mrp' in df.columns and 'final_price' in df.columns:
-            df["discount_pct"] = ((df["mrp"] - df["final_price"]) / df["mrp"]) * 100
-            df["discount_pct"] = df["discount_pct"].replace([np.inf, -np.inf], pd.NA)
-        else:
-            df["discount_pct"] = pd.NA
 
-        # Add festive event
-        if "festive_event" not in df.columns or df["festive_event"].isna().all():
-            if 'timestamp' in df.columns:
-                df["festive_event"] = df["timestamp"].apply(identify_festive_event)
-            else:
-                df["festive_event"] = None
-
-        # Create search blob
-        product_title_col = None
-        for col in df.columns:
-            if 'product' in col.lower() and 'title' in col.lower():
-                product_title_col = col
-                break
-        
-        product_desc_col = None
-        for col in df.columns:
-            if 'product' in col.lower() and 'description' in col.lower():
-                product_desc_col = col
-                break
-        
-        brand_col = None
-        for col in df.columns:
-            if col.lower() == 'brand':
-                brand_col = col
-                break
-
-        df["search_blob"] = (
-            df.get(product_title_col or "product title", pd.Series([""] * len(df)))
-            .fillna("")
-            .astype(str)
-            .str.cat(df.get(product_desc_col or "product description", pd.Series([""] * len(df))).fillna("").astype(str), sep=" ")
-            .str.cat(df.get(brand_col or "brand", pd.Series([""] * len(df))).fillna("").astype(str), sep=" ")
+def load_product_matches(path: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Use the match table saved next to the dataset if it is current, else match now."""
+    table_path = matches_path(path)
+    try:
+        if os.path.getmtime(table_path) >= dataset_mtime(path):
+            return load_matches(table_path)
+    except (OSError, ValueError):
+        pass
+    return MATCHER.match(df)
+
+
+def build_filter_values(df: pd.DataFrame, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Platforms, categories, brands and timestamp range of ``df``, merged into ``previous`` if given."""
+    values = dict(previous or {"platforms": [], "categories": [], "brands": [], "start": None, "end": None})
+    for key, col in (
+        ("platforms", "platform" if "platform" in df.columns else None),
+        ("categories", find_category_column(df.columns)),
+        ("brands", find_brand_column(df.columns)),
+    ):
+        if col:
+            new = set(df[col].dropna().unique().tolist()) - set(values[key])
+            if new:
+                values[key] = sorted(set(values[key]) | new)
+    if 'timestamp' in df.columns and len(df) > 0:
+        low, high = df["timestamp"].min(), df["timestamp"].max()
+        if pd.notnull(low):
+            values["start"] = low if values["start"] is None else min(values["start"], low)
+        if pd.notnull(high):
+            values["end"] = high if values["end"] is None else max(values["end"], high)
+    return values
+
+
+def _iso_date(value: Optional[pd.Timestamp]) -> Optional[str]:
+    return value.date().isoformat() if value is not None and pd.notna(value) else None
+
+
+def init_dataset(path: str = DATASET_PATH) -> pd.DataFrame:
+    """Load the dataset into the module-level DATAFRAME the request handlers read."""
+    global DATAFRAME, SKETCHES, SEARCH_INDEX, PARTITIONS, MATCHES, PRODUCT_ROWS, TERM_STATS, FILTER_VALUES
+    global FESTIVE_DEALS, FESTIVE_SUMMARY, PRICE_HISTORY, DATASET_VERSION
+    try:
+        df = load_dataset(path).reset_index(drop=True)
+        sketches = load_sketches(path, df)
+        matches = load_product_matches(path, df)
+        df["product_match_id"] = attach_match_ids(df, matches)
+        df[FLAG_COLUMNS] = flag_fake_discounts(df)
+        product_rows = MatchIndex.from_ids(df["product_match_id"])
+        index = TokenIndex.from_series(df["search_blob"])
+        index.build_fuzzy()  # before serving, and before workers fork
+        partitions = PartitionIndex.from_frame(df)
+        term_stats = TermStats.from_frame(df)
+        festive_deals = FestiveDeals.from_frame(df)
+        festive_summary = FestiveSummary.from_frame(df)
+        price_history = PriceHistory.from_frame(df)
+        filter_values = build_filter_values(df)
+        logger.info(
+            "Dataset ready: %d rows loaded, %d partitions, %d price sketches, %d index tokens, %d matched products",
+            len(df), len(partitions), len(sketches), len(index), matches["product_match_id"].nunique(),
         )
-
-        print("Dataset processing completed successfully!")
-        return df
-    except FileNotFoundError:
-        print("ERROR: CSV file 'combined_amazon_flipkart_with_timestamps.csv' not found!")
-        print("Please make sure the file exists in the same directory as price_api.py")
-        raise
     except Exception as e:
-        print(f"ERROR loading dataset: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+        logger.error("Failed to load dataset: %s", e)
+        df = pd.DataFrame()  # Empty dataframe as fallback
+        sketches, index, partitions, term_stats = SketchStore(), TokenIndex(), PartitionIndex(), TermStats()
+        festive_deals, festive_summary, price_history = FestiveDeals(), FestiveSummary(), PriceHistory()
+        matches, product_rows, filter_values = MATCHES.to_frame().iloc[0:0], MatchIndex(), build_filter_values(df)
+    with _STATE_LOCK:
+        DATAFRAME, SKETCHES, SEARCH_INDEX, PARTITIONS = df, sketches, index, partitions
+        MATCHES, PRODUCT_ROWS, TERM_STATS, FILTER_VALUES = ListingTable(matches), product_rows, term_stats, filter_values
+        _PENDING_BATCHES.clear()
+        FESTIVE_DEALS, FESTIVE_SUMMARY, PRICE_HISTORY = festive_deals, festive_summary, price_history
+        DATASET_VERSION += 1
+    _refresh_recommendations()
+    return DATAFRAME
+
+
+def _row_count() -> int:
+    return len(DATAFRAME) + sum(len(frame) for frame in _PENDING_BATCHES)
+
+
+def _consolidate() -> pd.DataFrame:
+    """DATAFRAME with the pending batches concatenated onto it; call with _STATE_LOCK held."""
+    global DATAFRAME
+    if _PENDING_BATCHES:
+        DATAFRAME = concat_rows([frame for frame in (DATAFRAME, *_PENDING_BATCHES) if not frame.empty])
+        _PENDING_BATCHES.clear()
+    return DATAFRAME
+
+
+def _product_history(batch: pd.DataFrame) -> pd.DataFrame:
+    """HISTORY_COLUMNS of the earlier rows of the batch's products, plus the batch; call with _STATE_LOCK held.
+
+    The rows come from PRODUCT_ROWS, so this costs the history of those
+    products rather than of the whole dataset.
+    """
+    match_ids = batch["product_match_id"].dropna().unique()
+    labels = [PRODUCT_ROWS.rows(match_id) for match_id in match_ids]
+    labels = np.sort(np.concatenate(labels)) if labels else np.zeros(0, dtype=np.int64)
+    parts = []
+    start = 0
+    for frame in (DATAFRAME, *_PENDING_BATCHES):
+        end = start + len(frame)
+        low, high = np.searchsorted(labels, [start, end])
+        if high > low:
+            parts.append(frame.iloc[labels[low:high] - start][HISTORY_COLUMNS])
+        start = end
+    return concat_rows([*parts, batch[HISTORY_COLUMNS]])
+
+
+def _row_at(frames: Sequence[pd.DataFrame], label: int) -> Optional[pd.Series]:
+    """The row labelled ``label`` among DATAFRAME and the pending batches (``frames``), without concatenating them."""
+    for frame in frames:
+        if label < len(frame):
+            return frame.iloc[label]
+        label -= len(frame)
+    return None
 
 
-try:
-    DATAFRAME = load_dataset()
-    print(f"✅ Dataset ready: {len(DATAFRAME)} rows loaded")
-except Exception as e:
-    print(f"❌ Failed to load dataset: {e}")
-    DATAFRAME = pd.DataFrame()  # Empty dataframe as fallback
+def current_frame() -> pd.DataFrame:
+    """The whole dataset, including appended batches (copied into one frame on the first read after an append)."""
+    if not _PENDING_BATCHES:
+        return DATAFRAME
+    with _STATE_LOCK:
+        return _consolidate()
+
+
+def append_batch(batch: pd.DataFrame) -> int:
+    """Append new rows to the loaded dataset without reloading it; returns the new DATASET_VERSION.
+
+    Only the batch is derived, tokenized, given product match ids and
+    fake-discount flags (checked against the history of its products), and
+    folded into the sketches, term counts, festive aggregates, price history
+    and filter values. The row indexes are updated before the batch becomes visible,
+    so a concurrent search never sees rows they do not know about. The batch
+    is queued rather than concatenated onto DATAFRAME; ``current_frame()``
+    does that once for all batches queued since the last read. Stored price
+    alerts are then checked against the batch alone.
+    """
+    global FILTER_VALUES, DATASET_VERSION
+    batch = derive_columns(batch.copy())
+    with _STATE_LOCK:
+        batch["product_match_id"] = MATCHES.extend(batch)
+        start = _row_count()
+        batch.index = pd.RangeIndex(start, start + len(batch))
+        batch[FLAG_COLUMNS] = flag_fake_discounts(batch, _product_history(batch))
+        SEARCH_INDEX.add(batch["search_blob"])
+        PARTITIONS.add(batch)
+        PRODUCT_ROWS.add(batch["product_match_id"])
+        SKETCHES.add_frame(batch)
+        TERM_STATS.add(batch)
+        FESTIVE_DEALS.add(batch)
+        FESTIVE_SUMMARY.add(batch)
+        PRICE_HISTORY.add(batch)
+        FILTER_VALUES = build_filter_values(batch, FILTER_VALUES)
+        _PENDING_BATCHES.append(batch)
+        DATASET_VERSION += 1
+        version = DATASET_VERSION
+        logger.info("Appended %d rows (dataset version %d, %d rows)", len(batch), version, _row_count())
+    _refresh_recommendations()
+    # Only the new rows can trigger alerts; the catalog is never rescanned.
+    with stage_timer("alerts"):
+        ALERTS.evaluate(batch)
+    return version
 
-app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
 
 # Custom JSON encoder to handle NaN values
-import json
-from flask.json.provider import DefaultJSONProvider
-
 class CustomJSONProvider(DefaultJSONProvider):
     def default(self, obj):
         if isinstance(obj, float) and (math.isnan(obj) or math.isinf(obj)):
@@ -187,7 +276,25 @@ class CustomJSONProvider(DefaultJSONProvider):
             return None
         return super().default(obj)
 
-app.json = CustomJSONProvider(app)
+
+api = Blueprint("price_api", __name__)
+
+PROFILER = SlowRequestProfiler.from_env()
+
+
+@api.before_app_request
+def _start_request_timer() -> None:
+    g.request_started = time.perf_counter()
+
+
+@api.after_app_request
+def _record_request_metrics(response: Response) -> Response:
+    started = g.pop("request_started", None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        REQUESTS_TOTAL.inc(endpoint=endpoint, status=str(response.status_code))
+    return response
 
 
 def _safe_float(value: Any) -> Optional[float]:
@@ -224,33 +331,31 @@ def clean_json_value(val):
     return val
 
 def build_platform_summary(filtered_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """The cheapest listing of every platform in ``filtered_df``, one groupby for any number of platforms."""
+    candidates = filtered_df.dropna(subset=["final_price"])
+    if candidates.empty:
+        return []
+    best_labels = candidates.groupby("platform", observed=True, sort=True)["final_price"].idxmin()
+
+    # Find product title column
+    product_title_col = None
+    for col in candidates.columns:
+        if 'product' in col.lower() and 'title' in col.lower():
+            product_title_col = col
+            break
+
     summaries: List[Dict[str, Any]] = []
-    for platform, group in filtered_df.groupby("platform"):
-        candidates = group.dropna(subset=["final_price"])
-        if candidates.empty:
-            continue
-        best_row = candidates.loc[candidates["final_price"].idxmin()]
+    for platform, label in best_labels.items():
+        best_row = candidates.loc[label]
         mrp = _safe_float(best_row.get("mrp"))
         final_price = _safe_float(best_row.get("final_price"))
-        discount_pct = _safe_float(best_row.get("discount_pct"))
-        discount_abs = None
-        if mrp is not None and final_price is not None:
-            discount_abs = round(mrp - final_price, 2)
-
-        # Find product title column
-        product_title_col = None
-        for col in best_row.index:
-            if 'product' in col.lower() and 'title' in col.lower():
-                product_title_col = col
-                break
-
         summaries.append(
             {
                 "platform": platform,
                 "best_final_price": _format_currency(final_price),
                 "mrp": _format_currency(mrp),
-                "discount_absolute": _format_currency(discount_abs),
-                "discount_percent": round(discount_pct, 2) if discount_pct is not None else None,
+                "discount_absolute": _safe_float(best_row.get("discount_abs")),
+                "discount_percent": _safe_float(best_row.get("discount_pct")),
                 "festive_window": clean_json_value(best_row.get("festive_event")),
                 "sample_date": best_row.get("timestamp").date().isoformat()
                 if pd.notnull(best_row.get("timestamp"))
@@ -259,12 +364,15 @@ def build_platform_summary(filtered_df: pd.DataFrame) -> List[Dict[str, Any]]:
                 "offers": clean_json_value(best_row.get("offers")) or "",
                 "combo_offers": clean_json_value(best_row.get("combo offers")) or "",
                 "direct_link": clean_json_value(best_row.get("url")) or "",
+                "product_match_id": clean_json_value(best_row.get("product_match_id")),
             }
         )
     return summaries
 
 
-def build_match_rows(filtered_df: pd.DataFrame, limit: int = 20) -> List[Dict[str, Any]]:
+def build_match_rows(
+    filtered_df: pd.DataFrame, limit: int = 20, sort_keys: Optional[List[SortKey]] = None
+) -> List[Dict[str, Any]]:
     try:
         if filtered_df.empty or 'final_price' not in filtered_df.columns:
             return []
@@ -298,8 +406,8 @@ def build_match_rows(filtered_df: pd.DataFrame, limit: int = 20) -> List[Dict[st
             elif 'url' in col_lower or 'link' in col_lower:
                 col_map['url'] = col
 
-        # Sort and limit
-        sorted_df = filtered_df.sort_values(col_map.get('final_price', 'final_price')).head(limit)
+        # Best ``limit`` rows only; the other matches are never sorted
+        sorted_df = top_k_rows(filtered_df, sort_keys or SORT_ORDERS["price"], limit)
         
         rows = []
         for _, row in sorted_df.iterrows():
@@ -357,23 +465,39 @@ def build_match_rows(filtered_df: pd.DataFrame, limit: int = 20) -> List[Dict[st
                 "category": clean_value(row.get(col_map.get('category', 'category'), None)),
                 "mrp": _format_currency(row.get(col_map.get('mrp', 'mrp'))),
                 "final_price": _format_currency(row.get(col_map.get('final_price', 'final_price'))),
-                "discount_percent": round(_safe_float(row.get(col_map.get('discount_pct', 'discount_pct'))), 2)
-                if _safe_float(row.get(col_map.get('discount_pct', 'discount_pct'))) is not None
-                else None,
+                "discount_percent": _safe_float(row.get(col_map.get('discount_pct', 'discount_pct'))),
                 "offers": offers_val or "",
                 "combo_offers": combo_offers_val or "",
                 "festive_window": clean_value(row.get(col_map.get('festive_event', 'festive_event'), None)),
                 "link": row.get(col_map.get('url', 'url'), "") or "",
+                "product_match_id": clean_value(row.get("product_match_id")),
+                "fake_discount": bool(row.get("fake_discount", False)),
+                "baseline_mrp": _format_currency(row.get("baseline_mrp")),
             })
         return rows
-    except Exception as e:
-        print(f"Error in build_match_rows: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Error in build_match_rows")
         return []
 
 
+def build_festive_deals(df: pd.DataFrame, deals: pd.DataFrame) -> List[Dict[str, Any]]:
+    """JSON rows of a product's precomputed festive deals (``FestiveDeals.for_product``), cheapest first."""
+    timestamps = df["timestamp"]
+    return [
+        {
+            "festive_event": deal.festive_event,
+            "platform": deal.platform or None,
+            "best_price": _format_currency(deal.best_price),
+            "listings": int(deal.listings),
+            # best_row may belong to a batch appended after this snapshot of the frame.
+            "date": _iso_date(timestamps.iloc[deal.best_row]) if deal.best_row < len(df) else None,
+        }
+        for deal in deals.itertuples(index=False)
+    ]
+
+
 def compute_gap(platform_summaries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Cheapest platform against the runner-up, plus every platform's gap to the cheapest (cheapest first)."""
     if len(platform_summaries) < 2:
         return None
 
@@ -400,72 +524,259 @@ def compute_gap(platform_summaries: List[Dict[str, Any]]) -> Optional[Dict[str,
         "cheapest_price": cheapest["best_final_price"],
         "next_best_platform": runner_up["platform"],
         "price_gap": price_gap,
+        "platforms": [
+            {
+                "platform": summary["platform"],
+                "best_price": summary["best_final_price"],
+                "gap": round(summary["best_final_price"] - cheapest["best_final_price"], 2),
+            }
+            for summary in sorted_by_price
+        ],
     }
 
 
-@app.get("/api/filters")
-def get_filters() -> Any:
-    """Get unique categories and brands for filtering, plus date range."""
-    try:
-        if DATAFRAME.empty:
-            return jsonify({"categories": [], "brands": [], "date_range": {"start": None, "end": None}})
-        
-        categories = []
-        brands = []
-        date_range = {"start": None, "end": None}
-        
-        # Get date range from dataset
-        if 'timestamp' in DATAFRAME.columns and len(DATAFRAME) > 0:
-            try:
-                date_range = {
-                    "start": DATAFRAME["timestamp"].min().date().isoformat(),
-                    "end": DATAFRAME["timestamp"].max().date().isoformat(),
-                }
-            except:
-                pass
-        
-        # Try to find category column (case-insensitive)
-        # Check for 'bb category' first (common in this dataset), then 'category'
-        category_col = None
-        for col in DATAFRAME.columns:
-            col_lower = col.lower()
-            if 'bb category' in col_lower or col_lower == 'bb category':
-                category_col = col
-                break
-        # If not found, try regular 'category'
-        if not category_col:
-            for col in DATAFRAME.columns:
-                if 'category' in col.lower() and 'bb' not in col.lower():
-                    category_col = col
-                    break
-        
-        if category_col:
-            categories = sorted(DATAFRAME[category_col].dropna().unique().tolist())
-        
-        # Try to find brand column
-        brand_col = None
-        for col in DATAFRAME.columns:
-            if col.lower() == 'brand':
-                brand_col = col
-                break
-        
-        if brand_col:
-            brands = sorted(DATAFRAME[brand_col].dropna().unique().tolist())
-        
-        return jsonify({
-            "categories": categories,
-            "brands": brands,
-            "date_range": date_range
-        })
-    except Exception as e:
-        print(f"Error in get_filters: {e}")
-        return jsonify({"categories": [], "brands": [], "date_range": {"start": None, "end": None}})
+def _date_bounds(start_str: Optional[str], end_str: Optional[str]) -> Tuple[Optional[date], Optional[date]]:
+    """Parse the start/end query parameters; invalid dates are ignored."""
+    bounds = []
+    for value in (start_str, end_str):
+        try:
+            bounds.append(datetime.fromisoformat(value).date() if value else None)
+        except ValueError:
+            bounds.append(None)  # Skip date filter if invalid
+    return bounds[0], bounds[1]
 
 
-@app.get("/api/price-comparison")
+def _filter_dates(df: pd.DataFrame, start: Optional[date], end: Optional[date]) -> pd.DataFrame:
+    if 'timestamp' not in df.columns:
+        return df
+    if start is not None:
+        df = df[df["timestamp"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["timestamp"] < pd.Timestamp(end) + pd.Timedelta(days=1)]
+    return df
+
+
+def _take_rows(df: pd.DataFrame, labels: np.ndarray) -> pd.DataFrame:
+    """Rows of ``df`` by sorted label; labels of rows appended after this snapshot are skipped."""
+    return df.iloc[labels[: np.searchsorted(labels, len(df))]]
+
+
+def _match_mode(match: Optional[str], partial: Optional[str]) -> str:
+    """The requested match mode; the older ``partial`` flag maps to prefix (true) or all (false)."""
+    if match:
+        return match.strip().lower()
+    if partial is not None and partial.strip():
+        return "prefix" if partial.strip().lower() in ("1", "true", "yes") else "all"
+    return "contains"
+
+
+def _query_alternatives(
+    index: TokenIndex, search_term: str, mode: str, fuzzy: bool
+) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """Other vocabulary tokens to search for each query word, and the spelling corrections among them.
+
+    Every word also matches its accented spellings ("nestle" finds
+    "nestlé"). With ``fuzzy``, a word of four or more letters that would
+    match nothing is corrected to its closest vocabulary token; the lookup
+    goes through the index's deletion-based fuzzy vocabulary, so it costs
+    microseconds rather than a retry from the user.
+    """
+    alternatives: Dict[str, List[str]] = {}
+    corrections: Dict[str, str] = {}
+    for word in dict.fromkeys(tokenize(search_term)):
+        others = index.fuzzy.accent_variants(word)
+        if fuzzy and typo_budget(word) > 0 and not others:
+            if mode == "contains":
+                matches = bool(index.tokens_containing(word))
+            elif mode == "prefix":
+                matches = bool(index.tokens_with_prefix(word))
+            else:
+                matches = word in index
+            if not matches:
+                closest = index.corrections(word, limit=1)
+                if closest:
+                    corrections[word] = closest[0]
+                    others = closest
+        if others:
+            alternatives[word] = others
+    return alternatives, corrections
+
+
+def _match_contains(
+    df_subset: pd.DataFrame,
+    index: TokenIndex,
+    search_term: str,
+    product_title_col: Optional[str],
+    brand_col: Optional[str],
+    alternatives: Dict[str, List[str]],
+    variants: Sequence[str] = (),
+) -> pd.DataFrame:
+    """Rows containing the query, a synonym variant of it, any of its 3+ letter words or their alternative spellings."""
+    normalized_search = search_term.strip().lower()
+    search_terms = [normalized_search, *(variant for variant in variants if variant != normalized_search)]
+
+    # Accented and corrected spellings are searched too, as is the query with its misspellings fixed
+    if alternatives:
+        respelled = " ".join(alternatives.get(word, [word])[0] for word in normalized_search.split())
+        for term in [respelled, *(token for tokens in alternatives.values() for token in tokens)]:
+            if term not in search_terms:
+                search_terms.append(term)
+
+    # Also add the individual words as separate search terms
+    for word in normalized_search.split():
+        if word not in search_terms and len(word) > 2:  # Only add words longer than 2 characters
+            search_terms.append(word)
+
+    # Only rows whose tokens can contain a search term need the substring scans below
+    candidates = index.substring_candidates(term for term in search_terms if len(term) > 2)
+    df_subset = df_subset[df_subset.index.isin(candidates)]
+
+    # Build search mask - search in multiple fields
+    mask = pd.Series(False, index=df_subset.index)
+
+    # Search in product titles - boost matches in title by adding them multiple times
+    if product_title_col:
+        for term in search_terms:
+            if len(term) > 2:  # Only search for terms longer than 2 characters
+                title_match = df_subset[product_title_col].fillna("").astype(str).str.contains(term, case=False, na=False, regex=False)
+                mask = mask | title_match
+
+    # Search in brands
+    if brand_col:
+        for term in search_terms:
+            if len(term) > 2:  # Only search for terms longer than 2 characters
+                brand_match = df_subset[brand_col].fillna("").astype(str).str.contains(term, case=False, na=False, regex=False)
+                mask = mask | brand_match
+
+    # Create a temporary search blob if it doesn't exist
+    if 'search_blob' not in df_subset.columns and product_title_col and 'product description' in df_subset.columns and brand_col:
+        df_subset['search_blob'] = (
+            df_subset[product_title_col].fillna('').astype(str) + ' ' +
+            df_subset['product description'].fillna('').astype(str) + ' ' +
+            df_subset[brand_col].fillna('').astype(str)
+        )
+
+    # Search in search blob (title + description + brand) if available
+    if 'search_blob' in df_subset.columns:
+        for term in search_terms:
+            if len(term) > 2:  # Only search for terms longer than 2 characters
+                blob_match = df_subset['search_blob'].fillna("").astype(str).str.contains(term, case=False, na=False, regex=False)
+                mask = mask | blob_match
+
+    return df_subset.loc[mask].copy()
+
+
+def _match_tokens(
+    df: pd.DataFrame, index: TokenIndex, search_term: str, mode: str, alternatives: Dict[str, List[str]]
+) -> pd.DataFrame:
+    """Rows of ``df`` matching ``search_term`` under a token match mode, from posting lists only.
+
+    all/prefix intersect the postings of each word (rarest first), any
+    unions them, and phrase intersects them and then checks that the words
+    are adjacent in the search blob. A word also matches its alternative
+    spellings.
+    """
+    words = tokenize(search_term)
+    if mode == "any":
+        rows = index.match_any(words, alternatives=alternatives)
+    else:
+        rows = index.match_all(words, prefix=mode == "prefix", alternatives=alternatives)
+    matched = df[df.index.isin(rows)]
+    if mode == "phrase" and len(words) > 1 and not matched.empty:
+        blob = " " + matched["search_blob"].str.lower().str.split().str.join(" ") + " "
+        spellings = ("|".join(re.escape(token) for token in [word, *alternatives.get(word, [])]) for word in words)
+        pattern = " " + " ".join(f"(?:{spelling})" for spelling in spellings) + " "
+        matched = matched[blob.str.contains(pattern, regex=True)]
+    return matched.copy()
+
+
+def _relevance(df: pd.DataFrame, search_term: str, alternatives: Dict[str, List[str]]) -> pd.Series:
+    """How well each row's title matches the query.
+
+    One point per query word (or alternative spelling) found in the title,
+    plus one if the whole query is.
+    """
+    titles = df["product title"].fillna("").astype(str).str.lower() if "product title" in df.columns else None
+    if titles is None:
+        return pd.Series(0, index=df.index)
+    phrase = search_term.strip().lower()
+    score = titles.str.contains(phrase, regex=False).astype(int)
+    for word in dict.fromkeys(tokenize(phrase)):
+        spellings = [word, *alternatives.get(word, [])]
+        found = pd.Series(False, index=df.index)
+        for spelling in spellings:
+            found |= titles.str.contains(spelling, regex=False)
+        score += found.astype(int)
+    return score
+
+
+def build_matched_gaps(filtered_df: pd.DataFrame, limit: int = 10) -> List[Dict[str, Any]]:
+    """Like-for-like gaps: cheapest price per platform within each matched product.
+
+    Only products listed on at least two platforms are returned, those with
+    the most matching rows first.
+    """
+    if "product_match_id" not in filtered_df.columns:
+        return []
+    rows = filtered_df.dropna(subset=["final_price", "product_match_id"])
+    if rows.empty:
+        return []
+    best = rows.groupby(["product_match_id", "platform"], observed=True)["final_price"].min().unstack("platform")
+    best = best[best.notna().sum(axis=1) >= 2]
+    if best.empty:
+        return []
+    listings = rows.groupby("product_match_id").size().reindex(best.index)
+    order = top_k_rows(listings.to_frame("listings"), [("listings", False)], limit).index
+    best = best.loc[order]
+    titles = (
+        rows.drop_duplicates("product_match_id").set_index("product_match_id")["product title"]
+        if "product title" in rows.columns
+        else pd.Series(dtype=object)
+    )
+
+    prices = best.to_numpy(dtype=float)
+    ranked = np.argsort(np.where(np.isnan(prices), np.inf, prices), axis=1, kind="stable")
+    platforms = best.columns.to_numpy()
+    gaps = []
+    for i, match_id in enumerate(best.index):
+        cheapest, runner_up = ranked[i, 0], ranked[i, 1]
+        gaps.append(
+            {
+                "product_match_id": match_id,
+                "product": clean_json_value(titles.get(match_id)),
+                "listings": int(listings[match_id]),
+                "prices": {
+                    platform: _format_currency(price)
+                    for platform, price in zip(platforms, prices[i])
+                    if not np.isnan(price)
+                },
+                "cheapest_platform": platforms[cheapest],
+                "cheapest_price": _format_currency(prices[i, cheapest]),
+                "next_best_platform": platforms[runner_up],
+                "price_gap": _format_currency(prices[i, runner_up] - prices[i, cheapest]),
+            }
+        )
+    return gaps
+
+
+@api.get("/api/filters")
+def get_filters() -> Any:
+    """Get unique categories and brands for filtering, plus date range."""
+    values = FILTER_VALUES
+    return jsonify({
+        "platforms": values["platforms"],
+        "categories": values["categories"],
+        "brands": values["brands"],
+        "date_range": {"start": _iso_date(values["start"]), "end": _iso_date(values["end"])},
+        "dataset_version": DATASET_VERSION,
+    })
+
+
+@api.get("/api/price-comparison")
+@PROFILER.wrap
 def price_comparison() -> Any:
     try:
-        if DATAFRAME.empty:
+        if not _row_count():
             return jsonify({
                 "error": "Dataset not loaded. Please check the server logs.",
                 "query": request.args.get("q", ""),
@@ -487,148 +798,99 @@ def price_comparison() -> Any:
         end_date_str = request.args.get("end")
         category_filter = request.args.get("category", "").strip()
         brand_filter = request.args.get("brand", "").strip()
+        gap_mode = request.args.get("gap", "best").strip().lower()
+        if gap_mode not in GAP_MODES:
+            return jsonify({"error": f"Unsupported 'gap' value: {gap_mode}. Use one of {', '.join(GAP_MODES)}."}), 400
+        match_mode = _match_mode(request.args.get("match"), request.args.get("partial"))
+        fuzzy = request.args.get("fuzzy", "true").strip().lower() not in ("0", "false", "no")
+        sort_by = request.args.get("sort", "price").strip().lower()
+        if sort_by not in SORT_ORDERS:
+            return jsonify({"error": f"Unsupported 'sort' value: {sort_by}. Use one of {', '.join(SORT_ORDERS)}."}), 400
+        if match_mode not in MATCH_MODES:
+            return jsonify({"error": f"Unsupported 'match' value: {match_mode}. Use one of {', '.join(MATCH_MODES)}."}), 400
+        fake_discount = request.args.get("fake_discount", "").strip().lower()
+        if fake_discount not in ("", "true", "false"):
+            return jsonify({"error": f"Unsupported 'fake_discount' value: {fake_discount}. Use true or false."}), 400
+
+        with stage_timer("load_snapshot"):
+            index, partitions = SEARCH_INDEX, PARTITIONS
+            df_all = current_frame()
+
+        with stage_timer("date_filter"):
+            start_date, end_date = _date_bounds(start_date_str, end_date_str)
+            if start_date is None and end_date is None:
+                df_subset = df_all.copy()
+            else:
+                # Only the month partitions overlapping the window are taken, then filtered by day.
+                df_subset = _filter_dates(_take_rows(df_all, partitions.rows(start_date, end_date)), start_date, end_date)
 
-        df_subset = DATAFRAME.copy()
-
-        # Date filtering
-        if start_date_str and 'timestamp' in df_subset.columns:
-            try:
-                start_date = datetime.fromisoformat(start_date_str).date()
-                df_subset = df_subset[df_subset["timestamp"].dt.date >= start_date]
-            except (ValueError, AttributeError):
-                pass  # Skip date filter if invalid
-
-        if end_date_str and 'timestamp' in df_subset.columns:
-            try:
-                end_date = datetime.fromisoformat(end_date_str).date()
-                df_subset = df_subset[df_subset["timestamp"].dt.date <= end_date]
-            except (ValueError, AttributeError):
-                pass  # Skip date filter if invalid
-
-        # Find category column (check for 'bb category' first)
-        category_col = None
-        for col in df_subset.columns:
-            col_lower = col.lower()
-            if 'bb category' in col_lower or col_lower == 'bb category':
-                category_col = col
-                break
-        # If not found, try regular 'category'
-        if not category_col:
+        with stage_timer("attribute_filter"):
+            # Find category column (check for 'bb category' first)
+            category_col = None
             for col in df_subset.columns:
-                if 'category' in col.lower() and 'bb' not in col.lower():
+                col_lower = col.lower()
+                if 'bb category' in col_lower or col_lower == 'bb category':
                     category_col = col
                     break
+            # If not found, try regular 'category'
+            if not category_col:
+                for col in df_subset.columns:
+                    if 'category' in col.lower() and 'bb' not in col.lower():
+                        category_col = col
+                        break
         
-        # Apply category filter
-        if category_filter and category_col:
-            df_subset = df_subset[df_subset[category_col].fillna("").astype(str).str.contains(category_filter, case=False, na=False)]
-        
-        # Find brand column
-        brand_col = None
-        for col in df_subset.columns:
-            if col.lower() == 'brand':
-                brand_col = col
-                break
+            # Apply category filter
+            if category_filter and category_col:
+                df_subset = df_subset[df_subset[category_col].fillna("").astype(str).str.contains(category_filter, case=False, na=False)]
         
-        # Apply brand filter
-        if brand_filter and brand_col:
-            df_subset = df_subset[df_subset[brand_col].fillna("").astype(str).str.contains(brand_filter, case=False, na=False)]
-
-        # Find product title column
-        product_title_col = None
-        for col in df_subset.columns:
-            if 'product' in col.lower() and 'title' in col.lower():
-                product_title_col = col
-                break
-
-        # Build search mask - handle brand variations (boAt/Boat, Nestlé/Nestle, etc.)
-        # Normalize search term for better matching
-        normalized_search = search_term.strip().lower()
-        
-        # Handle common brand and product variations
-        search_variations = {
-            'boat': ['boat', 'bo at', 'bo-at', 'bo_at'],
-            'airdropes': ['airdopes', 'air dropes', 'air-dropes'],
-            '131': ['131', 'one thirty one', 'one-three-one'],
-            'boat airdopes 131': ['boat airdopes 131', 'bo-at airdopes 131', 'boat airdropes 131', 'boat airdopes one three one', 'bo at airdopes 131'],
-            'nestle': ['nestle', 'nestlé'],
-            'samsung': ['samsung'],
-            'mi': ['mi', 'xiaomi'],
-            'dove': ['dove'],
-            'nivea': ['nivea'],
-            'himalaya': ['himalaya'],
-            'cadbury': ['cadbury'],
-            'harpic': ['harpic'],
-            'surf excel': ['surf excel', 'surfexcel', 'surf']
-        }
-        
-        # Get variations for the search term
-        search_terms = [normalized_search]
-        
-        # Add variations for the search term if it matches any key in the variations
-        for key, variations in search_variations.items():
-            if key in normalized_search:
-                for variation in variations:
-                    if variation not in search_terms:
-                        search_terms.append(variation)
-        
-        # Also add the individual words as separate search terms
-        for word in normalized_search.split():
-            if word not in search_terms and len(word) > 2:  # Only add words longer than 2 characters
-                search_terms.append(word)
-        
-        # Build search mask - search in multiple fields
-        mask = pd.Series([False] * len(df_subset))
-        
-        # Search in product titles - boost matches in title by adding them multiple times
-        if product_title_col:
-            for term in search_terms:
-                if len(term) > 2:  # Only search for terms longer than 2 characters
-                    title_match = df_subset[product_title_col].fillna("").astype(str).str.contains(term, case=False, na=False, regex=False)
-                    mask = mask | title_match
+            # Find brand column
+            brand_col = None
+            for col in df_subset.columns:
+                if col.lower() == 'brand':
+                    brand_col = col
+                    break
         
-        # Search in brands
-        if brand_col:
-            for term in search_terms:
-                if len(term) > 2:  # Only search for terms longer than 2 characters
-                    brand_match = df_subset[brand_col].fillna("").astype(str).str.contains(term, case=False, na=False, regex=False)
-                    mask = mask | brand_match
+            # Apply brand filter
+            if brand_filter and brand_col:
+                df_subset = df_subset[df_subset[brand_col].fillna("").astype(str).str.contains(brand_filter, case=False, na=False)]
+
+            # Keep only (or drop) festive discounts that follow an MRP increase
+            if fake_discount and "fake_discount" in df_subset.columns:
+                df_subset = df_subset[df_subset["fake_discount"] == (fake_discount == "true")]
+
+        with stage_timer("text_match"):
+            # Find product title column
+            product_title_col = None
+            for col in df_subset.columns:
+                if 'product' in col.lower() and 'title' in col.lower():
+                    product_title_col = col
+                    break
+
+            alternatives, corrections = _query_alternatives(index, search_term, match_mode, fuzzy)
+            variants = [" ".join(words) for words in synonym_variants(tokenize(search_term))]
+            if match_mode == "contains":
+                filtered = _match_contains(
+                    df_subset, index, search_term, product_title_col, brand_col, alternatives, variants
+                )
+            else:
+                filtered = _match_tokens(df_subset, index, search_term, match_mode, alternatives)
+                for variant in variants:
+                    more = _match_tokens(df_subset, index, variant, match_mode, alternatives)
+                    filtered = concat_rows([filtered, more[~more.index.isin(filtered.index)]])
         
-        # Create a temporary search blob if it doesn't exist
-        if 'search_blob' not in df_subset.columns and product_title_col and 'product description' in df_subset.columns and brand_col:
-            df_subset['search_blob'] = (
-                df_subset[product_title_col].fillna('').astype(str) + ' ' +
-                df_subset['product description'].fillna('').astype(str) + ' ' +
-                df_subset[brand_col].fillna('').astype(str)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Search term=%r start=%s end=%s: %d rows after date/attribute filters, %d after search filter",
+                search_term, start_date_str, end_date_str, len(df_subset), len(filtered),
             )
-        
-        # Search in search blob (title + description + brand) if available
-        if 'search_blob' in df_subset.columns:
-            for term in search_terms:
-                if len(term) > 2:  # Only search for terms longer than 2 characters
-                    blob_match = df_subset['search_blob'].fillna("").astype(str).str.contains(term, case=False, na=False, regex=False)
-                    mask = mask | blob_match
-
-        filtered = df_subset.loc[mask].copy()
-        
-        # Debug logging
-        print(f"Search term: '{search_term}'")
-        print(f"Date filter: start={start_date_str}, end={end_date_str}")
-        print(f"After date filter: {len(df_subset)} rows")
-        print(f"After search filter: {len(filtered)} rows")
-        if len(filtered) > 0:
-            print(f"Platforms found: {filtered['platform'].value_counts().to_dict()}")
+            if len(filtered) > 0:
+                logger.debug("Platforms found: %s", filtered['platform'].value_counts().to_dict())
 
         if filtered.empty:
-            date_range = {"start": None, "end": None}
-            if 'timestamp' in DATAFRAME.columns and len(DATAFRAME) > 0:
-                try:
-                    date_range = {
-                        "start": start_date_str or DATAFRAME["timestamp"].min().date().isoformat(),
-                        "end": end_date_str or DATAFRAME["timestamp"].max().date().isoformat(),
-                    }
-                except:
-                    pass
+            date_range = {
+                "start": start_date_str or _iso_date(FILTER_VALUES["start"]),
+                "end": end_date_str or _iso_date(FILTER_VALUES["end"]),
+            }
             
             return jsonify({
                 "query": search_term,
@@ -656,52 +918,51 @@ def price_comparison() -> Any:
                 "metadata": {"total_matches": 0, "date_range": {"start": None, "end": None}}
             }), 500
 
-        platform_summary = build_platform_summary(filtered)
-        platform_gap = compute_gap(platform_summary)
-
-        best_row = None
-        if not filtered.empty and 'final_price' in filtered.columns:
-            try:
-                best_idx = filtered["final_price"].idxmin()
-                best_row_df = filtered.loc[[best_idx]]
-                if not best_row_df.empty:
-                    best_row_data = best_row_df.iloc[0]
+        with stage_timer("summary"):
+            platform_summary = build_platform_summary(filtered)
+            platform_gap = compute_gap(platform_summary)
+            matched_products = None
+            if gap_mode == "matched":
+                # Compare the same product across platforms instead of each platform's cheapest hit
+                matched_products = build_matched_gaps(filtered)
+                platform_gap = matched_products[0] if matched_products else None
+
+            best_row = None
+            if not filtered.empty and 'final_price' in filtered.columns:
+                try:
+                    best_idx = filtered["final_price"].idxmin()
+                    best_row_df = filtered.loc[[best_idx]]
+                    if not best_row_df.empty:
+                        best_row_data = best_row_df.iloc[0]
                     
-                    # Get product title
-                    product_title = None
-                    if product_title_col:
-                        product_title = best_row_data.get(product_title_col)
+                        # Get product title
+                        product_title = None
+                        if product_title_col:
+                            product_title = best_row_data.get(product_title_col)
                     
-                    # Get platform
-                    platform = best_row_data.get("platform", "Unknown")
+                        # Get platform
+                        platform = best_row_data.get("platform", "Unknown")
                     
-                    best_row = {
-                        "platform": platform,
-                        "product": product_title or "Unknown",
-                        "final_price": _format_currency(best_row_data.get("final_price")),
-                        "mrp": _format_currency(best_row_data.get("mrp")),
-                        "discount_absolute": _format_currency(
-                            (
-                                _safe_float(best_row_data.get("mrp"))
-                                - _safe_float(best_row_data.get("final_price"))
-                            )
-                            if _safe_float(best_row_data.get("mrp")) is not None
-                            and _safe_float(best_row_data.get("final_price")) is not None
-                            else None
-                        ),
-                        "discount_percent": round(_safe_float(best_row_data.get("discount_pct")), 2)
-                        if _safe_float(best_row_data.get("discount_pct")) is not None
-                        else None,
-                        "festive_window": best_row_data.get("festive_event"),
-                        "date": best_row_data.get("timestamp").date().isoformat()
-                        if 'timestamp' in best_row_data and pd.notnull(best_row_data.get("timestamp"))
-                        else None,
-                        "offers": best_row_data.get("offers") or "",
-                    }
-            except Exception as e:
-                print(f"Error building best_row: {e}")
-
-        matches = build_match_rows(filtered)
+                        best_row = {
+                            "platform": platform,
+                            "product": product_title or "Unknown",
+                            "final_price": _format_currency(best_row_data.get("final_price")),
+                            "mrp": _format_currency(best_row_data.get("mrp")),
+                            "discount_absolute": _safe_float(best_row_data.get("discount_abs")),
+                            "discount_percent": _safe_float(best_row_data.get("discount_pct")),
+                            "festive_window": best_row_data.get("festive_event"),
+                            "date": best_row_data.get("timestamp").date().isoformat()
+                            if 'timestamp' in best_row_data and pd.notnull(best_row_data.get("timestamp"))
+                            else None,
+                            "offers": best_row_data.get("offers") or "",
+                        }
+                except Exception:
+                    logger.exception("Error building best_row")
+
+        with stage_timer("match_rows"):
+            if sort_by == "relevance":
+                filtered["relevance"] = _relevance(filtered, search_term, alternatives)
+            matches = build_match_rows(filtered, sort_keys=SORT_ORDERS[sort_by])
 
         # Get date range
         date_range = {"start": None, "end": None}
@@ -719,17 +980,25 @@ def price_comparison() -> Any:
             "metadata": {
                 "total_matches": len(filtered),
                 "date_range": date_range,
+                "gap_mode": gap_mode,
+                "match_mode": match_mode,
+                "corrections": corrections,
+                "synonyms": variants,
+                "sort": sort_by,
+                "fake_discounts": int(filtered["fake_discount"].sum()) if "fake_discount" in filtered.columns else 0,
             },
             "best_overall": best_row,
             "platform_summary": platform_summary,
             "platform_gap": platform_gap,
             "results": matches,
         }
-        return jsonify(response)
+        if matched_products is not None:
+            response["matched_products"] = matched_products
+        with stage_timer("serialize"):
+            payload = jsonify(response)
+        return payload
     except Exception as e:
-        print(f"Error in price_comparison: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in price_comparison")
         return jsonify({
             "error": str(e),
             "query": request.args.get("q", ""),
@@ -741,8 +1010,456 @@ def price_comparison() -> Any:
         }), 500
 
 
+@api.get("/api/product/<match_id>/prices")
+def product_prices(match_id: str) -> Any:
+    """Per-platform prices of one matched product, optionally within start/end.
+
+    The product's rows come from the precomputed match index, so this is a
+    lookup rather than a text search.
+    """
+    df_all = current_frame()
+    group = _take_rows(df_all, PRODUCT_ROWS.rows(match_id))
+    if group.empty:
+        return jsonify({"error": f"Unknown product_match_id '{match_id}'."}), 404
+
+    start_date, end_date = _date_bounds(request.args.get("start"), request.args.get("end"))
+    group = _filter_dates(group, start_date, end_date).dropna(subset=["final_price"])
+
+    platform_summary = build_platform_summary(group)
+    stats = group.groupby("platform", observed=True)["final_price"].agg(["size", "median", "mean"])
+    for summary in platform_summary:
+        platform_stats = stats.loc[summary["platform"]]
+        summary["listings"] = int(platform_stats["size"])
+        summary["median_price"] = _format_currency(platform_stats["median"])
+        summary["mean_price"] = _format_currency(platform_stats["mean"])
+
+    titles = group["product title"].dropna() if "product title" in group.columns else pd.Series(dtype=object)
+    festive_deals = build_festive_deals(df_all, FESTIVE_DEALS.for_product(match_id))
+    return jsonify({
+        "product_match_id": match_id,
+        "product": clean_json_value(titles.mode().iloc[0]) if not titles.empty else None,
+        "platform_summary": platform_summary,
+        "platform_gap": compute_gap(platform_summary),
+        "festive_deals": festive_deals,
+        "best_festive_deal": festive_deals[0] if festive_deals else None,
+        "metadata": {
+            "total_listings": len(group),
+            "date_range": {
+                "start": _iso_date(group["timestamp"].min()) if not group.empty else None,
+                "end": _iso_date(group["timestamp"].max()) if not group.empty else None,
+            },
+        },
+    })
+
+
+@api.get("/api/price-quantiles")
+def price_quantiles() -> Any:
+    """p5/p25/p50/p75/p95 final price from the precomputed sketches.
+
+    Optional filters: platform, category, festive (window name), start/end
+    (whole months). ``by`` groups the result by platform (default), category,
+    festive_event, month or "all".
+    """
+    by = request.args.get("by", "platform")
+    if by not in ("platform", "category", "festive_event", "month", "all"):
+        return jsonify({"error": f"Unsupported 'by' value: {by}"}), 400
+
+    rows = SKETCHES.summary(
+        DEFAULT_QUANTILES,
+        by=None if by == "all" else by,
+        start=request.args.get("start"),
+        end=request.args.get("end"),
+        platform=request.args.get("platform"),
+        category=request.args.get("category"),
+        festive_event=request.args.get("festive"),
+    )
+    return jsonify({"by": by, "relative_error": round(RELATIVE_ERROR, 4), "quantiles": rows})
+
+
+def _list_arg(name: str) -> List[str]:
+    """Comma-separated values of query parameter ``name``."""
+    return [value.strip() for value in request.args.get(name, "").split(",") if value.strip()]
+
+
+@api.get("/api/festive-summary")
+def festive_summary() -> Any:
+    """Listings, mean/median price, mean discount and best deal per festive window group.
+
+    ``by`` lists the grouping keys (comma-separated festive_event, year,
+    platform, category; default all four). ``festive``, ``platform``,
+    ``category`` and ``year`` filter to one or more comma-separated values.
+    Served from cells aggregated at load and ingest time, so the cost does
+    not depend on the number of rows; medians are within ``relative_error``.
+    """
+    by = _list_arg("by") or list(SUMMARY_KEYS)
+    unknown = [key for key in by if key not in SUMMARY_KEYS]
+    if unknown or len(set(by)) != len(by):
+        return jsonify({"error": f"Unsupported 'by' value: {','.join(unknown or by)}"}), 400
+    try:
+        years = [int(year) for year in _list_arg("year")]
+    except ValueError:
+        return jsonify({"error": "'year' must be a comma-separated list of years"}), 400
+
+    with _STATE_LOCK:
+        frames, summary, version = [DATAFRAME, *_PENDING_BATCHES], FESTIVE_SUMMARY, DATASET_VERSION
+    with stage_timer("festive_summary"):
+        groups = summary.query(
+            by,
+            festive_events=_list_arg("festive"),
+            platforms=_list_arg("platform"),
+            categories=_list_arg("category"),
+            years=years,
+        )
+    rows = []
+    for group in groups.to_dict("records"):
+        best_row = group.pop("best_row")
+        best = _row_at(frames, best_row)
+        # Platform and category are "" when missing from the rows.
+        row = {key: group[key] or None for key in by}
+        row.update({
+            "listings": int(group["listings"]),
+            "mean_price": _format_currency(group["mean_price"]),
+            "median_price": _format_currency(group["median_price"]),
+            "mean_discount_pct": _format_currency(group["mean_discount_pct"]),
+            "best_deal": {
+                "price": _format_currency(group["best_price"]),
+                "platform": clean_json_value(best.get("platform")) if best is not None else None,
+                "product": clean_json_value(best.get("product title")) if best is not None else None,
+                "product_match_id": clean_json_value(best.get("product_match_id")) if best is not None else None,
+                "date": _iso_date(best["timestamp"]) if best is not None else None,
+            },
+        })
+        rows.append(row)
+    return jsonify({
+        "by": by,
+        "relative_error": round(RELATIVE_ERROR, 4),
+        "groups": rows,
+        "dataset_version": version,
+    })
+
+
+# Orderings of /api/price-changes rows: biggest increase first.
+CHANGE_SORTS: Dict[str, List[SortKey]] = {
+    "price": [("price_change_pct", False), ("mrp_change_pct", False)],
+    "mrp": [("mrp_change_pct", False), ("price_change_pct", False)],
+}
+
+
+@api.get("/api/price-changes")
+def price_changes() -> Any:
+    """How matched products' prices and MRPs moved around one festive window.
+
+    ``festive`` names the window. ``compare=presale`` (default) sets each
+    product's mean price and MRP per platform in the ``pre_days`` (default 30)
+    before the window against the window itself; ``compare=yoy`` sets the
+    window against the same window a year earlier. ``summary`` gives per
+    platform and year the mean/median change and the share of products whose
+    MRP went up; ``changes`` lists the biggest increases (``sort=price|mrp``),
+    optionally for one ``platform``, ``year`` or ``product_match_id``.
+    """
+    festive = request.args.get("festive", "")
+    if find_window(festive) is None:
+        return jsonify({"error": f"Unknown 'festive' window: {festive}"}), 400
+    compare = request.args.get("compare", "presale")
+    if compare not in COMPARE_MODES:
+        return jsonify({"error": f"Unsupported 'compare' value: {compare}"}), 400
+    sort = request.args.get("sort", "price")
+    if sort not in CHANGE_SORTS:
+        return jsonify({"error": f"Unsupported 'sort' value: {sort}"}), 400
+    pre_days = max(1, min(request.args.get("pre_days", PRE_SALE_DAYS, type=int), 180))
+    limit = max(1, min(request.args.get("limit", 20, type=int), 500))
+
+    with _STATE_LOCK:
+        history, version = PRICE_HISTORY, DATASET_VERSION
+    with stage_timer("price_changes"):
+        changes = history.compare(festive, compare, pre_days)
+        platform = request.args.get("platform", "").strip().lower()
+        if platform:
+            changes = changes[changes["platform"].str.lower() == platform]
+        year = request.args.get("year", type=int)
+        if year is not None:
+            changes = changes[changes["year"] == year]
+        match_id = request.args.get("product_match_id")
+        if match_id:
+            changes = changes[changes["product_match_id"] == match_id]
+        summary = summarize_changes(changes)
+        top = top_k_rows(changes, CHANGE_SORTS[sort], limit)
+
+    return jsonify({
+        "festive_event": find_window(festive)["name"],
+        "compare": compare,
+        "pre_days": pre_days if compare == "presale" else None,
+        "sort": sort,
+        "summary": [
+            {
+                "platform": row["platform"] or None,
+                "year": int(row["year"]),
+                "products": int(row["products"]),
+                "mean_price_change_pct": _format_currency(row["mean_price_change_pct"]),
+                "median_price_change_pct": _format_currency(row["median_price_change_pct"]),
+                "mean_mrp_change_pct": _format_currency(row["mean_mrp_change_pct"]),
+                "mrp_raised_share": _format_currency(row["mrp_raised_share"]),
+            }
+            for row in summary.to_dict("records")
+        ],
+        "changes": [
+            {
+                "product_match_id": row["product_match_id"],
+                "platform": row["platform"] or None,
+                "year": int(row["year"]),
+                "before": {
+                    "listings": int(row["before_listings"]),
+                    "mean_price": _format_currency(row["before_price"]),
+                    "mean_mrp": _format_currency(row["before_mrp"]),
+                },
+                "after": {
+                    "listings": int(row["after_listings"]),
+                    "mean_price": _format_currency(row["after_price"]),
+                    "mean_mrp": _format_currency(row["after_mrp"]),
+                },
+                "price_change_pct": _format_currency(row["price_change_pct"]),
+                "mrp_change_pct": _format_currency(row["mrp_change_pct"]),
+            }
+            for row in top.to_dict("records")
+        ],
+        "dataset_version": version,
+    })
+
+
+def _build_recommendations() -> None:
+    """Rank the search terms of the current dataset, unless the latest ranking is already for it.
+
+    The frame is assembled from a snapshot of DATAFRAME and the pending
+    batches, so neither the ranking nor the concatenation holds _STATE_LOCK.
+    """
+    global _RECOMMENDATIONS
+    with _RECOMMENDATIONS_LOCK:
+        built_for, recommendations, _ = _RECOMMENDATIONS
+        if recommendations is not None and built_for == DATASET_VERSION:
+            return
+        with _STATE_LOCK:
+            frames, version = [DATAFRAME, *_PENDING_BATCHES], DATASET_VERSION
+        frames = [frame for frame in frames if not frame.empty]
+        df = concat_rows(frames) if len(frames) > 1 else frames[0] if frames else DATAFRAME
+        with stage_timer("recommendations"):
+            recommendations = build_recommendations(df)
+        _RECOMMENDATIONS = (version, recommendations, df)
+        logger.info("Ranked %d search terms for dataset version %d", len(recommendations), version)
+
+
+def _refresh_recommendations() -> None:
+    """Rebuild the ranking in a background thread if one has been built and is out of date.
+
+    Requests keep getting the previous ranking until the new one is swapped
+    in; a refresh already running picks up later versions before it exits.
+    """
+    global _RECOMMENDATIONS_REFRESH
+
+    def run() -> None:
+        try:
+            while _RECOMMENDATIONS[0] != DATASET_VERSION:
+                _build_recommendations()
+        except Exception:
+            logger.exception("Rebuilding the search recommendations failed")
+
+    if _RECOMMENDATIONS[1] is None or _RECOMMENDATIONS[0] == DATASET_VERSION:
+        return
+    with _STATE_LOCK:
+        if _RECOMMENDATIONS_REFRESH is not None and _RECOMMENDATIONS_REFRESH.is_alive():
+            return
+        _RECOMMENDATIONS_REFRESH = threading.Thread(target=run, name="recommendations", daemon=True)
+        _RECOMMENDATIONS_REFRESH.start()
+
+
+def current_recommendations() -> Tuple[TermRecommendations, pd.DataFrame, int]:
+    """Ranked search terms, the frame they were built from and its dataset version.
+
+    Only the first call builds them in the request; after that a stale
+    ranking is served while ``_refresh_recommendations`` replaces it.
+    """
+    if _RECOMMENDATIONS[1] is None:
+        _build_recommendations()
+    else:
+        _refresh_recommendations()
+    version, recommendations, df = _RECOMMENDATIONS
+    return recommendations, df, version
+
+
+@api.get("/api/search-recommendations")
+def search_recommendations() -> Any:
+    """Search terms with the best cross-platform comparisons.
+
+    Terms are title words and two-word phrases found on two or more
+    platforms, ranked by ``sort``: score (default; coverage weighted by price
+    gap), coverage (rows on the thinnest platform) or gap (percent gap
+    between the platforms' best prices). ``words`` (1 or 2) restricts the
+    phrase length. The ranking is built on the first request and rebuilt in
+    the background after each change to the dataset; until then the previous
+    one is served, and ``dataset_version`` is the version it was built for.
+    """
+    sort = request.args.get("sort", "score")
+    if sort not in SORT_KEYS:
+        return jsonify({"error": f"Unsupported 'sort' value: {sort}"}), 400
+    limit = max(1, min(request.args.get("limit", 10, type=int), 100))
+    words = request.args.get("words", type=int)
+
+    recommendations, df, version = current_recommendations()
+    titles = df["product title"] if "product title" in df.columns else None
+    return jsonify({
+        "sort": sort,
+        "terms": recommendations.to_records(recommendations.top(limit, sort, words), titles),
+        "dataset_version": version,
+    })
+
+
+@api.get("/api/term-stats")
+def term_stats() -> Any:
+    """Per-platform row counts of title keywords, brands or categories.
+
+    ``field`` is keyword (default), brand or category. Without ``terms`` it
+    lists the values found on at least ``min_platforms`` platforms (default 2),
+    most rows first; keywords shorter than ``min_length`` (default 4) are
+    skipped. With ``terms`` (comma-separated) it counts the rows whose value
+    contains each term, as a search on that field would. Served from count
+    tables kept at load and ingest time.
+    """
+    field = request.args.get("field", "keyword")
+    if field not in REPORT_FIELDS:
+        return jsonify({"error": f"Unsupported 'field' value: {field}"}), 400
+    limit = max(1, min(request.args.get("limit", 20, type=int), 500))
+    stats = TERM_STATS
+
+    terms = [term.strip() for term in request.args.get("terms", "").split(",") if term.strip()]
+    if terms:
+        report = stats.contains(terms[:limit], "title" if field == "keyword" else field)
+    else:
+        report = stats.common(
+            field,
+            min_platforms=request.args.get("min_platforms", 2, type=int),
+            min_length=request.args.get("min_length", 4 if field == "keyword" else 1, type=int),
+            limit=limit,
+        )
+    return jsonify({
+        "field": field,
+        "platforms": stats.platforms,
+        "values": stats.to_records(report),
+        "dataset_version": DATASET_VERSION,
+    })
+
+
+@api.post("/api/ingest")
+def ingest() -> Any:
+    """Append a CSV batch (the request body) to the loaded dataset.
+
+    Disabled unless PRICE_API_INGEST_TOKEN is set; callers send the token in
+    the X-Ingest-Token header. Each worker process holds its own copy of the
+    dataset, so use ingest.py and reload the workers when running several.
+    """
+    if not INGEST_TOKEN:
+        return jsonify({"error": "Ingestion is disabled. Set PRICE_API_INGEST_TOKEN to enable it."}), 404
+    if not hmac.compare_digest(request.headers.get("X-Ingest-Token", ""), INGEST_TOKEN):
+        return jsonify({"error": "Invalid ingest token."}), 403
+
+    try:
+        batch = pd.read_csv(io.BytesIO(request.get_data()), parse_dates=["timestamp"])
+    except (ValueError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        return jsonify({"error": f"Could not parse CSV batch: {e}"}), 400
+    if batch.empty:
+        return jsonify({"error": "CSV batch has no rows."}), 400
+
+    with stage_timer("ingest"):
+        version = append_batch(batch)
+    return jsonify({"appended": len(batch), "total_rows": _row_count(), "dataset_version": version})
+
+
+@api.get("/api/alerts")
+def list_alerts() -> Any:
+    """Stored price-drop alerts, oldest first."""
+    return jsonify({"alerts": [alert.to_dict() for alert in ALERTS.alerts()]})
+
+
+@api.post("/api/alerts")
+def create_alert() -> Any:
+    """Store a price-drop alert from a JSON body.
+
+    ``max_price`` plus either ``product_match_id`` (one matched product) or
+    ``q`` (listings containing every word); ``platform`` limits it to one
+    platform. A query is read as ``match=all`` reads it: its words also
+    match their accented spellings and typo corrections, resolved now against
+    the current vocabulary, and its synonym variants match too. Each ingested
+    batch is checked against the stored alerts. With PRICE_API_ALERTS_PATH
+    set, every worker process reads and writes the same alerts.
+    """
+    body = request.get_json(silent=True) or {}
+    match_id = body.get("product_match_id")
+    if match_id is not None and match_id not in PRODUCT_ROWS:
+        return jsonify({"error": f"Unknown product_match_id '{match_id}'."}), 404
+    query = body.get("q")
+    alternatives: Dict[str, List[str]] = {}
+    if isinstance(query, str) and match_id is None:
+        alternatives, _ = _query_alternatives(SEARCH_INDEX, query, "all", fuzzy=True)
+    try:
+        alert = ALERTS.create(
+            max_price=float(body.get("max_price", 0)),
+            product_match_id=match_id,
+            query=query,
+            platform=body.get("platform"),
+            alternatives=alternatives,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(alert.to_dict()), 201
+
+
+@api.get("/api/alerts/<alert_id>")
+def get_alert(alert_id: str) -> Any:
+    """One alert and its most recent hits, newest first."""
+    alert = ALERTS.get(alert_id)
+    if alert is None:
+        return jsonify({"error": f"Unknown alert '{alert_id}'."}), 404
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    return jsonify({**alert.to_dict(), "recent_hits": ALERTS.recent_hits(alert_id, limit)})
+
+
+@api.delete("/api/alerts/<alert_id>")
+def delete_alert(alert_id: str) -> Any:
+    if not ALERTS.remove(alert_id):
+        return jsonify({"error": f"Unknown alert '{alert_id}'."}), 404
+    return jsonify({"deleted": alert_id})
+
+
+@api.get("/api/metrics")
+def metrics() -> Any:
+    """Request and per-stage latency histograms in Prometheus text format."""
+    return Response(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@api.get("/api/profiles")
+def list_profiles() -> Any:
+    """Recent slow-request captures written by the opt-in profiler."""
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify({"profiler": PROFILER.describe(), "captures": PROFILER.recent(limit)})
+
+
+def create_app(dataset_path: Optional[str] = None, load: bool = True) -> Flask:
+    """Load the dataset (``dataset_path``, default DATASET_PATH) and build the Flask app.
+
+    Importing this module loads nothing; ``load=False`` builds the app around
+    whatever ``init_dataset`` already loaded.
+    """
+    if load:
+        init_dataset(dataset_path or DATASET_PATH)
+
+    flask_app = Flask(__name__)
+    CORS(flask_app, resources={r"/api/*": {"origins": "*"}})
+    flask_app.json = CustomJSONProvider(flask_app)
+    flask_app.register_blueprint(api)
+    return flask_app
+
+
 if __name__ == "__main__":
     try:
+        app = create_app()
         print("=" * 60)
         print("🚀 Starting Flask API Server...")
         print("=" * 60)
@@ -753,17 +1470,28 @@ if __name__ == "__main__":
             print(f"✅ Dataset loaded: {len(DATAFRAME)} rows")
             print(f"📊 Columns: {list(DATAFRAME.columns)[:5]}...")
         
-        print("\n🌐 Server will run on:")
+        print("\n🌐 Development server will run on:")
         print("   - http://localhost:5000")
         print("   - http://127.0.0.1:5000")
         print("\n📡 API Endpoints:")
         print("   - GET /api/filters")
         print("   - GET /api/price-comparison?q=<search_term>")
+        print("   - GET /api/product/<match_id>/prices")
+        print("   - GET /api/price-quantiles")
+        print("   - GET /api/festive-summary?by=festive_event,platform,year")
+        print("   - GET /api/price-changes?festive=<window>&compare=presale|yoy")
+        print("   - GET /api/search-recommendations?sort=score|coverage|gap")
+        print("   - GET /api/term-stats?field=keyword|brand|category")
+        print("   - POST /api/ingest (when PRICE_API_INGEST_TOKEN is set)")
+        print("   - GET/POST /api/alerts, GET/DELETE /api/alerts/<alert_id>")
+        print("   - GET /api/metrics")
+        print("   - GET /api/profiles")
         print("\n" + "=" * 60)
+        print("For production use: python serve.py (see README)")
         print("Press CTRL+C to stop the server")
         print("=" * 60 + "\n")
         
-        app.run(host='127.0.0.1', port=5000, debug=True, use_reloader=False)
+        app.run(host='127.0.0.1', port=5000, debug=os.environ.get("FLASK_DEBUG") == "1", use_reloader=False)
     except KeyboardInterrupt:
         print("\n\n👋 Server stopped by user")
     except Exception as e:
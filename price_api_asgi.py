@@ -0,0 +1,283 @@
+"""ASGI front end for the price comparison API.
+
+    pip install uvicorn
+    uvicorn price_api_asgi:app --host 0.0.0.0 --port 5000
+
+The event loop never runs pandas code itself. Searches are handed to a bounded
+executor (threads by default, or forked worker processes that inherit the
+loaded dataset), while ``/api/filters`` and recently served searches are
+answered straight from memory. POST and DELETE requests (ingest, alerts)
+carry their body through to Flask and always run in this process, so the
+state they change is the state the thread executor serves. When every worker
+is busy and the wait queue is full the server answers 429 with
+``Retry-After`` instead of letting requests pile up behind slow searches.
+
+Settings (environment):
+    PRICE_API_ASYNC_WORKERS    executor size (default: CPU count)
+    PRICE_API_ASYNC_QUEUE      requests allowed to wait for a worker (default: 16)
+    PRICE_API_ASYNC_EXECUTOR   "thread" (default) or "process"
+    PRICE_API_RESPONSE_CACHE   cached search responses (default: 256, 0 disables)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+import price_api
+
+logger = logging.getLogger("price_api.asgi")
+
+# Responses that only change when the dataset is reloaded or appended to.
+PRECOMPUTED_PATHS = ("/api/filters",)
+CACHEABLE_PATHS = (
+    "/api/filters", "/api/price-comparison", "/api/search-recommendations", "/api/term-stats",
+    "/api/festive-summary", "/api/price-changes",
+)
+
+ALLOWED_METHODS = ("GET", "HEAD", "POST", "DELETE", "OPTIONS")
+# Served through the cache and the executor; every other allowed method carries a body and changes state.
+READ_METHODS = ("GET", "HEAD")
+
+WsgiResult = Tuple[int, List[Tuple[str, str]], bytes]
+
+# Loads the dataset once at import, before any worker process is forked.
+flask_app = price_api.create_app()
+
+
+def _call_wsgi(
+    path: str, query_string: str, headers: List[Tuple[str, str]], method: str = "GET", body: bytes = b""
+) -> WsgiResult:
+    """Run one request through the Flask app. Executed in a worker thread or process."""
+    environ = EnvironBuilder(
+        path=path, method=method, query_string=query_string, headers=headers, data=body or None
+    ).get_environ()
+    app_iter, status, response_headers = run_wsgi_app(flask_app, environ, buffered=True)
+    try:
+        body = b"".join(app_iter)
+    finally:
+        if hasattr(app_iter, "close"):
+            app_iter.close()
+    return int(status.split(" ", 1)[0]), list(response_headers.items()), body
+
+
+async def _read_body(receive: Any) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _make_executor(kind: str, workers: int) -> Executor:
+    if kind == "process":
+        # Forked children inherit the already-loaded dataset instead of re-reading the CSV.
+        context = multiprocessing.get_context("fork" if os.name != "nt" else "spawn")
+        return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="price-api")
+
+
+class AsyncPriceApi:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: int = 16,
+        executor: str = "thread",
+        cache_size: int = 256,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + max(0, queue_size)
+        self.executor_kind = executor
+        self.cache_size = cache_size
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._precomputed: Dict[str, WsgiResult] = {}
+        self._cache: "OrderedDict[Tuple[str, str], WsgiResult]" = OrderedDict()
+        self._dataset_version = price_api.DATASET_VERSION
+
+    @classmethod
+    def from_env(cls) -> "AsyncPriceApi":
+        return cls(
+            workers=int(os.environ.get("PRICE_API_ASYNC_WORKERS", 0)) or None,
+            queue_size=int(os.environ.get("PRICE_API_ASYNC_QUEUE", 16)),
+            executor=os.environ.get("PRICE_API_ASYNC_EXECUTOR", "thread"),
+            cache_size=int(os.environ.get("PRICE_API_RESPONSE_CACHE", 256)),
+        )
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = _make_executor(self.executor_kind, self.workers)
+        return self._executor
+
+    def invalidate(self) -> None:
+        """Drop precomputed and cached responses, e.g. after the dataset is reloaded."""
+        self._precomputed.clear()
+        self._cache.clear()
+
+    def _check_dataset_version(self) -> None:
+        # Batches appended through price_api.append_batch() bump the version; with the
+        # thread executor they are visible here and stale responses are dropped.
+        if price_api.DATASET_VERSION != self._dataset_version:
+            self._dataset_version = price_api.DATASET_VERSION
+            self.invalidate()
+
+    async def startup(self) -> None:
+        loop = asyncio.get_running_loop()
+        for path in PRECOMPUTED_PATHS:
+            result = await loop.run_in_executor(self.executor, _call_wsgi, path, "", [])
+            if result[0] == 200:
+                self._precomputed[path] = result
+        logger.info(
+            "ASGI API ready: %d %s workers, queue %d", self.workers, self.executor_kind, self.capacity - self.workers
+        )
+
+    async def shutdown(self) -> None:
+        if self._executor is not None:
+            # Let queued searches finish; the server has already stopped accepting connections.
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown, True)
+            self._executor = None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method = scope["method"]
+        if method not in ALLOWED_METHODS:
+            await self._send(
+                send,
+                405,
+                [("Content-Type", "application/json"), ("Allow", ", ".join(ALLOWED_METHODS))],
+                b'{"error": "Method not allowed"}',
+            )
+            return
+        if method == "OPTIONS":
+            await self._send(
+                send,
+                204,
+                [
+                    ("Access-Control-Allow-Methods", ", ".join(ALLOWED_METHODS)),
+                    ("Access-Control-Allow-Headers", "Content-Type, X-Ingest-Token"),
+                ],
+                b"",
+            )
+            return
+        # HEAD is answered from the GET response (and its cache) with the body dropped.
+        head = method == "HEAD"
+
+        path = scope["path"]
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope.get("headers", [])]
+        if method not in READ_METHODS:
+            await self._mutate(scope, receive, send, method, path, query_string, headers)
+            return
+        self._check_dataset_version()
+
+        precomputed = self._precomputed.get(path) if not query_string else None
+        if precomputed is not None:
+            await self._send(send, *precomputed, head=head)
+            return
+
+        key = (path, query_string)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            await self._send(send, *cached, head=head)
+            return
+
+        if self._in_flight >= self.capacity:
+            await self._send_busy(send)
+            return
+
+        self._in_flight += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _call_wsgi, path, query_string, headers
+            )
+        finally:
+            self._in_flight -= 1
+
+        if (
+            result[0] == 200
+            and path in CACHEABLE_PATHS
+            and self.cache_size > 0
+            and self._dataset_version == price_api.DATASET_VERSION
+        ):
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        await self._send(send, *result, head=head)
+
+    async def _mutate(
+        self, scope: Dict[str, Any], receive: Any, send: Any, method: str, path: str, query_string: str,
+        headers: List[Tuple[str, str]],
+    ) -> None:
+        """POST/DELETE: pass the request body through and run the handler in this process.
+
+        Ingest and alert changes update module state, so they never go to the
+        process executor, whose children would only change their own copy.
+        """
+        if self._in_flight >= self.capacity:
+            await self._send_busy(send)
+            return
+        body = await _read_body(receive)
+        executor = self.executor if self.executor_kind == "thread" else None
+        self._in_flight += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                executor, _call_wsgi, path, query_string, headers, method, body
+            )
+        finally:
+            self._in_flight -= 1
+        self._check_dataset_version()
+        await self._send(send, *result)
+
+    async def _lifespan(self, receive: Any, send: Any) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _send_busy(self, send: Any) -> None:
+        await self._send(
+            send,
+            429,
+            [("Content-Type", "application/json"), ("Retry-After", "1")],
+            b'{"error": "Server busy, please retry shortly."}',
+        )
+
+    @staticmethod
+    async def _send(
+        send: Any, status: int, headers: List[Tuple[str, str]], body: bytes, head: bool = False
+    ) -> None:
+        raw_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers
+            if name.lower() not in ("content-length", "access-control-allow-origin")
+        ]
+        raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        raw_headers.append((b"access-control-allow-origin", b"*"))
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        # A HEAD reply keeps the GET response's Content-Length but sends no body.
+        await send({"type": "http.response.body", "body": b"" if head else body})
+
+
+app = AsyncPriceApi.from_env()
@@ -0,0 +1,188 @@
+"""Price series of every matched product on every platform, compared across festive windows.
+
+``PriceHistory`` stores each valid listing as one point in flat numpy arrays:
+the series code of its (product_match_id, platform) pair, the day, year,
+month-day, final price and MRP. A comparison for one festive window marks
+the points with array arithmetic and aggregates them with one groupby, so a
+question like "did Flipkart raise MRPs before Big Billion Days?" never loops
+over products:
+
+* ``presale`` - each series' mean price and MRP in the ``pre_days`` before
+  the window against the same year's in-window means.
+* ``yoy`` - each series' in-window means against the previous year's.
+
+Appending a batch only adds its points; series codes are stable.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from festive_windows import FESTIVE_WINDOWS
+from sources import platform_labels
+
+COMPARE_MODES = ("presale", "yoy")
+PRE_SALE_DAYS = 30
+CHANGE_COLUMNS = [
+    "product_match_id", "platform", "year",
+    "before_listings", "before_price", "before_mrp",
+    "after_listings", "after_price", "after_mrp",
+    "price_change_pct", "mrp_change_pct",
+]
+_POINT_DTYPES = {
+    "series": np.int32, "day": np.int32, "year": np.int16, "month_day": np.int16,
+    "price": np.float64, "mrp": np.float64,
+}
+
+
+def find_window(name: str) -> Optional[Dict[str, Any]]:
+    """The FESTIVE_WINDOWS entry called ``name`` (case-insensitive)."""
+    wanted = name.strip().lower()
+    return next((window for window in FESTIVE_WINDOWS if window["name"].lower() == wanted), None)
+
+
+def _window_start_days(years: np.ndarray, start: Tuple[int, int]) -> np.ndarray:
+    """Day number (days since 1970-01-01) of the window start in each of ``years``."""
+    months = (years.astype(np.int64) - 1970) * 12 + (start[0] - 1)
+    return months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + (start[1] - 1)
+
+
+def _pct_change(before: pd.Series, after: pd.Series) -> pd.Series:
+    return ((after - before) / before * 100).where(before > 0)
+
+
+class PriceHistory:
+    def __init__(self) -> None:
+        self._codes: Dict[Tuple[str, str], int] = {}
+        self._series: List[Tuple[str, str]] = []
+        self.points: Dict[str, np.ndarray] = {name: np.zeros(0, dtype) for name, dtype in _POINT_DTYPES.items()}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "PriceHistory":
+        history = cls()
+        history.add(df)
+        return history
+
+    def add(self, df: pd.DataFrame) -> None:
+        """Add the matched, valid-priced rows of ``df``; the point arrays are replaced, never modified in place."""
+        if df.empty or any(col not in df.columns for col in ("product_match_id", "timestamp", "final_price")):
+            return
+        valid = df["price_valid"] if "price_valid" in df.columns else df["final_price"].gt(0)
+        rows = df[valid & df["product_match_id"].notna() & df["timestamp"].notna()]
+        if rows.empty:
+            return
+
+        platforms = platform_labels(rows)
+        grouped = pd.DataFrame({"id": rows["product_match_id"].astype(str), "platform": platforms}).groupby(
+            ["id", "platform"], sort=False
+        )
+        # Code the batch's distinct pairs once; rows reuse them through the group number.
+        batch_codes = np.empty(grouped.ngroups, dtype=np.int32)
+        for number, key in enumerate(grouped.groups.keys()):
+            code = self._codes.get(key)
+            if code is None:
+                code = self._codes[key] = len(self._series)
+                self._series.append(key)
+            batch_codes[number] = code
+        group_numbers = grouped.ngroup().to_numpy()
+
+        timestamps = rows["timestamp"]
+        mrp = pd.to_numeric(rows["mrp"], errors="coerce") if "mrp" in rows.columns else pd.Series(np.nan, rows.index)
+        batch = {
+            "series": batch_codes[group_numbers],
+            "day": timestamps.to_numpy(dtype="datetime64[D]").astype(np.int64),
+            "year": timestamps.dt.year.to_numpy(),
+            "month_day": (timestamps.dt.month * 100 + timestamps.dt.day).to_numpy(),
+            "price": rows["final_price"].to_numpy(dtype=float),
+            "mrp": mrp.where(mrp > 0).to_numpy(dtype=float),
+        }
+        points = self.points
+        self.points = {
+            name: np.concatenate([points[name], np.asarray(batch[name]).astype(dtype)])
+            for name, dtype in _POINT_DTYPES.items()
+        }
+
+    def _phase_means(self, points: Dict[str, np.ndarray], mask: np.ndarray, years: np.ndarray) -> pd.DataFrame:
+        """listings, mean price and mean MRP per (series, year) of the masked points."""
+        frame = pd.DataFrame({
+            "series": points["series"][mask], "year": years[mask],
+            "price": points["price"][mask], "mrp": points["mrp"][mask],
+        })
+        return frame.groupby(["series", "year"]).agg(
+            listings=("price", "size"), price=("price", "mean"), mrp=("mrp", "mean")
+        )
+
+    def compare(self, window_name: str, mode: str = "presale", pre_days: int = PRE_SALE_DAYS) -> pd.DataFrame:
+        """Per-series price and MRP change for one festive window (CHANGE_COLUMNS).
+
+        ``presale`` compares the ``pre_days`` days before the window with the
+        window itself, ``yoy`` the window with the same window a year
+        earlier. Only series present in both periods are returned.
+        """
+        window = find_window(window_name)
+        if window is None:
+            raise ValueError(f"Unknown festive window '{window_name}'")
+        if mode not in COMPARE_MODES:
+            raise ValueError(f"Unknown comparison '{mode}'; expected one of {COMPARE_MODES}")
+
+        points = self.points
+        month_day = points["month_day"]
+        years = points["year"].astype(np.int64)
+        in_window = (
+            (month_day >= window["start"][0] * 100 + window["start"][1])
+            & (month_day <= window["end"][0] * 100 + window["end"][1])
+        )
+        after = self._phase_means(points, in_window, years)
+
+        if mode == "yoy":
+            before = self._phase_means(points, in_window, years + 1)
+        else:
+            # The run-up may start in the previous calendar year (e.g. before a January window).
+            day = points["day"].astype(np.int64)
+            window_years = np.where(day < _window_start_days(years, window["start"]), years, years + 1)
+            start = _window_start_days(window_years, window["start"])
+            pre_sale = (day >= start - pre_days) & (day < start)
+            before = self._phase_means(points, pre_sale, window_years)
+
+        changes = before.join(after, how="inner", lsuffix="_before", rsuffix="_after").reset_index()
+        if changes.empty:
+            return pd.DataFrame(columns=CHANGE_COLUMNS)
+        series = np.array(self._series, dtype=object).reshape(-1, 2)[changes["series"].to_numpy()]
+        return pd.DataFrame({
+            "product_match_id": series[:, 0],
+            "platform": series[:, 1],
+            "year": changes["year"].astype(np.int64),
+            "before_listings": changes["listings_before"].astype(np.int64),
+            "before_price": changes["price_before"],
+            "before_mrp": changes["mrp_before"],
+            "after_listings": changes["listings_after"].astype(np.int64),
+            "after_price": changes["price_after"],
+            "after_mrp": changes["mrp_after"],
+            "price_change_pct": _pct_change(changes["price_before"], changes["price_after"]),
+            "mrp_change_pct": _pct_change(changes["mrp_before"], changes["mrp_after"]),
+        })[CHANGE_COLUMNS]
+
+
+def summarize_changes(changes: pd.DataFrame) -> pd.DataFrame:
+    """Per (platform, year): products compared, mean/median price change, mean MRP change, share with a higher MRP."""
+    columns = [
+        "platform", "year", "products", "mean_price_change_pct", "median_price_change_pct",
+        "mean_mrp_change_pct", "mrp_raised_share",
+    ]
+    if changes.empty:
+        return pd.DataFrame(columns=columns)
+    mrp_change = changes["mrp_change_pct"]
+    frame = changes.assign(mrp_raised=mrp_change.gt(0).astype(float).where(mrp_change.notna()))
+    summary = frame.groupby(["platform", "year"], sort=True).agg(
+        products=("product_match_id", "size"),
+        mean_price_change_pct=("price_change_pct", "mean"),
+        median_price_change_pct=("price_change_pct", "median"),
+        mean_mrp_change_pct=("mrp_change_pct", "mean"),
+        mrp_raised_share=("mrp_raised", "mean"),
+    )
+    return summary.reset_index()[columns]
@@ -0,0 +1,401 @@
+"""Cross-platform product matching.
+
+Pairs listings of the same product on different platforms and gives every
+listing a persistent ``product_match_id``:
+
+1. Titles are normalized (accents stripped, lower-cased, units glued to their
+   numbers, punctuation dropped) and identical (platform, block, title) rows
+   collapse into one listing.
+2. Listings are blocked by brand: the normalized brand when it appears in the
+   title, otherwise the first title word.
+3. Within a block, MinHash signatures banded into LSH buckets propose
+   candidate pairs from different platforms, so the work grows with the number
+   of listings rather than with Amazon x Flipkart.
+4. Candidates are kept when their token Jaccard similarity reaches the
+   threshold, their numbers agree (pack sizes, model numbers), and each is the
+   other's best match on that platform.
+5. Matched pairs are joined into groups from the most similar down, skipping
+   any join that would put two listings of one platform in the same group.
+
+Matched listings share an id. Ids are kept from the previous run whenever a
+group still contains a listing that had one, and new groups get an id derived
+from their title.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sources import platform_labels
+
+LISTING_KEYS = ["platform", "block", "title_key"]
+STOPWORDS = frozenset({"a", "an", "and", "by", "for", "in", "of", "the", "with"})
+UNIT_PATTERN = r"(\d+(?:\.\d+)?)\s+(ml|l|ltr|litre|g|gm|gms|kg|mg|mah|gb|tb|w|cm|mm|inch|pcs|pack)\b"
+
+_PRIME = (1 << 61) - 1
+
+
+def matches_path(dataset_path: str) -> str:
+    """Where the listing -> product_match_id table for ``dataset_path`` is saved."""
+    if os.path.isdir(dataset_path):
+        return os.path.join(dataset_path, "matches.csv")
+    root, _ = os.path.splitext(dataset_path)
+    return root + ".matches.csv"
+
+
+def normalize_text(values: pd.Series) -> pd.Series:
+    """Normalized form of each value, computed once per distinct value."""
+    codes, uniques = pd.factorize(values.fillna("").astype(str))
+    normalized = _normalize_unique(pd.Series(uniques, dtype=object))
+    return pd.Series(normalized.to_numpy()[codes], index=values.index, dtype=object)
+
+
+def _normalize_unique(values: pd.Series) -> pd.Series:
+    text = (
+        values
+        .astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.lower()
+    )
+    text = text.str.replace(UNIT_PATTERN, r"\1\2", regex=True)
+    # Keep decimal points inside numbers, drop every other non-alphanumeric character.
+    text = text.str.replace(r"(?<!\d)\.|\.(?!\d)", " ", regex=True)
+    text = text.str.replace(r"[^a-z0-9.]+", " ", regex=True)
+    words = text.str.split()
+    return words.map(lambda ws: " ".join(w for w in ws if w not in STOPWORDS))
+
+
+def listing_keys(df: pd.DataFrame, title_col: str = "product title", brand_col: str = "brand") -> pd.DataFrame:
+    """platform, block and normalized title of each row."""
+    title_key = normalize_text(df[title_col]) if title_col in df.columns else pd.Series("", index=df.index)
+    brand = normalize_text(df[brand_col]) if brand_col in df.columns else pd.Series("", index=df.index)
+    first_word = title_key.str.split(n=1).str[0].fillna("")
+    brand_in_title = pd.Series(
+        [bool(b) and f" {b} " in f" {t} " for b, t in zip(brand, title_key)], index=df.index
+    )
+    block = brand.where(brand_in_title, first_word)
+    platform = platform_labels(df)
+    return pd.DataFrame({"platform": platform, "block": block, "title_key": title_key}, index=df.index)
+
+
+def _stable_id(text: str) -> str:
+    return "pm-" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _numeric_signature(title_key: str) -> str:
+    return " ".join(sorted(w for w in title_key.split() if any(c.isdigit() for c in w)))
+
+
+def _platform_groups(
+    platforms: np.ndarray, left: np.ndarray, right: np.ndarray, similarity: np.ndarray
+) -> np.ndarray:
+    """Smallest member index of each listing's group, joining matched pairs from the most similar down.
+
+    Pairs are matched per platform pair, so with three or more platforms
+    chaining them could put two listings of one platform in a group; a join
+    that would do so is skipped.
+    """
+    parent = np.arange(len(platforms))
+    group_platforms: Dict[int, Set[int]] = {i: {int(p)} for i, p in enumerate(platforms)}
+
+    def find(i: int) -> int:
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    for k in np.lexsort((right, left, -similarity)):
+        a, b = find(int(left[k])), find(int(right[k]))
+        if a == b or group_platforms[a] & group_platforms[b]:
+            continue
+        # Roots stay the smallest index of their group.
+        root, other = min(a, b), max(a, b)
+        parent[other] = root
+        group_platforms[root] |= group_platforms.pop(other)
+    return np.array([find(i) for i in range(len(platforms))], dtype=np.int64)
+
+
+class ProductMatcher:
+    def __init__(
+        self,
+        threshold: float = 0.6,
+        num_perm: int = 64,
+        bands: int = 16,
+        max_bucket: int = 200,
+        seed: int = 7,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.max_bucket = max_bucket
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def match(
+        self,
+        df: pd.DataFrame,
+        previous: Optional[pd.DataFrame] = None,
+        title_col: str = "product title",
+        brand_col: str = "brand",
+    ) -> pd.DataFrame:
+        """One row per listing: platform, block, title_key, rows, product_match_id."""
+        keys = listing_keys(df, title_col, brand_col)
+        listings = keys.groupby(LISTING_KEYS, sort=True).size().rename("rows").reset_index()
+        listings = listings[listings["title_key"] != ""].reset_index(drop=True)
+
+        left, right, similarity = self._matched_pairs(listings)
+        components = _platform_groups(pd.factorize(listings["platform"])[0], left, right, similarity)
+        listings["product_match_id"] = self._assign_ids(listings, components, previous)
+        return listings
+
+    def extend(self, listings: pd.DataFrame, batch: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+        """Ids for the rows of a new batch without re-running the matcher; see ``ListingTable.extend``.
+
+        Returns the updated listing table and the ids. Building the table is
+        O(listings); a long-running process keeps a ``ListingTable`` instead.
+        """
+        table = ListingTable(listings)
+        ids = table.extend(batch)
+        return table.to_frame(), ids
+
+    def _signatures(self, title_keys: pd.Series) -> np.ndarray:
+        tokens = title_keys.str.split().explode()
+        owner = tokens.index.to_numpy()
+        codes, vocabulary = pd.factorize(tokens.to_numpy())
+        token_hashes = np.array([zlib.crc32(t.encode("utf-8")) for t in vocabulary], dtype=np.uint64)
+        x = token_hashes[codes]
+        order = np.argsort(owner, kind="stable")
+        owner, x = owner[order], x[order]
+        starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+
+        signatures = np.empty((len(title_keys), self.num_perm), dtype=np.uint64)
+        for i in range(self.num_perm):
+            hashed = (self._a[i] * x + self._b[i]) % _PRIME
+            signatures[:, i] = np.minimum.reduceat(hashed, starts)
+        return signatures
+
+    def _matched_pairs(self, listings: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Mutual-best pairs (left, right listing) and their similarity."""
+        empty = np.zeros(0, dtype=np.int64)
+        if listings["platform"].nunique() < 2:
+            return empty, empty, np.zeros(0)
+        signatures = self._signatures(listings["title_key"])
+        block_codes = pd.factorize(listings["block"])[0]
+        platform_codes = pd.factorize(listings["platform"])[0]
+
+        rows = signatures.shape[1] // self.bands
+        candidates = []
+        for band in range(self.bands):
+            columns = {"block": block_codes}
+            for j in range(rows):
+                columns[f"h{j}"] = signatures[:, band * rows + j]
+            bucket = pd.DataFrame(columns).groupby(list(columns), sort=False).ngroup().to_numpy()
+            sizes = np.bincount(bucket)
+            keep = (sizes[bucket] > 1) & (sizes[bucket] <= self.max_bucket)
+            members = pd.DataFrame(
+                {"bucket": bucket[keep], "listing": np.flatnonzero(keep), "platform": platform_codes[keep]}
+            )
+            pairs = members.merge(members, on="bucket")
+            pairs = pairs[(pairs["listing_x"] < pairs["listing_y"]) & (pairs["platform_x"] != pairs["platform_y"])]
+            candidates.append(pairs[["listing_x", "listing_y"]])
+        pairs = pd.concat(candidates, ignore_index=True).drop_duplicates()
+        if pairs.empty:
+            return empty, empty, np.zeros(0)
+
+        token_sets: List[Set[str]] = [set(t.split()) for t in listings["title_key"]]
+        numbers = np.array([_numeric_signature(t) for t in listings["title_key"]], dtype=object)
+        left, right = pairs["listing_x"].to_numpy(), pairs["listing_y"].to_numpy()
+        similarity = np.array(
+            [len(token_sets[i] & token_sets[j]) / len(token_sets[i] | token_sets[j]) for i, j in zip(left, right)]
+        )
+        same_numbers = (numbers[left] == numbers[right]) | (numbers[left] == "") | (numbers[right] == "")
+        keep = (similarity >= self.threshold) & same_numbers
+        left, right, similarity = left[keep], right[keep], similarity[keep]
+
+        # Keep a pair only if each side is the other's best match on that platform.
+        directed = pd.DataFrame(
+            {
+                "source": np.r_[left, right],
+                "target": np.r_[right, left],
+                "target_platform": platform_codes[np.r_[right, left]],
+                "similarity": np.r_[similarity, similarity],
+            }
+        )
+        best = directed.sort_values(["similarity", "target"], ascending=[False, True]).drop_duplicates(
+            ["source", "target_platform"]
+        )
+        chosen = set(zip(best["source"], best["target"]))
+        mutual = np.array([(i, j) in chosen and (j, i) in chosen for i, j in zip(left, right)], dtype=bool)
+        return left[mutual], right[mutual], similarity[mutual]
+
+    @staticmethod
+    def _assign_ids(listings: pd.DataFrame, components: np.ndarray, previous: Optional[pd.DataFrame]) -> List[str]:
+        old_ids: Dict[int, str] = {}
+        if previous is not None and not previous.empty:
+            old = listings[LISTING_KEYS].reset_index().merge(previous, on=LISTING_KEYS, how="inner")
+            old_ids = dict(zip(old["index"], old["product_match_id"]))
+
+        canonical = (listings["block"] + "|" + listings["title_key"]).to_numpy()
+        members: Dict[int, List[int]] = {}
+        for position, component in enumerate(components):
+            members.setdefault(int(component), []).append(position)
+
+        ids = [""] * len(listings)
+        used: Set[str] = set()
+        for component in sorted(members, key=lambda c: min(canonical[p] for p in members[c])):
+            positions = members[component]
+            carried = Counter(old_ids[p] for p in positions if p in old_ids)
+            match_id = next((i for i, _ in sorted(carried.items(), key=lambda kv: (-kv[1], kv[0])) if i not in used), None)
+            if match_id is None:
+                match_id = _stable_id(min(canonical[p] for p in positions))
+                while match_id in used:
+                    match_id = _stable_id(match_id)
+            used.add(match_id)
+            for p in positions:
+                ids[p] = match_id
+        return ids
+
+
+def attach_match_ids(keys_or_df: pd.DataFrame, listings: pd.DataFrame) -> pd.Series:
+    """product_match_id for each row (NaN for listings the table does not know)."""
+    keys = keys_or_df if set(LISTING_KEYS) <= set(keys_or_df.columns) else listing_keys(keys_or_df)
+    lookup = listings.drop_duplicates(LISTING_KEYS).set_index(LISTING_KEYS)["product_match_id"]
+    index = pd.MultiIndex.from_frame(keys[LISTING_KEYS])
+    return pd.Series(lookup.reindex(index).to_numpy(), index=keys.index, name="product_match_id")
+
+
+def save_matches(listings: pd.DataFrame, path: str) -> None:
+    tmp_path = path + ".tmp"
+    listings.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def load_matches(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={"platform": str, "block": str, "title_key": str}, keep_default_na=False)
+
+
+ListingKey = Tuple[str, str, str]
+
+
+class ListingTable:
+    """The listing -> product_match_id table, held in dicts so a batch is matched in O(batch rows).
+
+    ``match()`` returns the table as a frame; ``to_frame()`` rebuilds that
+    frame (with updated row counts) when it is saved.
+    """
+
+    def __init__(self, listings: pd.DataFrame) -> None:
+        self._chunks: List[pd.DataFrame] = [listings[LISTING_KEYS + ["product_match_id"]]]
+        self._ids: Dict[ListingKey, str] = {}
+        self._rows: Dict[ListingKey, int] = {}
+        # First group seen with each (block, title_key), and the platforms in every group.
+        self._by_title: Dict[Tuple[str, str], str] = {}
+        self._platforms: Dict[str, Set[str]] = {}
+        self._add(listings[LISTING_KEYS].itertuples(index=False, name=None), listings["product_match_id"], listings["rows"])
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _add(self, keys: Iterable[ListingKey], match_ids: Iterable[str], rows: Iterable[int]) -> None:
+        for key, match_id, count in zip(keys, match_ids, rows):
+            if key in self._ids:
+                continue
+            platform, block, title_key = key
+            self._ids[key] = match_id
+            self._rows[key] = int(count)
+            self._by_title.setdefault((block, title_key), match_id)
+            self._platforms.setdefault(match_id, set()).add(platform)
+
+    def extend(self, batch: pd.DataFrame) -> pd.Series:
+        """product_match_id for each row of ``batch``, adding its new listings to the table.
+
+        Known listings keep their id. A new listing joins a group that has the
+        same block and title on another platform, and otherwise starts its own
+        group until the next full ``match()``.
+        """
+        keys = listing_keys(batch)
+        counts = keys.groupby(LISTING_KEYS, sort=False).size()
+        new_keys, new_ids, new_rows = [], [], []
+        for key, count in zip(counts.index, counts.to_numpy()):
+            if key in self._ids:
+                self._rows[key] += int(count)
+                continue
+            platform, block, title_key = key
+            if title_key == "":
+                continue
+            # Resolved against the table as it was before this batch.
+            match_id = self._by_title.get((block, title_key))
+            if match_id is None or platform in self._platforms.get(match_id, set()):
+                match_id = _stable_id(f"{block}|{title_key}|{platform}")
+            new_keys.append(key)
+            new_ids.append(match_id)
+            new_rows.append(int(count))
+        if new_keys:
+            self._add(new_keys, new_ids, new_rows)
+            self._chunks.append(pd.DataFrame(new_keys, columns=LISTING_KEYS).assign(product_match_id=new_ids))
+
+        ids = [self._ids.get(key, np.nan) for key in keys[LISTING_KEYS].itertuples(index=False, name=None)]
+        return pd.Series(ids, index=keys.index, name="product_match_id", dtype=object)
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per listing: platform, block, title_key, rows, product_match_id."""
+        listings = pd.concat(self._chunks, ignore_index=True)
+        rows = [self._rows[key] for key in listings[LISTING_KEYS].itertuples(index=False, name=None)]
+        return listings.assign(rows=np.asarray(rows, dtype=np.int64))[LISTING_KEYS + ["rows", "product_match_id"]]
+
+
+class MatchIndex:
+    """Row labels per product_match_id, so a product's rows are a dict lookup."""
+
+    def __init__(self) -> None:
+        self._rows: Dict[str, List[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, match_id: str) -> bool:
+        return match_id in self._rows
+
+    @classmethod
+    def from_ids(cls, ids: pd.Series) -> "MatchIndex":
+        index = cls()
+        index.add(ids)
+        return index
+
+    def add(self, ids: pd.Series) -> None:
+        """Register rows under their index labels (rows without an id are skipped)."""
+        ids = ids.dropna()
+        if ids.empty:
+            return
+        labels = pd.Series(ids.index.to_numpy(dtype=np.int64), index=ids.index)
+        groups = [(match_id, group.to_numpy()) for match_id, group in labels.groupby(ids, sort=False)]
+        with self._lock:
+            for match_id, group in groups:
+                self._rows.setdefault(match_id, []).append(group)
+
+    def rows(self, match_id: str) -> np.ndarray:
+        """Sorted labels of the rows of one product."""
+        chunks = self._rows.get(match_id)
+        if not chunks:
+            return np.zeros(0, dtype=np.int64)
+        if len(chunks) > 1:
+            # Under the lock, so a chunk appended by a concurrent add() is never dropped by the merge.
+            with self._lock:
+                if len(chunks) > 1:
+                    chunks[:] = [np.sort(np.concatenate(chunks))]
+        return chunks[0]
@@ -0,0 +1,256 @@
+"""Mergeable quantile sketches for price distributions.
+
+A ``QuantileSketch`` keeps counts in logarithmic buckets (DDSketch style):
+bucket ``i`` holds prices in (GAMMA**(i-1), GAMMA**i]. Any quantile read back is
+within ``RELATIVE_ERROR`` of a true sample value, and two sketches merge by
+adding their bucket counts, so sketches built for separate batches or months
+combine exactly.
+
+``SketchStore`` keeps one sketch per (month, platform, category, festive
+window). It is built in one pass at ingest, updated in place for new batches,
+and saved as JSON next to the dataset. Date filters are month-aligned;
+festive-window filters are exact because the window is part of the key.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from festive_windows import label_festive_events
+from sources import platform_labels
+
+GAMMA = 1.05
+RELATIVE_ERROR = (GAMMA - 1) / (GAMMA + 1)
+_LOG_GAMMA = math.log(GAMMA)
+MIN_PRICE = 0.01
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+STORE_KEYS = ("month", "platform", "category", "festive_event")
+STORE_FORMAT_VERSION = 1
+
+
+def price_to_bucket(prices: np.ndarray) -> np.ndarray:
+    """Bucket ``i`` covers (GAMMA**(i-1), GAMMA**i]."""
+    clipped = np.maximum(np.asarray(prices, dtype=float), MIN_PRICE)
+    return np.ceil(np.log(clipped) / _LOG_GAMMA).astype(np.int32)
+
+
+def bucket_to_price(buckets: np.ndarray) -> np.ndarray:
+    """Representative value of a bucket (relative error at most RELATIVE_ERROR)."""
+    return 2.0 * np.power(GAMMA, np.asarray(buckets, dtype=float)) / (GAMMA + 1.0)
+
+
+def sidecar_path(dataset_path: str) -> str:
+    """Where the sketch store for ``dataset_path`` (a CSV or partition directory) is saved."""
+    if os.path.isdir(dataset_path):
+        return os.path.join(dataset_path, "sketches.json")
+    root, _ = os.path.splitext(dataset_path)
+    return root + ".sketches.json"
+
+
+class QuantileSketch:
+    __slots__ = ("offset", "counts", "count", "sum", "min", "max")
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values: Iterable[float]) -> None:
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        buckets = price_to_bucket(values)
+        self._extend(int(buckets.min()), int(buckets.max()))
+        self.counts += np.bincount(buckets - self.offset, minlength=len(self.counts))
+        self.count += int(values.size)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Add ``other`` into this sketch and return self."""
+        if other.count == 0:
+            return self
+        self._extend(other.offset, other.offset + len(other.counts) - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + len(other.counts)] += other.counts
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _extend(self, low: int, high: int) -> None:
+        if len(self.counts) == 0:
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype=np.int64)
+            return
+        current_high = self.offset + len(self.counts) - 1
+        if low >= self.offset and high <= current_high:
+            return
+        new_low, new_high = min(low, self.offset), max(high, current_high)
+        counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+        counts[self.offset - new_low:self.offset - new_low + len(self.counts)] = self.counts
+        self.offset, self.counts = new_low, counts
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def quantiles(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> List[Optional[float]]:
+        if self.count == 0:
+            return [None for _ in qs]
+        cumulative = np.cumsum(self.counts)
+        ranks = np.asarray(qs, dtype=float) * (self.count - 1)
+        positions = np.searchsorted(cumulative, ranks, side="right")
+        values = bucket_to_price(positions + self.offset)
+        return [float(v) for v in np.clip(values, self.min, self.max)]
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "offset": self.offset,
+            "counts": self.counts.tolist(),
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls()
+        sketch.offset = int(data["offset"])
+        sketch.counts = np.asarray(data["counts"], dtype=np.int64)
+        sketch.count = int(data["count"])
+        sketch.sum = float(data["sum"])
+        sketch.min = math.inf if data["min"] is None else float(data["min"])
+        sketch.max = -math.inf if data["max"] is None else float(data["max"])
+        return sketch
+
+
+StoreKey = Tuple[str, str, str, str]
+
+
+class SketchStore:
+    def __init__(self) -> None:
+        self.sketches: Dict[StoreKey, QuantileSketch] = {}
+
+    def __len__(self) -> int:
+        return len(self.sketches)
+
+    def add_frame(self, df: pd.DataFrame, category_col: str = "bb category", price_col: str = "final_price") -> None:
+        """Fold a batch of rows into the store (one groupby pass)."""
+        rows = df.dropna(subset=[price_col, "timestamp"])
+        if rows.empty:
+            return
+        festive = rows["festive_event"] if "festive_event" in rows.columns else label_festive_events(rows["timestamp"])
+        keys = pd.DataFrame(
+            {
+                "month": rows["timestamp"].dt.strftime("%Y-%m"),
+                "platform": platform_labels(rows),
+                "category": rows[category_col].fillna("").astype(str) if category_col in rows.columns else "",
+                "festive_event": festive.fillna("").astype(str),
+            },
+            index=rows.index,
+        )
+        prices = pd.to_numeric(rows[price_col], errors="coerce")
+        for key, group in prices.groupby([keys[k] for k in STORE_KEYS], sort=False):
+            # Replace rather than mutate, so a concurrent query() sees old or new counts, never half of both.
+            sketch = QuantileSketch()
+            if key in self.sketches:
+                sketch.merge(self.sketches[key])
+            sketch.add(group.to_numpy())
+            self.sketches[key] = sketch
+
+    def merge(self, other: "SketchStore") -> "SketchStore":
+        """Fold every sketch of ``other`` into this store (e.g. stores built from separate files) and return self."""
+        for key, other_sketch in other.sketches.items():
+            sketch = QuantileSketch()
+            if key in self.sketches:
+                sketch.merge(self.sketches[key])
+            self.sketches[key] = sketch.merge(other_sketch)
+        return self
+
+    def query(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        platform: Optional[str] = None,
+        category: Optional[str] = None,
+        festive_event: Optional[str] = None,
+        by: Optional[str] = None,
+    ) -> Dict[str, QuantileSketch]:
+        """Merge every sketch matching the filters, grouped by one key (or "all").
+
+        ``start``/``end`` are ISO dates or months; they select whole months.
+        """
+        start_month = start[:7] if start else None
+        end_month = end[:7] if end else None
+        group_index = STORE_KEYS.index(by) if by else None
+
+        merged: Dict[str, QuantileSketch] = {}
+        for key, sketch in list(self.sketches.items()):
+            month, key_platform, key_category, key_festive = key
+            if start_month and month < start_month:
+                continue
+            if end_month and month > end_month:
+                continue
+            if platform and key_platform.lower() != platform.lower():
+                continue
+            if category and key_category.lower() != category.lower():
+                continue
+            if festive_event and key_festive.lower() != festive_event.lower():
+                continue
+            group = key[group_index] if group_index is not None else "all"
+            merged.setdefault(group, QuantileSketch()).merge(sketch)
+        return merged
+
+    def summary(self, qs: Sequence[float] = DEFAULT_QUANTILES, by: Optional[str] = "platform", **filters: Any) -> List[Dict[str, Any]]:
+        rows = []
+        for group, sketch in sorted(self.query(by=by, **filters).items()):
+            row: Dict[str, Any] = {by or "group": group or None, "count": sketch.count, "mean": sketch.mean}
+            for q, value in zip(qs, sketch.quantiles(qs)):
+                row[f"p{round(q * 100):g}"] = value
+            rows.append(row)
+        return rows
+
+    def save(self, path: str) -> None:
+        payload = {
+            "version": STORE_FORMAT_VERSION,
+            "gamma": GAMMA,
+            "sketches": [{"key": list(key), **sketch.to_dict()} for key, sketch in self.sketches.items()],
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SketchStore":
+        with open(path, encoding="utf-8") as fh:
+            payload = json.load(fh)
+        if payload.get("version") != STORE_FORMAT_VERSION or payload.get("gamma") != GAMMA:
+            raise ValueError(f"Incompatible sketch store format in {path}")
+        store = cls()
+        for item in payload["sketches"]:
+            store.sketches[tuple(item["key"])] = QuantileSketch.from_dict(item)
+        return store
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, category_col: str = "bb category") -> "SketchStore":
+        store = cls()
+        store.add_frame(df, category_col=category_col)
+        return store
@@ -0,0 +1,215 @@
+"""Pre-aggregated rollup cube for the dashboard charts.
+
+One cell per (day, platform, category, festive_event) holds count, sum, min
+and max of ``final_price`` plus a price histogram in the log buckets of
+``quantile_sketch``: merging cells is adding bucket counts, and any quantile
+read from it is within ``RELATIVE_ERROR`` of the true value. Charts slice the cube by date range and re-aggregate, so their cost depends
+on the number of cells, not the number of raw rows.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import GAMMA, RELATIVE_ERROR, bucket_to_price, price_to_bucket
+
+CELL_KEYS = ["day", "platform", "category", "festive_event"]
+
+
+@dataclass
+class RollupCube:
+    cells: pd.DataFrame  # CELL_KEYS + count, sum, min, max; index is the cell id
+    sketch: pd.DataFrame  # cell, bucket, count
+
+    @property
+    def total_count(self) -> int:
+        return int(self.cells["count"].sum())
+
+    def slice(self, start=None, end=None) -> "RollupCube":
+        """Cells whose day falls within [start, end] (inclusive dates)."""
+        mask = np.ones(len(self.cells), dtype=bool)
+        if start is not None:
+            mask &= (self.cells["day"] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (self.cells["day"] <= pd.Timestamp(end)).to_numpy()
+        cells = self.cells[mask]
+        sketch = self.sketch[self.sketch["cell"].isin(cells.index)]
+        return RollupCube(cells, sketch)
+
+    def aggregate(self, by: Sequence[str]) -> pd.DataFrame:
+        """count, sum, min, max and mean final_price per group.
+
+        ``by`` may name cell keys or "year" / "month" / "month_name" derived from the day.
+        """
+        frame = self._with_time_parts(self.cells, by)
+        grouped = frame.groupby(list(by), observed=True, dropna=False).agg(
+            count=("count", "sum"), sum=("sum", "sum"), min=("min", "min"), max=("max", "max")
+        )
+        grouped["mean"] = grouped["sum"] / grouped["count"]
+        return grouped.reset_index()
+
+    def bucket_counts(self, by: Sequence[str] = ()) -> pd.DataFrame:
+        """Merged price histogram per group: ``by`` columns + bucket, count."""
+        if not by:
+            merged = self.sketch.groupby("bucket", as_index=False)["count"].sum()
+            return merged
+        keys = self._with_time_parts(self.cells, by)[list(by)]
+        joined = self.sketch.join(keys, on="cell")
+        return joined.groupby(list(by) + ["bucket"], observed=True, dropna=False, as_index=False)["count"].sum()
+
+    def quantiles(self, qs: Iterable[float], by: Sequence[str] = ()) -> pd.DataFrame:
+        """Approximate ``final_price`` quantiles per group, one column per q (e.g. "q0.5")."""
+        qs = list(qs)
+        counts = self.bucket_counts(by)
+        rows: List[dict] = []
+        groups = counts.groupby(list(by), observed=True, dropna=False) if by else [((), counts)]
+        for key, group in groups:
+            key = key if isinstance(key, tuple) else (key,)
+            group = group.sort_values("bucket")
+            cumulative = group["count"].to_numpy().cumsum()
+            total = cumulative[-1] if len(cumulative) else 0
+            row = dict(zip(by, key))
+            for q in qs:
+                if total == 0:
+                    row[f"q{q}"] = np.nan
+                    continue
+                rank = q * (total - 1)
+                position = int(np.searchsorted(cumulative, rank, side="right"))
+                row[f"q{q}"] = float(bucket_to_price(group["bucket"].to_numpy()[position]))
+            rows.append(row)
+        result = pd.DataFrame(rows)
+        if result.empty:
+            return result
+        # Clamp to the exact extremes kept per cell.
+        if by:
+            bounds = self.aggregate(by)[list(by) + ["min", "max"]]
+            result = result.merge(bounds, on=list(by), how="left")
+        else:
+            result["min"] = self.cells["min"].min()
+            result["max"] = self.cells["max"].max()
+        for q in qs:
+            result[f"q{q}"] = result[f"q{q}"].clip(lower=result["min"], upper=result["max"])
+        return result.drop(columns=["min", "max"])
+
+    def histogram(self, by: str = "platform", nbins: int = 40) -> pd.DataFrame:
+        """Price histogram per group with shared bin edges: by, bin_start, bin_end, count.
+
+        Each sketch bucket's count is spread evenly over its price range, so the
+        result has ``nbins`` rows per group regardless of how many rows were loaded.
+        """
+        counts = self.bucket_counts([by])
+        columns = [by, "bin_start", "bin_end", "count"]
+        if counts.empty:
+            return pd.DataFrame(columns=columns)
+        low, high = float(self.cells["min"].min()), float(self.cells["max"].max())
+        if low == high:
+            high = low + 1.0
+        edges = np.linspace(low, high, nbins + 1)
+
+        frames = []
+        for key, group in counts.groupby(by, observed=True):
+            group = group.sort_values("bucket")
+            buckets = group["bucket"].to_numpy()
+            cumulative = group["count"].to_numpy().cumsum()
+            # Piecewise-linear CDF: flat between buckets, linear within each one.
+            xs = np.column_stack([np.power(GAMMA, buckets - 1.0), np.power(GAMMA, buckets.astype(float))]).ravel()
+            ys = np.column_stack([cumulative - group["count"].to_numpy(), cumulative]).ravel()
+            cdf = np.interp(edges, xs, ys)
+            hist = np.diff(cdf)
+            # Mass of the end buckets that lies beyond the exact min/max belongs to the end bins.
+            hist[0] += cdf[0]
+            hist[-1] += cumulative[-1] - cdf[-1]
+            frames.append(pd.DataFrame({by: key, "bin_start": edges[:-1], "bin_end": edges[1:], "count": hist}))
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def box_stats(self, by: str = "platform", max_outliers: int = 50) -> List[dict]:
+        """Tukey box-plot statistics per group, plus up to ``max_outliers`` outlier values.
+
+        Outliers are bucket values beyond the 1.5 x IQR fences, largest counts first,
+        so each group contributes a bounded number of points.
+        """
+        summary = self.quantiles([0.25, 0.5, 0.75], [by])
+        bounds = self.aggregate([by]).set_index(by)
+        counts = self.bucket_counts([by])
+        stats = []
+        for _, row in summary.iterrows():
+            key = row[by]
+            q1, median, q3 = row["q0.25"], row["q0.5"], row["q0.75"]
+            iqr = q3 - q1
+            low_fence, high_fence = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+            group = counts[counts[by] == key]
+            values = np.clip(bucket_to_price(group["bucket"].to_numpy()), bounds.at[key, "min"], bounds.at[key, "max"])
+            inside = (values >= low_fence) & (values <= high_fence)
+            outside = ~inside
+            order = np.argsort(-group["count"].to_numpy()[outside], kind="stable")[:max_outliers]
+            stats.append(
+                {
+                    by: key,
+                    "count": int(bounds.at[key, "count"]),
+                    "min": float(bounds.at[key, "min"]),
+                    "q1": float(q1),
+                    "median": float(median),
+                    "q3": float(q3),
+                    "max": float(bounds.at[key, "max"]),
+                    "mean": float(bounds.at[key, "mean"]),
+                    "lowerfence": float(values[inside].min()) if inside.any() else float(q1),
+                    "upperfence": float(values[inside].max()) if inside.any() else float(q3),
+                    "outliers": np.sort(values[outside][order]).tolist(),
+                    "outlier_count": int(group["count"].to_numpy()[outside].sum()),
+                }
+            )
+        return stats
+
+    @staticmethod
+    def _with_time_parts(frame: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+        if not {"year", "month", "month_name"} & set(by):
+            return frame
+        frame = frame.copy()
+        if "year" in by:
+            frame["year"] = frame["day"].dt.year
+        if "month" in by:
+            frame["month"] = frame["day"].dt.month
+        if "month_name" in by:
+            frame["month_name"] = frame["day"].dt.month_name()
+        return frame
+
+
+def build_cube(
+    df: pd.DataFrame,
+    category_col: Optional[str] = "bb category",
+    price_col: str = "final_price",
+) -> RollupCube:
+    """Aggregate raw rows (with timestamp, platform and festive_event) into a RollupCube."""
+    rows = df.dropna(subset=[price_col, "timestamp"])
+    keys = pd.DataFrame(
+        {
+            "day": rows["timestamp"].dt.normalize(),
+            "platform": rows["platform"].astype("category"),
+            "category": (
+                rows[category_col].astype("category")
+                if category_col and category_col in rows.columns
+                else pd.Categorical([None] * len(rows))
+            ),
+            "festive_event": rows["festive_event"].astype("category"),
+        },
+        index=rows.index,
+    )
+    prices = rows[price_col].astype(float)
+
+    grouped = prices.groupby([keys[k] for k in CELL_KEYS], observed=True, dropna=False)
+    cells = grouped.agg(["count", "sum", "min", "max"]).reset_index()
+    cells.columns = CELL_KEYS + ["count", "sum", "min", "max"]
+
+    cell_ids = grouped.ngroup().to_numpy()
+    buckets = price_to_bucket(prices.to_numpy())
+    sketch = (
+        pd.DataFrame({"cell": cell_ids, "bucket": buckets})
+        .groupby(["cell", "bucket"], as_index=False)
+        .size()
+        .rename(columns={"size": "count"})
+    )
+    return RollupCube(cells, sketch)
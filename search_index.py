@@ -0,0 +1,356 @@
+"""Inverted token index over the search blob (title + description + brand).
+
+Tokens are the lower-cased, whitespace-separated words of each row, and each
+posting list holds the row labels (positions in DATAFRAME) containing that
+token. New batches are indexed with ``add()`` in time proportional to the
+batch: their postings are stored as extra chunks and merged the first time a
+token is read.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+EMPTY = np.zeros(0, dtype=np.int64)
+
+# Spellings that name the same thing, as whitespace-separated words. Unlike
+# typo corrections these are real alternatives, and they are matched against
+# whole query words, so "mi" never rewrites "mixer".
+SYNONYMS: Tuple[Tuple[str, ...], ...] = (
+    ("boat", "bo at", "bo-at"),
+    ("surf excel", "surfexcel"),
+    ("131", "one three one", "one thirty one"),
+    ("mi", "xiaomi"),
+)
+MAX_QUERY_VARIANTS = 8
+
+
+def tokenize(text: str) -> List[str]:
+    return text.lower().split()
+
+
+def synonym_variants(
+    words: Sequence[str], synonyms: Sequence[Sequence[str]] = SYNONYMS, limit: int = MAX_QUERY_VARIANTS
+) -> List[List[str]]:
+    """The query ``words`` with synonym phrases swapped for their other spellings (not the query itself).
+
+    ``["surf", "excel", "gel"]`` gives ``[["surfexcel", "gel"]]``; a query
+    with several synonym phrases gets every combination, up to ``limit``.
+    """
+    variants = [list(words)]
+    for group in synonyms:
+        phrases = [phrase.split() for phrase in group]
+        for variant in list(variants):
+            for phrase in phrases:
+                at = _find_phrase(variant, phrase)
+                if at < 0:
+                    continue
+                for other in phrases:
+                    candidate = variant[:at] + other + variant[at + len(phrase):]
+                    if candidate not in variants:
+                        variants.append(candidate)
+                break
+    return variants[1:limit + 1]
+
+
+def _find_phrase(words: List[str], phrase: List[str]) -> int:
+    for start in range(len(words) - len(phrase) + 1):
+        if words[start:start + len(phrase)] == phrase:
+            return start
+    return -1
+
+
+def fold_accents(text: str) -> str:
+    return unicodedata.normalize("NFKD", text).encode("ascii", errors="ignore").decode("ascii")
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a transposition counts as one edit), or ``limit + 1`` if above ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def typo_budget(word: str) -> int:
+    """Edits tolerated in a query word: none below 4 letters, one up to 7, two from 8."""
+    if len(word) < 4:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    """Every string left after removing up to ``distance`` characters from ``word``."""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        found |= frontier
+    return found
+
+
+class FuzzyVocabulary:
+    """SymSpell-style deletion index for typo lookups.
+
+    Every word is filed under the strings left after deleting up to one
+    (words of 3+ letters) or two (6+ letters) characters of its first
+    ``PREFIX_LENGTH`` letters. A query within ``typo_budget`` edits of a word
+    shares one of those deletion strings with it, so a lookup generates the
+    query's own deletes, collects the words filed under them and verifies
+    the distance of those few candidates. As in SymSpell's prefix
+    optimization, two edits spread across a long word can occasionally be
+    missed. Deletion strings are kept as sorted hash arrays (word ids
+    alongside), not as a dict of strings.
+    """
+
+    PREFIX_LENGTH = 7
+
+    def __init__(self) -> None:
+        self._words: List[str] = []
+        self._known: Set[str] = set()
+        self._chunks: List[Tuple[np.ndarray, np.ndarray]] = []
+        # accent-free spelling -> words that only differ from it by accents
+        self._accented: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def add(self, words: Iterable[str]) -> None:
+        keys: List[int] = []
+        ids: List[int] = []
+        for word in words:
+            if word in self._known or not 3 <= len(word) <= 40:
+                continue
+            word_id = len(self._words)
+            self._words.append(word)
+            self._known.add(word)
+            if not word.isascii():
+                self._accented.setdefault(fold_accents(word), []).append(word)
+            for key in _deletes(word[: self.PREFIX_LENGTH], 2 if len(word) >= 6 else 1):
+                keys.append(hash(key))
+                ids.append(word_id)
+        if keys:
+            key_array = np.array(keys, dtype=np.int64)
+            order = np.argsort(key_array, kind="stable")
+            with self._lock:
+                self._chunks.append((key_array[order], np.array(ids, dtype=np.int64)[order]))
+
+    def accent_variants(self, word: str) -> List[str]:
+        """Words spelled like ``word`` apart from accents ("nestle" -> ["nestlé"])."""
+        folded = fold_accents(word.lower())
+        return [variant for variant in self._accented.get(folded, ()) if variant != word]
+
+    def _table(self) -> Tuple[np.ndarray, np.ndarray]:
+        chunks = self._chunks
+        if len(chunks) > 1:
+            # Under the lock, so a chunk appended by a concurrent add() is never dropped by the merge.
+            with self._lock:
+                if len(chunks) > 1:
+                    keys = np.concatenate([chunk[0] for chunk in chunks])
+                    order = np.argsort(keys, kind="stable")
+                    chunks[:] = [(keys[order], np.concatenate([chunk[1] for chunk in chunks])[order])]
+        return chunks[0] if chunks else (EMPTY, EMPTY)
+
+    def lookup(self, word: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Words within ``max_distance`` edits of ``word`` (default: its ``typo_budget``), closest first."""
+        word = word.lower()
+        limit = typo_budget(word) if max_distance is None else max_distance
+        if limit == 0:
+            return [(word, 0)] if word in self._known else []
+        keys, ids = self._table()
+        probes = np.array([hash(key) for key in _deletes(word[: self.PREFIX_LENGTH], limit)], dtype=np.int64)
+        starts = np.searchsorted(keys, probes, side="left")
+        ends = np.searchsorted(keys, probes, side="right")
+        candidates = {self._words[i] for start, end in zip(starts, ends) for i in ids[start:end]}
+        matches = [(candidate, edit_distance(word, candidate, limit)) for candidate in candidates]
+        return sorted((m for m in matches if m[1] <= limit), key=lambda m: (m[1], m[0]))
+
+
+class TokenIndex:
+    def __init__(self) -> None:
+        self._chunks: Dict[str, List[np.ndarray]] = {}
+        self._vocabulary: Optional[List[str]] = None
+        self._fuzzy: Optional[FuzzyVocabulary] = None
+        self._lock = threading.Lock()
+        self.doc_count = 0
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._chunks
+
+    @classmethod
+    def from_series(cls, texts: pd.Series) -> "TokenIndex":
+        index = cls()
+        index.add(texts)
+        return index
+
+    def add(self, texts: pd.Series) -> None:
+        """Index ``texts`` under their index labels (which must not be indexed already)."""
+        if texts.empty:
+            return
+        tokens = texts.fillna("").astype(str).str.lower().str.split().explode().dropna()
+        tokens = tokens[tokens != ""]
+        pairs = pd.DataFrame({"token": tokens.to_numpy(), "label": tokens.index.to_numpy(dtype=np.int64)})
+        pairs = pairs.drop_duplicates()
+        with self._lock:
+            new_tokens = []
+            for token, labels in pairs.groupby("token", sort=False)["label"]:
+                if token not in self._chunks:
+                    new_tokens.append(token)
+                self._chunks.setdefault(token, []).append(np.sort(labels.to_numpy()))
+            if self._fuzzy is not None:
+                self._fuzzy.add(new_tokens)
+            self._vocabulary = None
+            self.doc_count += len(texts)
+
+    def postings(self, token: str) -> np.ndarray:
+        """Sorted row labels containing ``token`` exactly."""
+        chunks = self._chunks.get(token)
+        if not chunks:
+            return EMPTY
+        if len(chunks) > 1:
+            # Under the lock, so a chunk appended by a concurrent add() is never dropped by the merge.
+            with self._lock:
+                if len(chunks) > 1:
+                    merged = np.concatenate(chunks)
+                    merged.sort(kind="stable")
+                    chunks[:] = [merged]
+        return chunks[0]
+
+    def document_frequency(self, token: str) -> int:
+        return sum(len(chunk) for chunk in self._chunks.get(token, ()))
+
+    @property
+    def vocabulary(self) -> List[str]:
+        vocabulary = self._vocabulary
+        if vocabulary is None:
+            vocabulary = self._vocabulary = sorted(self._chunks)
+        return vocabulary
+
+    def tokens_with_prefix(self, prefix: str) -> List[str]:
+        vocabulary = self.vocabulary
+        prefix = prefix.lower()
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + "\U0010ffff", start)
+        return vocabulary[start:end]
+
+    @property
+    def fuzzy(self) -> FuzzyVocabulary:
+        """Deletion index over the vocabulary, built on first use and extended by ``add()``."""
+        if self._fuzzy is None:
+            with self._lock:
+                if self._fuzzy is None:
+                    fuzzy = FuzzyVocabulary()
+                    fuzzy.add(self._chunks)
+                    self._fuzzy = fuzzy
+        return self._fuzzy
+
+    def build_fuzzy(self) -> FuzzyVocabulary:
+        """Build the typo lookup now instead of on the first misspelled query."""
+        return self.fuzzy
+
+    def corrections(self, word: str, limit: int = 3) -> List[str]:
+        """Vocabulary tokens closest to a misspelled ``word``: fewest edits, then most rows."""
+        matches = self.fuzzy.lookup(word)
+        matches.sort(key=lambda m: (m[1], -self.document_frequency(m[0])))
+        return [token for token, _ in matches[:limit]]
+
+    def tokens_containing(self, fragment: str) -> List[str]:
+        fragment = fragment.lower()
+        return [token for token in self.vocabulary if fragment in token]
+
+    def union(self, tokens: Iterable[str]) -> np.ndarray:
+        arrays = [self.postings(token) for token in tokens]
+        arrays = [a for a in arrays if len(a)]
+        if not arrays:
+            return EMPTY
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.unique(np.concatenate(arrays))
+
+    def intersection(self, groups: Iterable[Iterable[str]]) -> np.ndarray:
+        """Rows holding at least one token of every group (AND of ORs).
+
+        Groups are intersected rarest first, so the running result is never
+        larger than the rarest group and an empty group stops the work.
+        """
+        sized = []
+        for group in groups:
+            tokens = list(group)
+            sized.append((sum(self.document_frequency(token) for token in tokens), tokens))
+        if not sized:
+            return EMPTY
+        rows: Optional[np.ndarray] = None
+        for frequency, tokens in sorted(sized, key=lambda item: item[0]):
+            if frequency == 0:
+                return EMPTY
+            matched = self.union(tokens)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if len(rows) == 0:
+                return EMPTY
+        return rows
+
+    def _word_tokens(self, word: str, prefix: bool, alternatives: Optional[Dict[str, List[str]]]) -> List[str]:
+        tokens = self.tokens_with_prefix(word) if prefix else [word]
+        return tokens + list((alternatives or {}).get(word, ()))
+
+    def match_all(
+        self, words: Iterable[str], prefix: bool = False, alternatives: Optional[Dict[str, List[str]]] = None
+    ) -> np.ndarray:
+        """Rows containing every word as a token (or, with ``prefix``, as the start of a token).
+
+        ``alternatives`` maps a word to other tokens that also count for it.
+        """
+        return self.intersection(self._word_tokens(word.lower(), prefix, alternatives) for word in words)
+
+    def match_any(
+        self, words: Iterable[str], prefix: bool = False, alternatives: Optional[Dict[str, List[str]]] = None
+    ) -> np.ndarray:
+        """Rows containing at least one of the words as a token (or token prefix)."""
+        tokens: List[str] = []
+        for word in words:
+            tokens.extend(self._word_tokens(word.lower(), prefix, alternatives))
+        return self.union(tokens)
+
+    def substring_candidates(self, terms: Iterable[str]) -> np.ndarray:
+        """Rows whose text may contain any of ``terms`` as a case-insensitive substring.
+
+        A superset of the true matches: every word of a term must occur inside
+        some token of the row, so callers still verify the candidates with the
+        original substring test.
+        """
+        results = []
+        for term in terms:
+            words = tokenize(term)
+            if not words:
+                continue
+            rows: Optional[np.ndarray] = None
+            for word in sorted(words, key=len, reverse=True):
+                matched = self.union(self.tokens_containing(word))
+                rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+                if len(rows) == 0:
+                    break
+            if rows is not None and len(rows):
+                results.append(rows)
+        if not results:
+            return EMPTY
+        return np.unique(np.concatenate(results))
@@ -0,0 +1,169 @@
+"""Search terms that make good cross-platform comparisons.
+
+``build_recommendations`` explodes every title into its words and adjacent
+word pairs once, then aggregates (term, platform) groups: rows containing
+the term and the cheapest final price. Terms that always occur together
+are listed once. A term is recommended when it hits at
+least two platforms; it ranks higher the more rows its thinnest platform has
+(``coverage``) and the wider the gap from the cheapest platform's best price
+to the runner-up's (``gap_pct``, the same gap /api/price-comparison reports):
+
+    score = log(1 + coverage) * (1 + min(gap_pct, 100) / 100)
+
+The result depends only on the dataset, so the API builds it once per
+dataset version and every request is a slice of the ranked table.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from product_matching import STOPWORDS
+from sources import platform_labels
+
+SORT_KEYS = ("score", "coverage", "gap")
+MIN_WORD_LENGTH = 3
+UNKNOWN = "unknown"
+
+
+def _is_term_word(words: pd.Series) -> pd.Series:
+    return (words.str.len() >= MIN_WORD_LENGTH) & ~words.isin(STOPWORDS) & ~words.str.isdigit()
+
+
+def term_rows(titles: pd.Series, max_words: int = 2) -> pd.DataFrame:
+    """(row label, term) pairs for every word and run of up to ``max_words`` words in ``titles``.
+
+    Words are the lower-cased, whitespace-separated tokens the search index
+    uses; single words shorter than three letters, stopwords and bare numbers
+    are skipped, and a phrase must start and end with a kept word.
+    """
+    words = titles.dropna().astype(str).str.lower().str.split().explode().dropna()
+    words = words[words != ""]
+    frame = pd.DataFrame({"row": words.index.to_numpy(dtype=np.int64), "word": words.to_numpy(dtype=object)})
+    frame["kept"] = _is_term_word(frame["word"]).to_numpy()
+    by_row = frame.groupby("row", sort=False)
+
+    pairs = [frame.loc[frame["kept"], ["row", "word"]].rename(columns={"word": "term"})]
+    phrase = frame["word"]
+    for offset in range(1, max_words):
+        following = by_row["word"].shift(-offset)
+        last_kept = by_row["kept"].shift(-offset, fill_value=False).astype(bool)
+        phrase = phrase + " " + following.fillna("")
+        valid = frame["kept"] & last_kept & following.notna()
+        pairs.append(pd.DataFrame({"row": frame.loc[valid, "row"], "term": phrase[valid]}))
+    return pd.concat(pairs, ignore_index=True).drop_duplicates()
+
+
+@dataclass
+class TermRecommendations:
+    summary: pd.DataFrame  # index term; words, platforms, coverage, total, gap, gap_pct, score, signature, preference
+    counts: pd.DataFrame  # index term; rows per platform
+    best_prices: pd.DataFrame  # index term; cheapest final_price per platform
+    best_rows: pd.DataFrame  # index term; row label of that cheapest listing per platform
+
+    def __len__(self) -> int:
+        return len(self.summary)
+
+    def top(self, limit: int = 10, sort: str = "score", words: Optional[int] = None) -> pd.DataFrame:
+        """The ``limit`` best terms by ``sort`` (score, coverage or gap), optionally of ``words`` words."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort}'; expected one of {SORT_KEYS}")
+        summary = self.summary if words is None else self.summary[self.summary["words"] == words]
+        column = {"score": "score", "coverage": "coverage", "gap": "gap_pct"}[sort]
+        ranked = summary.sort_values(
+            [column, "total", "preference"], ascending=[False, False, True], kind="stable", na_position="last"
+        )
+        return ranked.drop_duplicates("signature").head(limit)
+
+    def to_records(self, ranked: pd.DataFrame, titles: Optional[pd.Series] = None) -> List[Dict[str, Any]]:
+        """JSON-ready rows of ``ranked``; with ``titles`` (by row label), the cheapest listing per platform."""
+        records = []
+        for term, row in ranked.iterrows():
+            counts = self.counts.loc[term]
+            prices = self.best_prices.loc[term].dropna()
+            record = {
+                "term": term,
+                "words": int(row["words"]),
+                "counts": {platform: int(n) for platform, n in counts.items() if n > 0},
+                "best_prices": {platform: round(float(price), 2) for platform, price in prices.items()},
+                "coverage": int(row["coverage"]),
+                "gap": round(float(row["gap"]), 2) if pd.notna(row["gap"]) else None,
+                "gap_pct": round(float(row["gap_pct"]), 2) if pd.notna(row["gap_pct"]) else None,
+                "score": round(float(row["score"]), 4),
+            }
+            if titles is not None:
+                best_rows = self.best_rows.loc[term].dropna().astype(np.int64)
+                record["examples"] = {platform: titles.get(label) for platform, label in best_rows.items()}
+            records.append(record)
+        return records
+
+
+def build_recommendations(df: pd.DataFrame, max_words: int = 2, min_rows: int = 2) -> TermRecommendations:
+    """Rank the title terms of ``df`` that appear on two or more platforms.
+
+    Terms need at least ``min_rows`` rows in total. Row labels in
+    ``best_rows`` are labels of ``df``.
+    """
+    if df.empty or "product title" not in df.columns:
+        empty = pd.DataFrame()
+        return TermRecommendations(
+            pd.DataFrame(columns=[
+                "words", "platforms", "coverage", "total", "gap", "gap_pct", "score", "signature", "preference"
+            ]),
+            empty, empty, empty,
+        )
+
+    pairs = term_rows(df["product title"], max_words)
+    platforms = platform_labels(df, UNKNOWN)
+    prices = pd.to_numeric(df["final_price"], errors="coerce") if "final_price" in df.columns else np.nan
+    rows = pd.DataFrame({"platform": platforms, "price": prices}, index=df.index)
+    pairs = pairs.join(rows, on="row")
+
+    # Cheapest rows first, so the first row of each (term, platform) group is its best listing.
+    pairs = pairs.sort_values("price", kind="stable", na_position="last")
+    grouped = pairs.groupby(["term", "platform"], sort=False)
+    stats = grouped.agg(rows=("row", "size"), best_price=("price", "min"), best_row=("row", "first"))
+
+    counts = stats["rows"].unstack(fill_value=0)
+    present = (counts > 0).sum(axis=1)
+    keep = (present >= 2) & (counts.sum(axis=1) >= min_rows)
+    counts = counts[keep]
+    best_prices = stats["best_price"].unstack().reindex(counts.index)
+    best_rows = stats["best_row"].unstack().reindex(counts.index)
+
+    # Words that always occur together ("power", "bank", "power bank") would
+    # recommend the same rows several times; ``top`` keeps the first of each
+    # group in this preference order: more words, then shorter text.
+    signature = pd.util.hash_pandas_object(
+        pd.concat([counts, best_rows], axis=1).astype(str).agg("|".join, axis=1), index=False
+    )
+    preference = pd.DataFrame({
+        "words": -counts.index.str.count(" ").to_numpy(), "length": counts.index.str.len().to_numpy()
+    }, index=counts.index)
+    preferred = preference.sort_values(["words", "length"], kind="stable").index
+
+    coverage = counts.where(counts > 0).min(axis=1)
+    # Runner-up minus cheapest, as compute_gap reports it. NaN sorts last, so
+    # a term priced on fewer than two platforms has no gap; the NaN padding
+    # covers a dataset with a single platform column.
+    padding = np.full((len(best_prices), 2), np.nan)
+    ranked_prices = np.sort(np.hstack([best_prices.to_numpy(dtype=np.float64), padding]), axis=1)
+    cheapest = pd.Series(ranked_prices[:, 0], index=best_prices.index)
+    gap = pd.Series(ranked_prices[:, 1], index=best_prices.index) - cheapest
+    gap_pct = (gap / cheapest).replace([np.inf, -np.inf], np.nan) * 100
+    summary = pd.DataFrame({
+        "words": counts.index.str.count(" ") + 1,
+        "platforms": present[keep],
+        "coverage": coverage.astype(np.int64),
+        "total": counts.sum(axis=1),
+        "gap": gap,
+        "gap_pct": gap_pct,
+    })
+    summary["score"] = np.log1p(summary["coverage"]) * (1 + summary["gap_pct"].fillna(0).clip(0, 100) / 100)
+    summary["signature"] = signature.to_numpy()
+    summary["preference"] = pd.Series(np.arange(len(preferred)), index=preferred)
+    summary = summary.sort_values(["score", "total"], ascending=False, kind="stable")
+    return TermRecommendations(summary, counts, best_prices, best_rows)
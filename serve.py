@@ -0,0 +1,138 @@
+"""Production entry point for the price comparison API.
+
+Uses gunicorn (pre-fork, Linux/macOS) when it is installed and falls back to
+waitress (threaded, single process, also works on Windows).
+
+    pip install gunicorn        # or: pip install waitress
+    python serve.py --workers 4 --threads 4 --bind 0.0.0.0:5000
+
+Every option can also be set through the environment: PRICE_API_BIND,
+PRICE_API_WORKERS, PRICE_API_THREADS, PRICE_API_TIMEOUT,
+PRICE_API_GRACEFUL_TIMEOUT.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import sys
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("price_api.serve")
+
+
+def _default_workers() -> int:
+    # Requests are CPU-bound in pandas, so one worker per core; threads cover I/O waits.
+    return os.cpu_count() or 1
+
+
+def build_app(app_name: str, dataset_path: Optional[str]) -> Any:
+    if app_name == "simple":
+        import simple_api
+
+        return simple_api.app
+
+    import price_api
+
+    return price_api.create_app(dataset_path)
+
+
+def run_gunicorn(application: Any, options: Dict[str, Any]) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class PriceApiApplication(BaseApplication):
+        def __init__(self, wsgi_app: Any, settings: Dict[str, Any]) -> None:
+            self.application = wsgi_app
+            self.settings = settings
+            super().__init__()
+
+        def load_config(self) -> None:
+            for key, value in self.settings.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self) -> Any:
+            return self.application
+
+    PriceApiApplication(application, options).run()
+
+
+def run_waitress(application: Any, bind: str, threads: int) -> None:
+    from waitress import serve
+
+    host, _, port = bind.rpartition(":")
+
+    def _shutdown(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    # waitress only stops cleanly on KeyboardInterrupt; treat SIGTERM the same way.
+    signal.signal(signal.SIGTERM, _shutdown)
+    try:
+        serve(application, host=host or "0.0.0.0", port=int(port), threads=threads)
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the price comparison API in production mode.")
+    parser.add_argument("--app", choices=("price", "simple"), default="price")
+    parser.add_argument("--dataset", help="CSV or partition directory to load instead of the default combined dataset")
+    parser.add_argument("--bind", default=os.environ.get("PRICE_API_BIND", "0.0.0.0:5000"))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("PRICE_API_WORKERS", _default_workers())))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("PRICE_API_THREADS", 4)))
+    parser.add_argument("--timeout", type=int, default=int(os.environ.get("PRICE_API_TIMEOUT", 60)))
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=int(os.environ.get("PRICE_API_GRACEFUL_TIMEOUT", 30)),
+        help="seconds in-flight requests get to finish after SIGTERM",
+    )
+    parser.add_argument("--server", choices=("auto", "gunicorn", "waitress"), default="auto")
+    args = parser.parse_args(argv)
+
+    # Load the dataset in this (master) process before any fork.
+    application = build_app(args.app, args.dataset)
+    gc.freeze()
+
+    server = args.server
+    if server == "auto":
+        try:
+            import gunicorn  # noqa: F401
+
+            server = "gunicorn"
+        except ImportError:
+            server = "waitress"
+
+    if server == "gunicorn":
+        logger.info("Starting gunicorn on %s with %d workers x %d threads", args.bind, args.workers, args.threads)
+        run_gunicorn(
+            application,
+            {
+                "bind": args.bind,
+                "workers": args.workers,
+                "threads": args.threads,
+                "worker_class": "gthread" if args.threads > 1 else "sync",
+                "preload_app": True,
+                "timeout": args.timeout,
+                "graceful_timeout": args.graceful_timeout,
+                "accesslog": "-",
+            },
+        )
+        return 0
+
+    try:
+        import waitress  # noqa: F401
+    except ImportError:
+        logger.error("Neither gunicorn nor waitress is installed. Run: pip install gunicorn (or waitress)")
+        return 1
+    if args.workers > 1:
+        logger.warning("waitress runs a single process; ignoring --workers=%d", args.workers)
+    logger.info("Starting waitress on %s with %d threads", args.bind, args.threads)
+    run_waitress(application, args.bind, args.threads)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
 """Show what search terms will work"""
 import pandas as pd
 
+from term_stats import TermStats
+
 df = pd.read_csv('combined_amazon_flipkart_with_timestamps.csv')
+stats = TermStats.from_frame(df)
 
 print("=" * 80)
 print("🔍 WHAT TO SEARCH - WORKING SEARCH TERMS")
@@ -12,11 +15,9 @@ print("-" * 80)
 
 # Check common keywords
 keywords = ['Stick', 'Essential', 'Snack', 'Fire', 'Happy']
-for keyword in keywords:
-    amazon_count = len(df[(df['product title'].str.contains(keyword, case=False, na=False)) & 
-                          (df['platform'] == 'Amazon')])
-    flipkart_count = len(df[(df['product title'].str.contains(keyword, case=False, na=False)) & 
-                            (df['platform'] == 'Flipkart')])
+keyword_counts = stats.contains(keywords, 'title').reindex(columns=['Amazon', 'Flipkart'], fill_value=0)
+for keyword, counts in keyword_counts.iterrows():
+    amazon_count, flipkart_count = counts['Amazon'], counts['Flipkart']
     if amazon_count > 0 and flipkart_count > 0:
         print(f"✅ '{keyword}' - Amazon: {amazon_count} | Flipkart: {flipkart_count} | Total: {amazon_count + flipkart_count}")
         print(f"   👉 Try searching: '{keyword}'")
@@ -26,11 +27,9 @@ print("📦 Flipkart Brands (Will show Flipkart results only):")
 print("-" * 80)
 
 brands = ['Dove', 'Himalaya', 'Cadbury', 'Nivea', 'Mi', 'boAt', 'Boat', 'Harpic', 'Nestlé', 'Nestle', 'Surf Excel']
-for brand in brands:
-    flipkart_count = len(df[(df['brand'].str.contains(brand, case=False, na=False)) & 
-                            (df['platform'] == 'Flipkart')])
-    amazon_count = len(df[(df['brand'].str.contains(brand, case=False, na=False)) & 
-                          (df['platform'] == 'Amazon')])
+brand_counts = stats.contains(brands, 'brand').reindex(columns=['Amazon', 'Flipkart'], fill_value=0)
+for brand, counts in brand_counts.iterrows():
+    flipkart_count, amazon_count = counts['Flipkart'], counts['Amazon']
     if flipkart_count > 0:
         status = "✅" if amazon_count > 0 else "⚠️ "
         print(f"{status} '{brand}' - Flipkart: {flipkart_count} products | Amazon: {amazon_count} products")
@@ -76,4 +76,4 @@ if __name__ == '__main__':
     print("Endpoints:")
     print(f"  - GET /api/search?q=your+search+term")
     print("\nPress Ctrl+C to stop the server")
-    app.run(host='0.0.0.0', port=port, debug=True)
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,229 @@
+"""Opt-in profiler for slow or sampled API requests.
+
+Configured from the environment so it can be switched on in production
+without code changes:
+
+    PRICE_API_PROFILE_THRESHOLD_MS  capture requests slower than this
+    PRICE_API_PROFILE_SAMPLE_RATE   also capture this fraction of requests (0-1)
+    PRICE_API_PROFILER              "cprofile" (default) or "sampler"
+    PRICE_API_PROFILE_DIR           where captures are written (default: profiles)
+    PRICE_API_PROFILE_KEEP          number of captures to keep on disk (default: 50)
+
+With neither a threshold nor a sample rate set, ``wrap()`` returns the view
+unchanged, so a disabled profiler costs nothing per request.
+
+With a threshold set every request runs under the profiler and only the slow
+ones are written out. The "sampler" mode walks the request thread's stack from
+a background thread at a fixed interval, which is much cheaper than cProfile
+and writes folded stacks that flamegraph tools understand. Only one request
+at a time runs under cProfile (Python 3.12+ allows one per process); requests
+that arrive while it is busy are profiled with the sampler instead.
+"""
+from __future__ import annotations
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import request
+
+logger = logging.getLogger("price_api.profiler")
+
+PROFILER_MODES = ("cprofile", "sampler")
+
+
+class _StackSampler:
+    """Periodically record the stack of one thread as folded call chains."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            chain = []
+            while frame is not None:
+                code = frame.f_code
+                chain.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if chain:
+                self.stacks[";".join(reversed(chain))] += 1
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+class SlowRequestProfiler:
+    def __init__(
+        self,
+        threshold_ms: Optional[float] = None,
+        sample_rate: float = 0.0,
+        mode: str = "cprofile",
+        output_dir: str = "profiles",
+        keep: int = 50,
+        sample_interval: float = 0.005,
+    ) -> None:
+        if mode not in PROFILER_MODES:
+            raise ValueError(f"Unknown profiler mode {mode!r}; expected one of {PROFILER_MODES}")
+        self.threshold_ms = threshold_ms
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.mode = mode
+        self.output_dir = output_dir
+        self.keep = keep
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        # Only one cProfile profiler can be active per process on Python 3.12+.
+        self._cprofile_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SlowRequestProfiler":
+        threshold = os.environ.get("PRICE_API_PROFILE_THRESHOLD_MS")
+        return cls(
+            threshold_ms=float(threshold) if threshold else None,
+            sample_rate=float(os.environ.get("PRICE_API_PROFILE_SAMPLE_RATE", "0") or 0),
+            mode=os.environ.get("PRICE_API_PROFILER", "cprofile"),
+            output_dir=os.environ.get("PRICE_API_PROFILE_DIR", "profiles"),
+            keep=int(os.environ.get("PRICE_API_PROFILE_KEEP", "50")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms is not None or self.sample_rate > 0
+
+    def wrap(self, view: Callable[..., Any]) -> Callable[..., Any]:
+        if not self.enabled:
+            return view
+
+        @functools.wraps(view)
+        def profiled_view(*args: Any, **kwargs: Any) -> Any:
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+            if self.threshold_ms is None and not sampled:
+                return view(*args, **kwargs)
+            return self._run_profiled(view, sampled, args, kwargs)
+
+        return profiled_view
+
+    def _start_cprofile(self) -> Optional[cProfile.Profile]:
+        """A running cProfile profiler, or None when another request holds it."""
+        if not self._cprofile_lock.acquire(blocking=False):
+            return None
+        collector = cProfile.Profile()
+        try:
+            collector.enable()
+        except ValueError:
+            # Another tool already registered a profiler (sys.monitoring, 3.12+).
+            self._cprofile_lock.release()
+            return None
+        return collector
+
+    def _run_profiled(self, view: Callable[..., Any], sampled: bool, args: Any, kwargs: Any) -> Any:
+        collector: Any = self._start_cprofile() if self.mode == "cprofile" else None
+        # Concurrent requests fall back to the stack sampler, which has no per-process limit.
+        mode = "cprofile" if collector is not None else "sampler"
+        if collector is None:
+            collector = _StackSampler(threading.get_ident(), self.sample_interval)
+            collector.start()
+
+        started = time.perf_counter()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            if mode == "sampler":
+                collector.stop()
+            else:
+                collector.disable()
+                self._cprofile_lock.release()
+
+            slow = self.threshold_ms is not None and elapsed_ms >= self.threshold_ms
+            if slow or sampled:
+                try:
+                    self._save(collector, mode, elapsed_ms, "threshold" if slow else "sampled")
+                except OSError:
+                    logger.exception("Could not write request profile")
+
+    def _save(self, collector: Any, mode: str, elapsed_ms: float, reason: str) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        capture_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}"
+        extension = "folded" if mode == "sampler" else "prof"
+        profile_path = os.path.join(self.output_dir, f"{capture_id}.{extension}")
+        if mode == "sampler":
+            collector.dump(profile_path)
+        else:
+            collector.dump_stats(profile_path)
+
+        metadata = {
+            "id": capture_id,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "path": request.path,
+            "params": request.args.to_dict(),
+            "elapsed_ms": round(elapsed_ms, 2),
+            "reason": reason,
+            "mode": mode,
+            "profile_file": os.path.basename(profile_path),
+        }
+        with open(os.path.join(self.output_dir, f"{capture_id}.json"), "w", encoding="utf-8") as fh:
+            json.dump(metadata, fh, indent=2)
+        logger.warning("Captured %s profile for %s (%.1f ms): %s", reason, request.path, elapsed_ms, profile_path)
+        self._prune()
+
+    def _prune(self) -> None:
+        with self._lock:
+            captures = self._metadata_files()
+            for name in captures[self.keep:]:
+                capture_id = name[: -len(".json")]
+                for extension in (".json", ".prof", ".folded"):
+                    try:
+                        os.remove(os.path.join(self.output_dir, capture_id + extension))
+                    except FileNotFoundError:
+                        pass
+
+    def _metadata_files(self) -> List[str]:
+        """Metadata file names, newest first (capture ids start with a timestamp)."""
+        try:
+            names = [n for n in os.listdir(self.output_dir) if n.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        return sorted(names, reverse=True)
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        captures = []
+        for name in self._metadata_files()[:limit]:
+            try:
+                with open(os.path.join(self.output_dir, name), encoding="utf-8") as fh:
+                    captures.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+        return captures
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "sample_rate": self.sample_rate,
+            "mode": self.mode,
+            "output_dir": self.output_dir,
+        }
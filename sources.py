@@ -0,0 +1,167 @@
+"""Registry of the marketplaces (platforms) the combined dataset is built from.
+
+A ``Source`` describes one platform:
+
+* its name, which becomes the ``platform`` value;
+* where its raw export lives and how to read it;
+* how the export's columns map onto the dataset's (``product title``,
+  ``brand``, ``mrp``, ``final_price``, ...).
+
+A source's ``path`` may be a glob pattern (e.g. one crawl file per day).
+``parallel_ingest.py`` cleans every file of every source in a process pool,
+``load_sources`` reads whole sources in threads, and ``ingest.py --source``
+maps a new export of one platform the same way. A marketplace is added with
+one ``register_source`` call or one entry in a JSON file (``sources.json``)
+read by ``load_source_config``::
+
+    [{"name": "Meesho", "path": "meesho_export.csv",
+      "columns": {"product_name": "product title", "selling_price": "final_price", "original_price": "mrp"}}]
+
+After loading, the platform column is categorical. ``platform_labels`` turns
+it into plain string labels for keys and count tables without touching every
+row, and ``concat_rows`` appends frames without losing the categorical dtype.
+"""
+from __future__ import annotations
+
+import glob
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+TITLE_COLUMNS = ("product title", "product_name")
+# Extra sources registered by datacleanning.py and ingest.py when the file exists.
+SOURCE_CONFIG = "sources.json"
+
+
+@dataclass
+class Source:
+    name: str
+    path: str
+    # Raw column (lower-cased) -> dataset column.
+    columns: Dict[str, str] = field(default_factory=dict)
+    # The first of these present after renaming becomes final_price.
+    price_columns: Tuple[str, ...] = ("final_price", "price", "mrp")
+    read_options: Dict[str, Any] = field(default_factory=dict)
+    drop_columns: Tuple[str, ...] = ("uniq id", "crawl timestamp")
+
+    def files(self) -> List[str]:
+        """The export files of this source: ``path`` itself, or its matches when it is a glob pattern."""
+        if glob.has_magic(self.path):
+            return sorted(glob.glob(self.path))
+        return [self.path]
+
+    def read(self, path: Optional[str] = None) -> pd.DataFrame:
+        """One export file, or by default all of them concatenated."""
+        if path is not None:
+            return pd.read_csv(path, **self.read_options)
+        paths = self.files()
+        if not paths:
+            raise FileNotFoundError(f"No files match {self.path} for source {self.name}")
+        return pd.concat([pd.read_csv(file, **self.read_options) for file in paths], ignore_index=True)
+
+    def prepare(self, raw: pd.DataFrame) -> pd.DataFrame:
+        """Clean one raw export and map it onto the dataset columns (adds platform and final_price)."""
+        df = raw.copy()
+        df.columns = df.columns.str.strip().str.lower()
+        df = df.rename(columns=self.columns)
+
+        numeric = df.select_dtypes(include=np.number).columns
+        df[numeric] = df[numeric].fillna(df[numeric].mean())
+        title_col = next((col for col in TITLE_COLUMNS if col in df.columns), None)
+        if title_col:
+            df = df.dropna(subset=[title_col])
+        df = df.drop_duplicates()
+        df = df.drop(columns=[col for col in self.drop_columns if col in df.columns])
+
+        price_col = next((col for col in self.price_columns if col in df.columns), None)
+        if price_col is None:
+            raise ValueError(f"No price column found in {self.name} dataset!")
+        for col in {price_col, "mrp"} & set(df.columns):
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col].astype(str).str.replace(",", ""), errors="coerce").astype(float)
+        df["platform"] = self.name
+        df["final_price"] = df[price_col]
+        return df
+
+    def load(self) -> pd.DataFrame:
+        return self.prepare(self.read())
+
+
+SOURCES: Dict[str, Source] = {}
+
+
+def register_source(source: Source) -> Source:
+    """Add ``source`` to the registry (replacing a source of the same name)."""
+    SOURCES[source.name] = source
+    return source
+
+
+def load_source_config(path: str) -> List[Source]:
+    """Register the sources listed in a JSON file (a list of ``Source`` fields)."""
+    with open(path, encoding="utf-8") as fh:
+        entries = json.load(fh)
+    return [
+        register_source(Source(**{
+            **entry,
+            **{key: tuple(entry[key]) for key in ("price_columns", "drop_columns") if key in entry},
+        }))
+        for entry in entries
+    ]
+
+
+def load_sources(names: Optional[Iterable[str]] = None, max_workers: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """Read and prepare the named (default: all registered) sources in parallel, one thread each."""
+    sources = [SOURCES[name] for name in names] if names is not None else list(SOURCES.values())
+    if not sources:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(sources)) as pool:
+        frames = list(pool.map(Source.load, sources))
+    return {source.name: frame for source, frame in zip(sources, frames)}
+
+
+def as_platform_category(platforms: pd.Series) -> pd.Series:
+    """``platforms`` as an unordered categorical with sorted categories (a no-op if it already is one)."""
+    if isinstance(platforms.dtype, pd.CategoricalDtype):
+        return platforms
+    return platforms.astype(pd.CategoricalDtype(sorted(platforms.dropna().astype(str).unique())))
+
+
+def platform_labels(df: pd.DataFrame, missing: str = "") -> pd.Series:
+    """The platform of every row as a string, ``missing`` where unknown; categorical columns map codes only."""
+    if "platform" not in df.columns:
+        return pd.Series(missing, index=df.index, dtype=object)
+    platforms = df["platform"]
+    if isinstance(platforms.dtype, pd.CategoricalDtype):
+        # Code -1 (missing) picks the trailing ``missing`` label.
+        labels = np.append(platforms.cat.categories.astype(str).to_numpy(dtype=object), missing)
+        return pd.Series(labels[platforms.cat.codes.to_numpy()], index=df.index, dtype=object)
+    return platforms.fillna(missing).astype(str)
+
+
+def concat_rows(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """``pd.concat`` that keeps a categorical platform column categorical, with the union of the categories."""
+    dtypes = [
+        frame["platform"].dtype for frame in frames
+        if "platform" in frame.columns and isinstance(frame["platform"].dtype, pd.CategoricalDtype)
+    ]
+    if dtypes:
+        dtype = pd.CategoricalDtype(sorted(set().union(*(d.categories for d in dtypes))))
+        frames = [
+            frame.assign(platform=frame["platform"].astype(dtype))
+            if "platform" in frame.columns and frame["platform"].dtype != dtype else frame
+            for frame in frames
+        ]
+    return pd.concat(frames)
+
+
+register_source(Source("Amazon", "synthetic_amazon_dataset_500_rows.csv", price_columns=("price",)))
+register_source(Source(
+    "Flipkart",
+    "marketing_sample_for_flipkart_com-ecommerce__20191101_20191130__15k_data.csv",
+    price_columns=("price", "mrp"),
+    read_options={"encoding": "latin1", "on_bad_lines": "skip"},
+))
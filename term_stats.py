@@ -0,0 +1,150 @@
+"""Per-platform document frequencies of titles, title words, brands and categories.
+
+``TermStats`` keeps one count table per field: the distinct normalized values
+(lower-cased, stripped) as the index and one row-count column per platform.
+Building it is one crosstab per field, and a new batch only adds its own
+crosstab, so the reports below never rescan the rows:
+
+* ``common("brand")`` / ``common("category")`` - values listed on two or more
+  platforms, with their per-platform counts.
+* ``common("keyword")`` - title words and the number of rows per platform
+  whose title contains them, from the distinct titles exploded into words.
+* ``contains(terms, field)`` - rows per platform whose value contains each
+  term, tested once per distinct value instead of once per row.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dataset import find_brand_column, find_category_column
+from sources import platform_labels
+
+FIELDS = ("title", "brand", "category")
+REPORT_FIELDS = ("keyword", "brand", "category")
+UNKNOWN = "unknown"
+
+
+def _field_columns(columns) -> Dict[str, Optional[str]]:
+    title = "product title" if "product title" in columns else None
+    return {"title": title, "brand": find_brand_column(columns), "category": find_category_column(columns)}
+
+
+def _counts(values: pd.Series, platforms: pd.Series) -> pd.DataFrame:
+    """Rows per (normalized value, platform); blank and missing values are skipped."""
+    normalized = values.astype("string").str.strip().str.lower()
+    keep = normalized.notna() & (normalized != "")
+    if not keep.any():
+        return pd.DataFrame(dtype=np.int64)
+    pairs = pd.DataFrame({"value": normalized[keep].astype(object), "platform": platforms[keep]})
+    return pairs.groupby(["value", "platform"]).size().unstack(fill_value=0).astype(np.int64)
+
+
+def _add(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    if left.empty:
+        return right
+    if right.empty:
+        return left
+    return left.add(right, fill_value=0).fillna(0).astype(np.int64)
+
+
+class TermStats:
+    def __init__(self) -> None:
+        self.tables: Dict[str, pd.DataFrame] = {field: pd.DataFrame(dtype=np.int64) for field in FIELDS}
+        self._keywords: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TermStats":
+        stats = cls()
+        stats.add(df)
+        return stats
+
+    @property
+    def platforms(self) -> List[str]:
+        names = set()
+        for table in self.tables.values():
+            names.update(table.columns)
+        return sorted(names)
+
+    def add(self, df: pd.DataFrame) -> None:
+        """Count the rows of ``df``; tables are replaced, never modified in place."""
+        if df.empty:
+            return
+        platforms = platform_labels(df, UNKNOWN)
+        tables = dict(self.tables)
+        for field, col in _field_columns(df.columns).items():
+            if col is not None:
+                tables[field] = _add(tables[field], _counts(df[col], platforms))
+        self.tables = tables
+
+    def table(self, field: str) -> pd.DataFrame:
+        """Count table of ``field`` ("keyword", "title", "brand" or "category")."""
+        if field == "keyword":
+            return self.keywords()
+        if field not in self.tables:
+            raise ValueError(f"Unknown field '{field}'; expected one of {REPORT_FIELDS + ('title',)}")
+        return self.tables[field]
+
+    def keywords(self) -> pd.DataFrame:
+        """Rows per (title word, platform): each distinct title counted once per word."""
+        titles = self.tables["title"]
+        cached = self._keywords
+        # Cached together with the title table it came from, so a concurrent add() cannot leave it stale.
+        if cached is not None and cached[0] is titles:
+            return cached[1]
+        if titles.empty:
+            keywords = pd.DataFrame(dtype=np.int64)
+        else:
+            words = titles.index.to_series().str.split().explode().dropna()
+            pairs = pd.DataFrame({"word": words.to_numpy(), "title": words.index}).drop_duplicates()
+            counts = titles.loc[pairs["title"]].set_axis(pairs["word"].to_numpy())
+            keywords = counts.groupby(level=0).sum()
+        self._keywords = (titles, keywords)
+        return keywords
+
+    def common(
+        self, field: str, min_platforms: int = 2, min_length: int = 1, limit: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Values of ``field`` found on at least ``min_platforms`` platforms, most rows first.
+
+        Columns: one count per platform, ``platforms`` and ``total``.
+        """
+        table = self.table(field)
+        if table.empty:
+            return pd.DataFrame(columns=["platforms", "total"])
+        if min_length > 1:
+            table = table[table.index.str.len() >= min_length]
+        report = table.assign(platforms=(table > 0).sum(axis=1), total=table.sum(axis=1))
+        report = report[report["platforms"] >= min_platforms]
+        report = report.sort_values(["total", "platforms"], ascending=False, kind="stable")
+        return report.head(limit) if limit is not None else report
+
+    def contains(self, terms: Iterable[str], field: str = "title") -> pd.DataFrame:
+        """Rows per platform whose ``field`` value contains each term (case-insensitive)."""
+        table = self.table(field)
+        terms = list(terms)
+        rows = {}
+        for term in terms:
+            if table.empty:
+                rows[term] = pd.Series(dtype=np.int64)
+                continue
+            mask = table.index.str.contains(term.strip().lower(), regex=False)
+            rows[term] = table[mask].sum()
+        report = pd.DataFrame.from_dict(rows, orient="index").reindex(index=terms, columns=self.platforms)
+        return report.fillna(0).astype(np.int64)
+
+    def to_records(self, report: pd.DataFrame) -> List[Dict[str, object]]:
+        """JSON-ready rows of a ``common`` or ``contains`` report."""
+        platforms = [p for p in self.platforms if p in report.columns]
+        counts = report[platforms].to_numpy(dtype=np.int64) if platforms else np.zeros((len(report), 0), np.int64)
+        return [
+            {
+                "value": value,
+                "counts": dict(zip(platforms, row.tolist())),
+                "platforms": int((row > 0).sum()),
+                "total": int(row.sum()),
+            }
+            for value, row in zip(report.index.tolist(), counts)
+        ]
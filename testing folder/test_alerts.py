@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+from alerts import AlertStore
+
+
+def _batch(records, start=0):
+    df = pd.DataFrame(records, columns=["product_match_id", "platform", "product title", "final_price"])
+    df["search_blob"] = df["product title"]
+    df["timestamp"] = pd.Timestamp("2024-10-01")
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+@pytest.fixture
+def store():
+    return AlertStore()
+
+
+def test_product_alert_records_the_cheapest_row_at_or_below_the_price(store):
+    alert = store.create(max_price=500, product_match_id="pm-1")
+    batch = _batch([
+        ("pm-1", "Amazon", "Maggi noodles 12 pack", 520.0),
+        ("pm-1", "Flipkart", "Maggi noodles 12 pack", 480.0),
+        ("pm-1", "Amazon", "Maggi noodles 12 pack", 450.0),
+        ("pm-2", "Amazon", "Maggi noodles 12 pack", 100.0),
+    ])
+
+    hits = store.evaluate(batch)
+
+    assert [(hit["alert_id"], hit["row"], hit["final_price"]) for hit in hits] == [(alert.alert_id, 2, 450.0)]
+    assert store.get(alert.alert_id).hits == 1
+
+
+def test_query_alert_needs_every_word_as_a_whole_word(store):
+    alert = store.create(max_price=1000, query="Boat Airdopes")
+    batch = _batch([
+        (None, "Amazon", "boAt Airdopes 131 earbuds", 999.0),
+        (None, "Amazon", "boAt Rockerz headphones", 500.0),
+        (None, "Flipkart", "Airdopes case for boats", 100.0),
+        (None, "Flipkart", "boat airdopes 141", 1200.0),
+    ])
+
+    hits = store.evaluate(batch)
+
+    assert [(hit["alert_id"], hit["row"]) for hit in hits] == [(alert.alert_id, 0)]
+
+
+def test_platform_filter_ignores_other_platforms(store):
+    flipkart = store.create(max_price=500, product_match_id="pm-1", platform="flipkart")
+    by_query = store.create(max_price=500, query="noodles", platform="Amazon")
+    batch = _batch([
+        ("pm-1", "Amazon", "Maggi noodles", 300.0),
+        ("pm-1", "Flipkart", "Maggi noodles", 400.0),
+    ], start=10)
+
+    hits = {hit["alert_id"]: hit["row"] for hit in store.evaluate(batch)}
+
+    assert hits == {flipkart.alert_id: 11, by_query.alert_id: 10}
+
+
+def test_removed_alerts_and_invalid_prices_do_not_fire(store):
+    alert = store.create(max_price=500, product_match_id="pm-1")
+    batch = _batch([("pm-1", "Amazon", "Maggi noodles", 0.0)])
+    assert store.evaluate(batch) == []
+
+    store.remove(alert.alert_id)
+    assert store.evaluate(_batch([("pm-1", "Amazon", "Maggi noodles", 100.0)])) == []
+    assert store.recent_hits(alert.alert_id) == []
+
+
+def test_query_alert_matches_alternative_spellings_and_synonyms(store):
+    alert = store.create(max_price=1000, query="boat airdops", alternatives={"airdops": ["airdopes"]})
+    corrected = _batch([(None, "Amazon", "boAt Airdopes 131 earbuds", 999.0), (None, "Amazon", "boat airbuds", 100.0)])
+    synonym = _batch([(None, "Flipkart", "bo-at airdops 141", 900.0)], start=2)
+
+    assert [(hit["alert_id"], hit["row"]) for hit in store.evaluate(corrected)] == [(alert.alert_id, 0)]
+    assert [(hit["alert_id"], hit["row"]) for hit in store.evaluate(synonym)] == [(alert.alert_id, 2)]
+
+
+def test_stores_on_one_file_share_alerts_and_hits(tmp_path):
+    path = str(tmp_path / "alerts.json")
+    first, second = AlertStore(path=path), AlertStore(path=path)
+    alert = first.create(max_price=500, product_match_id="pm-1")
+    other = second.create(max_price=500, product_match_id="pm-2")
+
+    assert [a.alert_id for a in first.alerts()] == [a.alert_id for a in second.alerts()]
+    assert second.evaluate(_batch([("pm-1", "Amazon", "Maggi noodles", 400.0)]))
+    assert first.get(alert.alert_id).hits == 1
+    assert first.remove(other.alert_id)
+    assert second.get(other.alert_id) is None
+    assert len(AlertStore(path=path)) == 1
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from fake_discounts import flag_fake_discounts
+
+HOLI = "Holi Dhamaka"  # starts 1 March, so its run-up starts 31 January
+
+
+def _rows(records):
+    df = pd.DataFrame(records, columns=["product_match_id", "platform", "timestamp", "mrp", "festive_event", "discount_pct"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df["discount_valid"] = df["discount_pct"].notna()
+    return df
+
+
+HISTORY = _rows([
+    # 0-2: MRP raised from 1000 to 1500 during the run-up, then "discounted".
+    ("p1", "Amazon", "2024-01-10", 1000.0, None, 0.0),
+    ("p1", "Amazon", "2024-02-20", 1500.0, None, 0.0),
+    ("p1", "Amazon", "2024-03-05", 1500.0, HOLI, 33.0),
+    # 3-4: same product on Flipkart, MRP within the 5% tolerance.
+    ("p1", "Flipkart", "2024-01-05", 1000.0, None, 0.0),
+    ("p1", "Flipkart", "2024-03-05", 1040.0, HOLI, 20.0),
+    # 5: no listing before the run-up.
+    ("p2", "Amazon", "2024-03-06", 900.0, HOLI, 10.0),
+    # 6: raised MRP, but outside any festive window.
+    ("p1", "Amazon", "2024-04-10", 1500.0, None, 30.0),
+    # 7: in the window, but not discounted.
+    ("p1", "Amazon", "2024-03-07", 1500.0, HOLI, 0.0),
+])
+
+
+def test_flags_follow_the_baseline_before_the_run_up():
+    flags = flag_fake_discounts(HISTORY)
+
+    assert flags["fake_discount"].tolist() == [False, False, True, False, False, False, False, False]
+    assert flags.loc[2, "baseline_mrp"] == 1000.0
+    assert flags.loc[4, "baseline_mrp"] == 1000.0
+    assert flags["baseline_mrp"].isna().tolist() == [True, True, False, True, False, True, True, True]
+
+
+def test_tolerance_is_relative_to_the_baseline():
+    assert not flag_fake_discounts(HISTORY, tolerance=0.6).loc[2, "fake_discount"]
+    assert flag_fake_discounts(HISTORY, tolerance=0.01).loc[4, "fake_discount"]
+
+
+def test_batch_flagged_against_its_products_history_matches_the_full_pass():
+    batch = HISTORY.iloc[[2, 4, 5]]
+    products_history = HISTORY[HISTORY["product_match_id"].isin(batch["product_match_id"])]
+    unrelated = _rows([("p9", "Amazon", "2024-01-01", 10.0, None, 0.0)]).set_axis([100])
+
+    flags = flag_fake_discounts(batch, pd.concat([products_history, unrelated]))
+
+    pd.testing.assert_frame_equal(flags, flag_fake_discounts(HISTORY).loc[batch.index])
+
+
+def test_rows_without_required_columns_are_not_flagged():
+    flags = flag_fake_discounts(HISTORY.drop(columns=["discount_valid"]))
+    assert not flags["fake_discount"].any()
+    assert np.isnan(flags["baseline_mrp"]).all()
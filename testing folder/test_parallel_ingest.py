@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sources
+from parallel_ingest import ingest_sources
+from quantile_sketch import SketchStore
+from sources import Source, concat_rows
+
+SORT_COLUMNS = ["platform", "product title", "final_price", "timestamp"]
+
+
+def stamp(df):
+    """Deterministic stand-in for datacleanning.add_festival_timestamps (module level, so workers can unpickle it)."""
+    df["timestamp"] = pd.Timestamp("2024-09-01") + pd.to_timedelta(np.arange(len(df)) % 90, unit="D")
+    return df
+
+
+@pytest.fixture
+def registered(tmp_path, monkeypatch):
+    """Two single-file sources in tmp_path, registered in place of the default marketplaces."""
+    rng = np.random.default_rng(0)
+    n = 300
+    alpha = pd.DataFrame({
+        "Product Title": [f"Alpha item {i % 120}" for i in range(n)],
+        "Brand": rng.choice(["Acme", "Zeta"], size=n),
+        "Price": rng.integers(100, 900, size=n).astype(float),
+        "MRP": np.where(rng.random(n) < 0.1, np.nan, 1000.0),
+        "Uniq Id": np.arange(n) % 150,  # dropped by prepare(), so rows 150+ repeat earlier ones
+    })
+    alpha.loc[5, "Product Title"] = None
+    beta = pd.DataFrame({
+        "product_name": [f"Beta item {i}" for i in range(n)],
+        "selling_price": [f"{1000 + i:,}" for i in range(n)],
+        "original_price": 2000.0,
+    })
+    alpha.to_csv(tmp_path / "alpha.csv", index=False)
+    beta.to_csv(tmp_path / "beta.csv", index=False)
+
+    for name in list(sources.SOURCES):
+        monkeypatch.delitem(sources.SOURCES, name)
+    monkeypatch.setitem(sources.SOURCES, "Alpha", Source("Alpha", str(tmp_path / "alpha.csv"), price_columns=("price",)))
+    monkeypatch.setitem(sources.SOURCES, "Beta", Source(
+        "Beta",
+        str(tmp_path / "beta.csv"),
+        columns={"product_name": "product title", "selling_price": "final_price", "original_price": "mrp"},
+    ))
+    return tmp_path
+
+
+def _serial_clean(transform):
+    """What datacleanning did before the process pool: load, clean and transform each source, then concatenate."""
+    frames = []
+    for source in sources.SOURCES.values():
+        frame = transform(source.load())
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+        frames.append(frame)
+    return concat_rows(frames)
+
+
+def _normalized(df, columns):
+    df = df.reindex(columns=columns).assign(platform=lambda d: d["platform"].astype(str))
+    return df.sort_values(SORT_COLUMNS, kind="stable").reset_index(drop=True)
+
+
+def test_parallel_clean_equals_the_serial_clean(registered):
+    dataset, sketches = ingest_sources(str(registered / "partitions"), processes=2, transform=stamp)
+    expected = _serial_clean(stamp)
+
+    result = dataset.read()
+    columns = list(result.columns)
+    assert sorted(columns) == sorted(expected.columns)
+    pd.testing.assert_frame_equal(_normalized(result, columns), _normalized(expected, columns), check_dtype=False)
+
+    reference = SketchStore.from_frame(expected)
+    assert sketches.summary(by="platform") == reference.summary(by="platform")
+
+
+def test_datacleanning_main_writes_the_serial_clean(registered, monkeypatch):
+    for module in ("matplotlib", "seaborn", "scipy"):
+        pytest.importorskip(module)
+    import datacleanning
+
+    monkeypatch.chdir(registered)
+    datacleanning.main()
+
+    combined = pd.read_csv(datacleanning.COMBINED_PATH, parse_dates=["timestamp"])
+    expected = _serial_clean(datacleanning.add_festival_timestamps)
+    # Festival timestamps are random, so only their range is compared.
+    assert combined["timestamp"].between("2023-01-01", "2025-12-31").all()
+    columns = [col for col in combined.columns if col != "timestamp"]
+    pd.testing.assert_frame_equal(
+        combined[columns].astype({"platform": str}).sort_values(columns, kind="stable").reset_index(drop=True),
+        expected.reindex(columns=columns).astype({"platform": str}).sort_values(columns, kind="stable").reset_index(drop=True),
+        check_dtype=False,
+    )
+    assert os.path.exists("cleaned_alpha_data.csv") and os.path.exists("cleaned_beta_data.csv")
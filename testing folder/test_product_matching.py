@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from product_matching import ListingTable, MatchIndex, ProductMatcher
+
+
+def _frame(rows):
+    return pd.DataFrame({
+        "platform": [platform for platform, _ in rows],
+        "product title": [title for _, title in rows],
+        "brand": "Acme",
+    })
+
+
+def test_chained_pairs_never_group_two_listings_of_one_platform():
+    # Amazon-Flipkart, Flipkart-Meesho and Meesho-Amazon are each mutual best
+    # matches, so chaining them would join both Amazon listings.
+    listings = ProductMatcher(threshold=0.5).match(_frame([
+        ("Amazon", "Acme phone blue 64gb case"),
+        ("Flipkart", "Acme phone blue 64gb"),
+        ("Meesho", "Acme phone blue 64gb cover"),
+        ("Amazon", "Acme phone blue 64gb cover new"),
+    ]))
+
+    assert not listings.groupby("product_match_id")["platform"].agg(lambda p: p.duplicated().any()).any()
+    ids = listings.set_index("title_key")["product_match_id"]
+    assert ids["acme phone blue 64gb"] == ids["acme phone blue 64gb case"]
+    assert ids["acme phone blue 64gb cover"] == ids["acme phone blue 64gb cover new"]
+
+
+def test_listing_table_extend_joins_same_title_on_another_platform():
+    listings = ProductMatcher().match(_frame([("Amazon", "Acme kettle 1.5 l steel")]))
+    table = ListingTable(listings)
+
+    ids = table.extend(_frame([
+        ("Flipkart", "Acme Kettle 1.5L Steel"),
+        ("Amazon", "Acme kettle 1.5 l steel"),
+        ("Amazon", "Acme toaster"),
+    ]))
+
+    assert ids[0] == ids[1] == listings["product_match_id"].iloc[0]
+    assert ids[2] != ids[0]
+    rows = table.to_frame().set_index(["platform", "title_key"])["rows"]
+    assert rows[("Amazon", "acme kettle 1.5l steel")] == 2
+    assert rows[("Flipkart", "acme kettle 1.5l steel")] == 1
+    assert rows[("Amazon", "acme toaster")] == 1
+
+
+def test_match_index_keeps_rows_added_while_reads_merge():
+    index = MatchIndex()
+    start = 0
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            index.rows("p")
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for _ in range(500):
+        index.add(pd.Series("p", index=pd.RangeIndex(start, start + 3)))
+        start += 3
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert np.array_equal(index.rows("p"), np.arange(start))
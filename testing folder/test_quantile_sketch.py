@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quantile_sketch import RELATIVE_ERROR, QuantileSketch, SketchStore
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def _exact(values, q):
+    # The sketch reports the value of rank floor(q * (n - 1)) of the sorted sample.
+    return np.sort(values)[int(q * (len(values) - 1))]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_quantiles_are_within_the_relative_error(seed):
+    values = np.random.default_rng(seed).lognormal(mean=6, sigma=1.2, size=5000)
+    sketch = QuantileSketch()
+    sketch.add(values)
+
+    for q, estimate in zip(QUANTILES, sketch.quantiles(QUANTILES)):
+        exact = _exact(values, q)
+        assert abs(estimate - exact) <= RELATIVE_ERROR * exact * (1 + 1e-9)
+
+
+def test_merged_sketches_equal_one_sketch_of_all_values():
+    values = np.random.default_rng(3).uniform(1, 10_000, size=3000)
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    whole.add(values)
+    left.add(values[:1000])
+    right.add(values[1000:])
+
+    merged = left.merge(right)
+
+    assert merged.count == whole.count
+    assert merged.quantiles(QUANTILES) == whole.quantiles(QUANTILES)
+    assert merged.min == values.min() and merged.max == values.max()
+
+
+def test_store_summary_stays_within_the_bound_per_platform():
+    rng = np.random.default_rng(4)
+    rows = pd.DataFrame({
+        "final_price": rng.lognormal(mean=5, sigma=1, size=2000),
+        "timestamp": pd.Timestamp("2024-03-01") + pd.to_timedelta(rng.integers(0, 60, 2000), unit="D"),
+        "platform": rng.choice(["Amazon", "Flipkart"], size=2000),
+    })
+    store = SketchStore.from_frame(rows)
+
+    for row in store.summary(qs=(0.5,), by="platform"):
+        prices = rows.loc[rows["platform"] == row["platform"], "final_price"].to_numpy()
+        assert row["count"] == len(prices)
+        exact = _exact(prices, 0.5)
+        assert abs(row["p50"] - exact) <= RELATIVE_ERROR * exact * (1 + 1e-9)
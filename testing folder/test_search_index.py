@@ -0,0 +1,106 @@
+import random
+import string
+
+import pytest
+
+from search_index import FuzzyVocabulary, edit_distance, synonym_variants, typo_budget
+
+
+def _osa_distance(a, b):
+    """Unbounded optimal string alignment distance, as the reference for edit_distance."""
+    d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        d[i][0] = i
+    for j in range(len(b) + 1):
+        d[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def _typo(word, rng, edits):
+    letters = string.ascii_lowercase
+    for _ in range(edits):
+        kind = rng.choice(["insert", "delete", "replace", "swap"])
+        i = rng.randrange(len(word))
+        if kind == "insert":
+            word = word[:i] + rng.choice(letters) + word[i:]
+        elif kind == "delete" and len(word) > 1:
+            word = word[:i] + word[i + 1:]
+        elif kind == "swap" and i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        else:
+            word = word[:i] + rng.choice(letters.replace(word[i], "")) + word[i + 1:]
+    return word
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [("", "", 0), ("kitten", "sitting", 3), ("maggi", "magig", 1), ("nivea", "nivea", 0), ("abc", "", 3)],
+)
+def test_edit_distance_known_pairs(a, b, expected):
+    assert edit_distance(a, b, limit=5) == expected
+
+
+def test_edit_distance_matches_reference_up_to_the_limit():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = "".join(rng.choice("abcde") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("abcde") for _ in range(rng.randint(0, 8)))
+        exact = _osa_distance(a, b)
+        for limit in (1, 2):
+            assert edit_distance(a, b, limit) == (exact if exact <= limit else limit + 1)
+
+
+@pytest.fixture(scope="module")
+def vocabulary():
+    rng = random.Random(1)
+    words = {"".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12))) for _ in range(3000)}
+    fuzzy = FuzzyVocabulary()
+    # Two batches, so lookups also go through the chunk merge.
+    words = sorted(words)
+    fuzzy.add(words[:1500])
+    fuzzy.add(words[1500:])
+    return words, fuzzy
+
+
+def test_lookup_finds_every_word_one_edit_away(vocabulary):
+    words, fuzzy = vocabulary
+    rng = random.Random(2)
+    for word in rng.sample(words, 500):
+        typo = _typo(word, rng, edits=1)
+        assert word in dict(fuzzy.lookup(typo, max_distance=1)), typo
+
+
+def test_lookup_recall_for_two_edits_on_long_words(vocabulary):
+    words, fuzzy = vocabulary
+    rng = random.Random(3)
+    long_words = [word for word in words if len(word) >= 8]
+    found = 0
+    trials = rng.sample(long_words, 300)
+    for word in trials:
+        typo = _typo(word, rng, edits=2)
+        found += word in dict(fuzzy.lookup(typo, max_distance=2))
+    # The prefix optimization may miss two edits spread across a long word, but rarely.
+    assert found / len(trials) >= 0.9
+
+
+def test_lookup_returns_exactly_the_words_within_the_budget(vocabulary):
+    words, fuzzy = vocabulary
+    rng = random.Random(4)
+    for word in rng.sample(words, 100):
+        typo = _typo(word, rng, edits=1)
+        budget = typo_budget(typo)
+        result = fuzzy.lookup(typo)
+        assert all(distance == _osa_distance(typo, match) <= budget for match, distance in result)
+        assert [distance for _, distance in result] == sorted(distance for _, distance in result)
+
+
+def test_synonyms_rewrite_whole_words_only():
+    assert synonym_variants(["surf", "excel", "gel"]) == [["surfexcel", "gel"]]
+    assert ["131"] in synonym_variants(["one", "three", "one"])
+    assert {" ".join(v) for v in synonym_variants(["boat"])} == {"bo at", "bo-at"}
+    assert synonym_variants(["mixer"]) == []
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from top_k import SORT_ORDERS, top_k_rows
+
+
+def _frame(seed, n=400):
+    rng = np.random.default_rng(seed)
+    # Few distinct values, so most rows tie on the first key and many on all of them.
+    df = pd.DataFrame({
+        "final_price": rng.choice([99.0, 149.0, 199.0, 249.0, np.nan], size=n),
+        "discount_pct": rng.choice([0.0, 10.0, 25.0, 50.0, np.nan], size=n),
+        "relevance": rng.integers(0, 3, size=n),
+    })
+    # Row labels out of order, so the test also checks positional tie-breaking.
+    df.index = rng.permutation(n) * 7
+    return df
+
+
+def _full_sort(df, keys, k):
+    columns = [column for column, _ in keys]
+    ascending = [asc for _, asc in keys]
+    return df.sort_values(columns, ascending=ascending, kind="stable", na_position="last").head(k)
+
+
+@pytest.mark.parametrize("order", sorted(SORT_ORDERS))
+@pytest.mark.parametrize("k", [1, 5, 20, 399, 400, 1000])
+def test_top_k_matches_a_full_stable_sort(order, k):
+    for seed in range(3):
+        df = _frame(seed)
+        keys = SORT_ORDERS[order]
+        expected = _full_sort(df, keys, k)
+        result = top_k_rows(df, keys, k)
+        assert result.index.tolist() == expected.index.tolist()
+
+
+def test_top_k_of_empty_frame_and_unknown_columns():
+    df = _frame(0)
+    assert top_k_rows(df.iloc[0:0], SORT_ORDERS["price"], 5).empty
+    assert top_k_rows(df, [("missing", True)], 3).index.tolist() == df.index[:3].tolist()
@@ -0,0 +1,59 @@
+"""Top-K row selection without sorting every match.
+
+``top_k_rows`` partitions the first sort key with ``np.argpartition`` to
+find the K-th best value, keeps only the rows at least that good (ties
+included) and sorts that small set by all keys. A broad search with tens of
+thousands of matches therefore costs one linear pass plus a sort of about K
+rows instead of a full sort.
+
+Missing values rank last whatever the direction, and rows that tie on every
+key keep their original order.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SortKey = Tuple[str, bool]  # (column, ascending)
+
+# Result orderings offered by the API and dashboard; later keys break ties.
+SORT_ORDERS: Dict[str, List[SortKey]] = {
+    "price": [("final_price", True)],
+    "discount": [("discount_pct", False), ("final_price", True)],
+    "relevance": [("relevance", False), ("final_price", True)],
+}
+
+
+def _rank_values(values: pd.Series, ascending: bool) -> np.ndarray:
+    """``values`` as floats where smaller is better and missing is worst."""
+    ranked = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    if not ascending:
+        ranked = -ranked
+    return np.where(np.isnan(ranked), np.inf, ranked)
+
+
+def top_k_positions(df: pd.DataFrame, keys: Sequence[SortKey], k: int) -> np.ndarray:
+    """Positions of the best ``k`` rows of ``df`` by ``keys``, best first."""
+    n = len(df)
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    ranked = [_rank_values(df[column], ascending) for column, ascending in keys if column in df.columns]
+    if not ranked:
+        return np.arange(min(k, n), dtype=np.int64)
+
+    if k < n:
+        primary = ranked[0]
+        kth = primary[np.argpartition(primary, k - 1)[k - 1]]
+        candidates = np.flatnonzero(primary <= kth)
+    else:
+        candidates = np.arange(n, dtype=np.int64)
+    # np.lexsort sorts by its last key first; the position keeps ties in frame order.
+    order = np.lexsort([candidates] + [values[candidates] for values in reversed(ranked)])
+    return candidates[order[:k]]
+
+
+def top_k_rows(df: pd.DataFrame, keys: Sequence[SortKey], k: int) -> pd.DataFrame:
+    """The best ``k`` rows of ``df`` by ``keys``, in order (like ``sort_values(...).head(k)``)."""
+    return df.iloc[top_k_positions(df, keys, k)]
@@ -0,0 +1,16 @@
+"""WSGI entry point for external servers.
+
+    gunicorn --preload --workers 4 --threads 4 --bind 0.0.0.0:5000 wsgi:app
+
+``--preload`` imports this module (and loads the dataset) once in the master
+process, so forked workers share the dataset pages copy-on-write.
+"""
+import gc
+
+from price_api import create_app
+
+app = create_app()
+
+# Move everything loaded so far out of the collector's generations so that GC
+# passes in the workers do not touch (and un-share) the preloaded objects.
+gc.freeze()